@@ -1,70 +1,452 @@
+import collections
+import subprocess
+import threading
+import time
 import numpy as np
-from pydub import AudioSegment
-from typing import Optional, List, Union
+from typing import Optional, List, Union, Iterator, Tuple
+
+from backend.EncodingProfile import EncodingProfile, PROFILES, DEFAULT_PROFILE
+from backend.OffsetMap import MIN_SPAN_SEC
+from backend.PCMStore import PCMStore, SAMPLE_RATE
+from backend.PeakCache import PeakCache
+from backend.PeakPyramid import PeakPyramid
+from backend.PipelineMetrics import PipelineMetrics
+from utils import utils
+
+# Frequenza di campionamento usata per la decodifica (in streaming e nell'archivio PCM).
+# 16 kHz mono è il formato nativo di Whisper: nessuna perdita utile per il parlato.
+STREAM_SAMPLE_RATE = SAMPLE_RATE
+
+# Dimensione dei blocchi PCM letti dalla pipe di FFmpeg (in secondi).
+# 10 secondi a 16 kHz mono int16 = ~320 KB: la memoria resta costante a prescindere dalla durata.
+BLOCK_SECONDS = 10.0
+
+# Oltre questa durata (in secondi) il caricamento automatico passa alla modalità streaming.
+STREAMING_THRESHOLD_SEC = 60 * 60
+
+# Numero massimo di intervalli estratti direttamente dal file sorgente in un solo processo FFmpeg
+# (ogni intervallo è un input separato con il proprio seek). Oltre, i campioni passano dalla pipe PCM.
+MAX_DIRECT_SPANS = 64
+
+# Se l'intervallo da analizzare copre meno di questa frazione del file (e i picchi non sono ancora
+# disponibili), si analizza solo l'intervallo invece di costruire la piramide dell'intero file.
+RANGE_PEAKS_MAX_FRACTION = 0.5
 
 
 class AudioHandler:
     """
     Gestisce le operazioni sui file audio, inclusi il caricamento,
     il calcolo della durata e l'estrazione dei dati per la visualizzazione della forma d'onda.
+
+    Supporta due modalità:
+    - Classica: l'intero file viene decodificato una sola volta nell'archivio PCM su disco
+      e letto come vista NumPy mappata in memoria (nessuna copia dei campioni).
+    - Streaming: la durata viene letta con ffprobe e l'audio viene decodificato on-demand
+      attraverso una pipe di FFmpeg, a blocchi di dimensione fissa (memoria costante).
+    In entrambe, se la registrazione è già nell'archivio i campioni vengono letti da lì.
     """
 
-    def __init__(self):
-        """Inizializza l'handler con uno stato vuoto."""
-        self.audio: Optional[AudioSegment] = None
+    def __init__(self, use_cache: bool = True):
+        """
+        Inizializza l'handler con uno stato vuoto.
+
+        Args:
+            use_cache (bool): Se True, picchi, durata e campioni decodificati vengono letti/salvati su disco.
+        """
+        self.samples: Optional[np.ndarray] = None
         self.duration: float = 0.0
         self.filepath: Optional[str] = None
+        self.fingerprint: Optional[str] = None
+        self.streaming: bool = False
+        self.sample_rate: int = STREAM_SAMPLE_RATE
+        self.peaks: Optional[PeakPyramid] = None
+        self.peak_cache: Optional[PeakCache] = PeakCache() if use_cache else None
+        self.pcm_store: Optional[PCMStore] = PCMStore() if use_cache else None
+        # Tempi del caricamento e delle decodifiche successive (letti dal Transcriber a fine lavoro)
+        self.metrics = PipelineMetrics()
+        self._decode_lock = threading.Lock()
 
-    def load_file(self, filepath: str) -> float:
+    def load_file(self, filepath: str, streaming: Optional[bool] = None, fingerprint: Optional[str] = None) -> float:
         """
-        Carica un file audio dal percorso specificato utilizzando Pydub.
+        Carica un file audio dal percorso specificato.
 
         Args:
             filepath (str): Il percorso assoluto o relativo del file audio.
+            streaming (bool, optional): Forza la modalità streaming (True) o classica (False).
+                                        Se None, viene scelta in base alla durata del file.
+            fingerprint (str, optional): L'impronta del file, se già calcolata (evita di rileggerlo).
 
         Returns:
             float: La durata totale dell'audio in secondi.
         """
         self.filepath = filepath
+        self.samples = None
+        self.peaks = None
+        self.duration = 0.0
+        self.fingerprint = None
+        self.metrics = PipelineMetrics()
+
+        # 1. Cache su disco: se il file è già stato aperto, durata e picchi sono pronti
+        if self.peak_cache:
+            with self.metrics.stage("fingerprint"):
+                self.fingerprint = fingerprint or utils.file_fingerprint(filepath)
+            with self.metrics.stage("peak_cache"):
+                cached = self.peak_cache.load(self.fingerprint)
+            if cached:
+                self.duration, self.peaks = cached
+        if self.pcm_store:
+            # Aprire l'archivio costa solo la mappatura del file: i campioni vengono letti quando servono
+            with self.metrics.stage("pcm_store"):
+                self.samples = self.pcm_store.load(self.fingerprint)
+            if self.samples is not None:
+                self.duration = len(self.samples) / self.sample_rate
+
+        # ffprobe legge solo l'header del container: costo trascurabile anche per file enormi
+        if not self.duration and streaming is not False:
+            with self.metrics.stage("probe"):
+                self.duration = self.probe_duration(filepath)
+        if streaming is None:
+            streaming = self.duration > STREAMING_THRESHOLD_SEC
 
-        # Carica il file audio (Pydub gestisce automaticamente formati come mp3, wav, m4a)
-        self.audio = AudioSegment.from_file(filepath)
+        self.streaming = streaming
 
-        # Pydub calcola la lunghezza in millisecondi, convertiamo in secondi per l'UI
-        self.duration = len(self.audio) / 1000.0
+        # In streaming nessuna decodifica: i campioni verranno letti a blocchi quando servono.
+        # In modalità classica si decodifica una sola volta (FFmpeg gestisce qualsiasi formato),
+        # a meno che i picchi arrivino dalla cache: la decodifica viene allora rimandata al primo utilizzo.
+        if not streaming and self.peaks is None:
+            self._decode()
 
         return self.duration
 
-    def get_waveform_data(self, max_points: int = 5000) -> Union[List, np.ndarray]:
+    def _decode(self) -> np.ndarray:
         """
-        Estrae e campiona i dati audio per la visualizzazione grafica nell'UI.
+        Decodifica l'intero file (solo modalità classica), se non già fatto.
 
-        Per mantenere l'interfaccia reattiva, questo metodo riduce (downsampling)
-        il numero di campioni a un massimo prefissato.
+        Con la cache attiva i campioni finiscono nell'archivio PCM e vengono mappati in memoria;
+        senza cache vengono letti dalla pipe di FFmpeg in un array.
+
+        Returns:
+            np.ndarray: I campioni int16 mono a `self.sample_rate` Hz.
+        """
+        # Il lock evita decodifiche doppie quando più chunk vengono esportati in parallelo
+        with self._decode_lock:
+            if self.samples is None:
+                start = time.perf_counter()
+                if self.pcm_store and self.fingerprint:
+                    self.samples = self.pcm_store.decode(self.fingerprint, self.filepath)
+                else:
+                    self.samples = np.concatenate(
+                        [np.zeros(0, dtype=np.int16),
+                         *self._iter_ffmpeg_blocks(0.0, self.probe_duration(self.filepath), BLOCK_SECONDS)])
+
+                self.duration = len(self.samples) / self.sample_rate
+                self.metrics.add_time("decode", time.perf_counter() - start)
+
+        return self.samples
+
+    def is_loaded(self) -> bool:
+        """
+        Indica se è disponibile un audio da elaborare (in memoria o in streaming).
+
+        Returns:
+            bool: True se è possibile leggere campioni o esportare chunk.
+        """
+        return self.filepath is not None and (self.samples is not None or self.streaming or self.peaks is not None)
+
+    @staticmethod
+    def probe_duration(filepath: str) -> float:
+        """
+        Legge la durata del file tramite ffprobe, senza decodificare l'audio.
 
         Args:
-            max_points (int): Numero massimo di punti da restituire per il grafico.
-                              Default a 5000.
+            filepath (str): Il percorso del file audio.
 
         Returns:
-            np.ndarray: Un array numpy contenente i dati di ampiezza audio campionati.
-                        Restituisce una lista vuota se nessun audio è caricato.
+            float: La durata in secondi.
+
+        Raises:
+            RuntimeError: Se ffprobe non riesce a leggere il file.
         """
-        if not self.audio:
-            return []
+        _, ffprobe = utils.get_ffmpeg_binaries()
+        result = subprocess.run(
+            [ffprobe, "-v", "error", "-show_entries", "format=duration",
+             "-of", "default=noprint_wrappers=1:nokey=1", filepath],
+            capture_output=True, text=True
+        )
 
-        # Ottiene i campioni grezzi (raw samples) come array numpy
-        raw_data = np.array(self.audio.get_array_of_samples())
+        try:
+            return float(result.stdout.strip())
+        except ValueError:
+            raise RuntimeError(f"Impossibile leggere la durata di {filepath}: {result.stderr.strip()}")
 
-        # Gestione Stereo: Se l'audio ha 2 canali, prendiamo solo un canale (es. sinistro)
-        # o alterniamo i campioni per semplificare il grafico a una sola linea.
-        if self.audio.channels == 2:
-            raw_data = raw_data[::2]
+    def iter_pcm_blocks(self,
+                        start_sec: float = 0.0,
+                        end_sec: Optional[float] = None,
+                        block_seconds: float = BLOCK_SECONDS) -> Iterator[np.ndarray]:
+        """
+        Restituisce i campioni audio (mono, int16) a blocchi di dimensione fissa.
+
+        In modalità streaming i blocchi arrivano direttamente dalla pipe di FFmpeg,
+        quindi in memoria c'è al massimo un blocco alla volta. Se i campioni sono nell'archivio PCM
+        i blocchi sono viste sul file mappato in memoria, senza copie.
+
+        Args:
+            start_sec (float): Secondo di inizio della lettura.
+            end_sec (float, optional): Secondo di fine della lettura (default: fine del file).
+            block_seconds (float): Durata di ogni blocco in secondi.
 
-        # Downsampling: Se i dati superano i punti massimi consentiti, calcoliamo uno "step"
-        # per saltare i campioni e ridurre il peso computazionale del grafico.
-        if len(raw_data) > max_points:
-            step = int(len(raw_data) / max_points)
-            raw_data = raw_data[::step]
+        Yields:
+            np.ndarray: Blocchi di campioni int16 mono a `self.sample_rate` Hz.
+
+        Raises:
+            RuntimeError: Se FFmpeg non riesce a decodificare il file (in streaming).
+        """
+        if end_sec is None:
+            end_sec = self.duration
+        if end_sec <= start_sec:
+            return
+
+        if self.streaming and self.samples is None:
+            yield from self._iter_ffmpeg_blocks(start_sec, end_sec, block_seconds)
+            return
+
+        # Campioni già decodificati: affettiamo la vista un blocco alla volta (le slice non copiano)
+        samples = self._decode()
+        block_size = int(block_seconds * self.sample_rate)
+        position = int(start_sec * self.sample_rate)
+        end = min(int(end_sec * self.sample_rate), len(samples))
+        while position < end:
+            yield samples[position:min(position + block_size, end)]
+            position += block_size
+
+    def _iter_ffmpeg_blocks(self, start_sec: float, end_sec: float, block_seconds: float) -> Iterator[np.ndarray]:
+        """
+        Decodifica l'intervallo richiesto con FFmpeg e legge la pipe a blocchi fissi.
+        """
+        ffmpeg, _ = utils.get_ffmpeg_binaries()
+        # '-ss' prima di '-i' esegue il seek sull'input: non decodifichiamo la parte precedente
+        command = [ffmpeg, "-nostdin", "-v", "error",
+                   "-ss", f"{start_sec:.3f}", "-i", self.filepath,
+                   "-t", f"{end_sec - start_sec:.3f}",
+                   "-f", "s16le", "-ac", "1", "-ar", str(self.sample_rate), "pipe:1"]
+
+        # 2 byte per campione (int16), un solo canale
+        block_bytes = int(block_seconds * self.sample_rate) * 2
+        process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        # stderr va svuotato in parallelo (come in PCMStore.decode): a pipe piena FFmpeg si bloccherebbe
+        stderr_lines = collections.deque(maxlen=20)
+        reader = threading.Thread(target=lambda: stderr_lines.extend(iter(process.stderr.readline, b"")),
+                                  daemon=True)
+        reader.start()
+        finished = False
+        try:
+            while True:
+                data = process.stdout.read(block_bytes)
+                if not data:
+                    break
+                # Una lettura parziale alla fine potrebbe lasciare un byte spaiato
+                usable = len(data) - (len(data) % 2)
+                if usable:
+                    yield np.frombuffer(data[:usable], dtype=np.int16)
+            finished = True
+        finally:
+            # Se il consumatore si ferma prima della fine, terminiamo FFmpeg
+            if not finished and process.poll() is None:
+                process.kill()
+            process.stdout.close()
+            returncode = process.wait()
+            reader.join()
+            process.stderr.close()
+
+        # Un file danneggiato o non supportato non deve diventare una trascrizione troncata in silenzio
+        if returncode != 0:
+            stderr = b"".join(stderr_lines).decode(errors="replace").strip()
+            raise RuntimeError(f"Impossibile decodificare {self.filepath}: {stderr}")
+
+    def encode_chunk(self, start_sec: float, end_sec: float,
+                     profile: EncodingProfile = PROFILES[DEFAULT_PROFILE]) -> bytes:
+        """
+        Codifica un singolo intervallo dell'audio interamente in memoria (vedi encode_spans).
+
+        Args:
+            start_sec (float): Secondo di inizio dell'intervallo.
+            end_sec (float): Secondo di fine dell'intervallo.
+            profile (EncodingProfile): Il profilo di codifica (formato, codec, bitrate).
+
+        Returns:
+            bytes: Il chunk codificato, pronto per l'upload.
+        """
+        return self.encode_spans([(start_sec, end_sec)], profile)
+
+    def encode_spans(self, spans: List[Tuple[float, float]],
+                     profile: EncodingProfile = PROFILES[DEFAULT_PROFILE]) -> bytes:
+        """
+        Codifica uno o più intervalli dell'audio, concatenati, interamente in memoria.
+
+        Se i campioni sono già nell'archivio PCM, l'encoder li legge dal file mappato in memoria
+        (nessuna nuova decodifica). Altrimenti gli intervalli vengono estratti direttamente dal file
+        sorgente: FFmpeg esegue il seek sull'input ('-ss'/'-t' prima di '-i') e decodifica solo
+        la finestra richiesta, quindi 10 minuti di una registrazione di 4 ore costano quanto 10 minuti.
+        Il risultato compresso viene letto dallo stdout: nessun file temporaneo, quindi più job
+        possono girare in parallelo.
+
+        Più intervalli permettono di saltare i silenzi: vengono uniti dal filtro concat
+        nello stesso file, come un unico audio continuo.
+
+        Args:
+            spans (List[Tuple[float, float]]): Intervalli (inizio, fine) in secondi, in ordine.
+            profile (EncodingProfile): Il profilo di codifica (formato, codec, bitrate).
+
+        Returns:
+            bytes: Il chunk codificato, pronto per l'upload.
+
+        Raises:
+            RuntimeError: Se FFmpeg termina con un errore.
+        """
+        # Uno span largo pochi ulp diventerebbe '-t 0.000', che FFmpeg ignora: codificherebbe fino alla fine del file
+        spans = [(start_sec, end_sec) for start_sec, end_sec in spans if end_sec - start_sec >= MIN_SPAN_SEC]
+        if not spans or self.samples is not None or len(spans) > MAX_DIRECT_SPANS:
+            return self._encode_pcm_spans(spans, profile)
+
+        ffmpeg, _ = utils.get_ffmpeg_binaries()
+        command = [ffmpeg, "-nostdin", "-v", "error"]
+        for start_sec, end_sec in spans:
+            command += ["-ss", f"{start_sec:.6f}", "-t", f"{end_sec - start_sec:.6f}", "-i", self.filepath]
+
+        if len(spans) == 1:
+            command += ["-map", "0:a:0"]
+        else:
+            inputs = "".join(f"[{i}:a:0]" for i in range(len(spans)))
+            command += ["-filter_complex", f"{inputs}concat=n={len(spans)}:v=0:a=1[out]", "-map", "[out]"]
+        command += [*profile.ffmpeg_output_args(), "pipe:1"]
+
+        result = subprocess.run(command, capture_output=True)
+        if result.returncode != 0:
+            raise RuntimeError(f"Errore FFmpeg durante la codifica: {result.stderr.decode(errors='replace').strip()}")
+
+        return result.stdout
+
+    def _encode_pcm_spans(self, spans: List[Tuple[float, float]], profile: EncodingProfile) -> bytes:
+        """
+        Codifica gli intervalli scrivendo i blocchi PCM nello stdin di un encoder FFmpeg.
+        Usato quando i campioni sono già decodificati o gli intervalli sono troppi per essere
+        aperti come input separati.
+        """
+        ffmpeg, _ = utils.get_ffmpeg_binaries()
+        command = [ffmpeg, "-nostdin", "-v", "error",
+                   "-f", "s16le", "-ac", "1", "-ar", str(self.sample_rate), "-i", "pipe:0",
+                   *profile.ffmpeg_output_args(), "pipe:1"]
+
+        process = subprocess.Popen(command, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+
+        feed_errors = []
+
+        def feed():
+            # Scrittura in un thread separato: se leggessimo e scrivessimo dallo stesso thread
+            # le pipe piene bloccherebbero sia noi che FFmpeg (deadlock).
+            try:
+                for start_sec, end_sec in spans:
+                    for block in self.iter_pcm_blocks(start_sec, end_sec):
+                        # I blocchi sono array contigui: vengono scritti senza convertirli in bytes
+                        process.stdin.write(block)
+            except BrokenPipeError:
+                # L'encoder è terminato in anticipo: l'errore reale viene letto da stderr
+                pass
+            except Exception as e:
+                # Es. sorgente illeggibile: l'errore va riportato al chiamante, non un chunk troncato
+                feed_errors.append(e)
+            finally:
+                try:
+                    process.stdin.close()
+                except BrokenPipeError:
+                    pass
+
+        writer = threading.Thread(target=feed, daemon=True)
+        writer.start()
+        data = process.stdout.read()
+        writer.join()
+        if feed_errors:
+            process.stderr.close()
+            process.wait()
+            raise feed_errors[0]
+
+        stderr = process.stderr.read()
+        if process.wait() != 0:
+            raise RuntimeError(f"Errore FFmpeg durante la codifica: {stderr.decode(errors='replace').strip()}")
+
+        return data
+
+    def get_peaks(self) -> Optional[PeakPyramid]:
+        """
+        Restituisce la piramide dei picchi, costruendola al primo utilizzo.
+
+        La costruzione richiede un solo passaggio sul flusso di blocchi PCM;
+        le richieste successive (a qualsiasi zoom) non toccano più l'audio.
+        Se il file era già stato aperto, la piramide arriva direttamente dalla cache su disco.
+
+        Returns:
+            PeakPyramid: La piramide dei picchi, o None se nessun audio è caricato.
+        """
+        if not self.is_loaded():
+            return None
+
+        if self.peaks is None:
+            with self.metrics.stage("peaks"):
+                self.peaks = PeakPyramid.from_blocks(self.iter_pcm_blocks(), self.sample_rate)
+
+            # Salviamo i picchi per le prossime aperture dello stesso file
+            if self.peak_cache and self.fingerprint:
+                self.peak_cache.save(self.fingerprint, self.duration, self.peaks)
+
+        return self.peaks
+
+    def get_range_peaks(self, start_sec: float, end_sec: float) -> Tuple[Optional[PeakPyramid], float]:
+        """
+        Restituisce una piramide dei picchi che copre l'intervallo richiesto.
+
+        Se la piramide dell'intero file è già disponibile (o l'intervallo ne copre buona parte)
+        si usa quella; altrimenti viene costruita solo sull'intervallo, così l'analisi di un breve
+        ritaglio non richiede la decodifica dell'intera registrazione.
+
+        Args:
+            start_sec (float): Inizio dell'intervallo.
+            end_sec (float): Fine dell'intervallo.
+
+        Returns:
+            Tuple: (piramide, secondo del file corrispondente al suo istante zero).
+        """
+        if (self.peaks is not None or not self.is_loaded() or
+                end_sec - start_sec >= self.duration * RANGE_PEAKS_MAX_FRACTION):
+            return self.get_peaks(), 0.0
+
+        with self.metrics.stage("range_peaks"):
+            if self.samples is None:
+                # Seek sull'input: FFmpeg decodifica solo la finestra richiesta
+                blocks = self._iter_ffmpeg_blocks(start_sec, end_sec, BLOCK_SECONDS)
+            else:
+                blocks = self.iter_pcm_blocks(start_sec, end_sec)
+            return PeakPyramid.from_blocks(blocks, self.sample_rate), start_sec
+
+    def get_waveform_data(self, max_points: int = 5000,
+                          start_sec: float = 0.0, end_sec: Optional[float] = None) -> Union[List, np.ndarray]:
+        """
+        Estrae l'inviluppo dei picchi per la visualizzazione grafica nell'UI.
+
+        Invece di campionare un punto ogni N (che provoca aliasing), per ogni colonna
+        viene restituito il minimo, il massimo e l'RMS dei campioni che rappresenta.
+
+        Args:
+            max_points (int): Numero massimo di colonne da restituire (es. larghezza in pixel).
+                              Default a 5000.
+            start_sec (float): Inizio dell'intervallo da visualizzare.
+            end_sec (float, optional): Fine dell'intervallo da visualizzare (default: fine audio).
+
+        Returns:
+            np.ndarray: Matrice (N, 3) con colonne [min, max, rms] normalizzate in [-1, 1].
+                        Restituisce una lista vuota se nessun audio è caricato.
+        """
+        peaks = self.get_peaks()
+        if peaks is None:
+            return []
 
-        return raw_data
\ No newline at end of file
+        return peaks.get_peaks(max_points, start_sec, end_sec)
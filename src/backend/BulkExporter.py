@@ -0,0 +1,166 @@
+import hashlib
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from backend.LibraryIndex import LibraryIndex
+from utils import utils
+
+# Formati di export: nome -> (estensione, funzione di utils)
+EXPORT_FORMATS = {
+    "pdf": (".pdf", "export_pdf"),
+    "docx": (".docx", "export_docx"),
+}
+
+
+def _export_one(txt_path: str, format_name: str) -> str:
+    """
+    Esporta un singolo file. Eseguita nei processi worker (deve stare a livello di modulo per il pickle).
+
+    Returns:
+        str: Il percorso del file generato.
+    """
+    _, function_name = EXPORT_FORMATS[format_name]
+    return getattr(utils, function_name)(txt_path)
+
+
+def content_hash(filepath: str) -> str:
+    """Hash SHA-1 del contenuto di un file, letto a blocchi."""
+    digest = hashlib.sha1()
+    with open(filepath, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class BulkExporter:
+    """
+    Esporta molte trascrizioni in PDF/Word in parallelo, saltando quelle già aggiornate.
+
+    Un export è aggiornato se è stato generato dalla versione attuale del .txt: l'indice della
+    libreria conserva data, dimensione e hash del .txt usato per ogni export. Se data e dimensione
+    coincidono non serve nemmeno leggere il file; se è cambiata solo la data (file "toccato"
+    ma identico) decide l'hash del contenuto. Gli export creati prima dell'indice sono considerati
+    aggiornati se più recenti del .txt.
+
+    Gli export veri e propri girano in un pool di processi (la generazione PDF è CPU-bound).
+    """
+
+    def __init__(self, library_index: Optional[LibraryIndex] = None, processes: Optional[int] = None):
+        """
+        Inizializza l'esportatore.
+
+        Args:
+            library_index (LibraryIndex, optional): L'indice della libreria (default: uno nuovo).
+            processes (int, optional): Numero di processi worker (default: numero di core).
+        """
+        self.library_index = library_index or LibraryIndex()
+        self.processes = processes or os.cpu_count() or 1
+
+    def is_up_to_date(self, txt_path: str, output_path: str) -> bool:
+        """
+        Verifica se un export corrisponde alla versione attuale del .txt.
+
+        Args:
+            txt_path (str): Il file di testo sorgente.
+            output_path (str): Il file esportato.
+
+        Returns:
+            bool: True se l'export esiste ed è stato generato dal contenuto attuale del .txt.
+        """
+        if not os.path.exists(output_path):
+            return False
+        source = os.stat(txt_path)
+        record = self.library_index.get_export(output_path)
+
+        if record is None:
+            # Export precedente all'indice: ci fidiamo delle date e lo registriamo
+            if os.stat(output_path).st_mtime_ns < source.st_mtime_ns:
+                return False
+            self.record(txt_path, output_path)
+            return True
+
+        mtime_ns, size, digest = record
+        if (mtime_ns, size) == (source.st_mtime_ns, source.st_size):
+            return True
+        if size == source.st_size and digest == content_hash(txt_path):
+            # Stesso contenuto con una nuova data: aggiorniamo il record per non ricalcolare l'hash
+            self.library_index.record_export(output_path, source.st_mtime_ns, source.st_size, digest)
+            return True
+        return False
+
+    def record(self, txt_path: str, output_path: str):
+        """Registra nell'indice che `output_path` è stato generato dalla versione attuale di `txt_path`."""
+        source = os.stat(txt_path)
+        self.library_index.record_export(output_path, source.st_mtime_ns, source.st_size, content_hash(txt_path))
+        self.library_index.update_file(output_path)
+
+    def plan(self, txt_paths: Iterable[str], formats: Iterable[str],
+             force: bool = False) -> Tuple[List[Tuple[str, str]], List[Tuple[str, str]]]:
+        """
+        Divide gli export richiesti tra quelli da generare e quelli già aggiornati.
+
+        Args:
+            txt_paths (Iterable[str]): I file di testo da esportare.
+            formats (Iterable[str]): I formati richiesti (chiavi di EXPORT_FORMATS).
+            force (bool): Se True, rigenera tutto.
+
+        Returns:
+            Tuple: (export da generare, export già aggiornati), come liste di (file .txt, formato).
+        """
+        todo, skipped = [], []
+        for txt_path in txt_paths:
+            for format_name in formats:
+                extension, _ = EXPORT_FORMATS[format_name]
+                output_path = os.path.splitext(txt_path)[0] + extension
+                if not force and self.is_up_to_date(txt_path, output_path):
+                    skipped.append((txt_path, format_name))
+                else:
+                    todo.append((txt_path, format_name))
+        return todo, skipped
+
+    def run(self, txt_paths: Iterable[str], formats: Iterable[str], force: bool = False,
+            progress_callback: Optional[Callable[[int, int], None]] = None) -> Dict[str, Any]:
+        """
+        Esegue l'export in blocco (bloccante: da chiamare in un thread di background).
+
+        Args:
+            txt_paths (Iterable[str]): I file di testo da esportare.
+            formats (Iterable[str]): I formati richiesti (chiavi di EXPORT_FORMATS).
+            force (bool): Se True, rigenera anche gli export aggiornati.
+            progress_callback (Callable, optional): Chiamata con (export completati, export da generare).
+
+        Returns:
+            Dict[str, Any]: Riepilogo: file generati, export saltati perché aggiornati, errori e tempo impiegato.
+        """
+        started = time.monotonic()
+        todo, skipped = self.plan(list(txt_paths), list(formats), force)
+        exported: List[str] = []
+        failed: Dict[str, str] = {}
+
+        if todo:
+            # "spawn": il pool può essere creato anche da un thread dell'interfaccia senza duplicare lo stato di Tk
+            context = multiprocessing.get_context("spawn")
+            with ProcessPoolExecutor(max_workers=min(self.processes, len(todo)), mp_context=context) as pool:
+                futures = {pool.submit(_export_one, txt_path, format_name): (txt_path, format_name)
+                           for txt_path, format_name in todo}
+                for done, future in enumerate(as_completed(futures), start=1):
+                    txt_path, format_name = futures[future]
+                    try:
+                        output_path = future.result()
+                    except Exception as e:
+                        failed[f"{os.path.basename(txt_path)} ({format_name})"] = str(e)
+                    else:
+                        self.record(txt_path, output_path)
+                        exported.append(output_path)
+                    if progress_callback:
+                        progress_callback(done, len(todo))
+
+        return {
+            "exported": exported,
+            "skipped": len(skipped),
+            "failed": failed,
+            "elapsed": time.monotonic() - started,
+        }
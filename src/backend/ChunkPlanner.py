@@ -0,0 +1,146 @@
+import numpy as np
+from typing import Any, List, Optional, Tuple
+
+from backend.EncodingProfile import EncodingProfile
+from backend.OffsetMap import OffsetMap
+from backend.SilenceAnalyzer import SilenceAnalyzer
+
+# Limite di upload dell'API Groq (come OpenAI): 25MB per file.
+MAX_UPLOAD_BYTES = 25 * 1024 * 1024
+
+# Dimensione obiettivo di ogni chunk: 90% del limite, per assorbire le variazioni del bitrate reale.
+DEFAULT_TARGET_BYTES = int(MAX_UPLOAD_BYTES * 0.9)
+
+# Tetto alla durata di un chunk, indipendente dal profilo (evita richieste lunghissime con codec molto compressi).
+MAX_CHUNK_SECONDS = 2 * 60 * 60
+
+# Di quanto (al massimo) un taglio può essere anticipato per cadere in un silenzio invece che a metà parola.
+SNAP_WINDOW_SEC = 60.0
+
+Spans = List[Tuple[float, float]]
+
+
+class ChunkPlanner:
+    """
+    Decide come suddividere l'audio in chunk in base a un budget di byte per richiesta.
+
+    La durata dei chunk non è più fissa: viene ricavata dal profilo di codifica
+    (es. MP3 64k mono ≈ 8 KB/s → ~48 minuti per 23 MB). I tagli vengono spostati nei silenzi
+    e, dopo la codifica, la dimensione reale viene verificata: solo se supera il limite
+    il chunk viene diviso di nuovo.
+    """
+
+    def __init__(self, profile: EncodingProfile, target_bytes: int = DEFAULT_TARGET_BYTES,
+                 max_bytes: int = MAX_UPLOAD_BYTES, silence_analyzer: Optional[SilenceAnalyzer] = None):
+        """
+        Inizializza il pianificatore.
+
+        Args:
+            profile (EncodingProfile): Il profilo usato per codificare i chunk.
+            target_bytes (int): Dimensione desiderata di ogni chunk.
+            max_bytes (int): Dimensione massima accettata dall'API.
+            silence_analyzer (SilenceAnalyzer, optional): L'analizzatore dei silenzi da usare.
+        """
+        self.profile = profile
+        self.target_bytes = target_bytes
+        self.max_bytes = max_bytes
+        self.silence_analyzer = silence_analyzer or SilenceAnalyzer()
+
+    @property
+    def chunk_seconds(self) -> float:
+        """Durata ideale di un chunk per rientrare nel budget di byte con il profilo scelto."""
+        return min(self.target_bytes / self.profile.bytes_per_second, MAX_CHUNK_SECONDS)
+
+    def plan(self, audio_handler: Any, start_sec: float, end_sec: float,
+             skip_silence: bool = False) -> Tuple[List[Spans], OffsetMap]:
+        """
+        Suddivide l'intervallo in chunk, tagliando nei silenzi più vicini ai confini ideali.
+
+        Il lavoro avviene nel "tempo caricato" (l'audio effettivamente inviato, senza i silenzi
+        esclusi); l'OffsetMap riporta ogni chunk agli intervalli della registrazione originale.
+
+        Args:
+            audio_handler (AudioHandler): L'handler da cui leggere i picchi.
+            start_sec (float): Secondo di inizio del ritaglio.
+            end_sec (float): Secondo di fine del ritaglio.
+            skip_silence (bool): Se True, i silenzi lunghi vengono esclusi dagli span.
+
+        Returns:
+            Tuple: (lista dei chunk, ognuno come lista di span originali; mappa degli offset).
+        """
+        if end_sec <= start_sec:
+            return [], OffsetMap([])
+
+        # 1. Analisi dell'energia. Un ritaglio che sta in un solo chunk e tiene i silenzi non ha tagli
+        # da spostare: nessuna analisi, quindi nessuna decodifica oltre a quella dell'export.
+        if skip_silence or end_sec - start_sec > self.chunk_seconds:
+            silences = self._find_silences(audio_handler, start_sec, end_sec)
+        else:
+            silences = []
+
+        # 2. Intervalli da inviare
+        if skip_silence:
+            spans = SilenceAnalyzer.speech_spans(start_sec, end_sec, silences)
+        else:
+            spans = [(start_sec, end_sec)]
+        offset_map = OffsetMap(spans)
+
+        # 3. Tagli greedy: ogni chunk dura al massimo chunk_seconds (tempo caricato)
+        candidates = self._cut_candidates(offset_map, silences)
+        chunks = []
+        cursor = 0.0
+        while offset_map.duration - cursor > 1e-3:
+            target = cursor + self.chunk_seconds
+            if target >= offset_map.duration:
+                cut = offset_map.duration
+            else:
+                cut = SilenceAnalyzer.snap_cut(target, candidates, SNAP_WINDOW_SEC, cursor)
+            chunks.append(offset_map.slice(cursor, cut))
+            cursor = cut
+
+        return chunks, offset_map
+
+    def _find_silences(self, audio_handler: Any, start_sec: float, end_sec: float) -> Spans:
+        """
+        Silenzi dell'intervallo, in secondi della registrazione originale.
+        Riusa la piramide dei picchi se disponibile, altrimenti analizza solo l'intervallo.
+        """
+        peaks, offset = audio_handler.get_range_peaks(start_sec, end_sec)
+        silences = self.silence_analyzer.find_silences(peaks, start_sec - offset, end_sec - offset)
+        return [(s + offset, e + offset) for s, e in silences]
+
+    @staticmethod
+    def _cut_candidates(offset_map: OffsetMap, silences: Spans) -> np.ndarray:
+        """
+        Punti di taglio candidati (tempo caricato): centro di ogni silenzio e giunzioni tra gli span.
+        """
+        candidates = {offset_map.to_upload((s + e) / 2) for s, e in silences}
+        candidates.update(float(t) for t in offset_map.upload_starts[1:])
+        return np.array(sorted(candidates))
+
+    def encode(self, audio_handler: Any, spans: Spans) -> List[Tuple[Spans, bytes]]:
+        """
+        Codifica un chunk e verifica la dimensione reale, dividendolo solo se supera il limite.
+
+        Args:
+            audio_handler (AudioHandler): L'handler da cui estrarre l'audio.
+            spans (Spans): Gli intervalli originali che compongono il chunk.
+
+        Returns:
+            List[Tuple[Spans, bytes]]: Una o più parti (span, byte codificati), in ordine.
+        """
+        data = audio_handler.encode_spans(spans, self.profile)
+        if len(data) <= self.max_bytes:
+            return [(spans, data)]
+
+        # Stima sbagliata (es. audio molto rumoroso in FLAC): dividiamo in due, tagliando in un silenzio
+        offset_map = OffsetMap(spans)
+        if offset_map.duration < 1.0:
+            raise ValueError("Impossibile ridurre il chunk sotto il limite di upload dell'API.")
+
+        silences = self._find_silences(audio_handler, spans[0][0], spans[-1][1])
+        half = offset_map.duration / 2
+        cut = SilenceAnalyzer.snap_cut(half, self._cut_candidates(offset_map, silences), half / 2, 0.0)
+
+        return (self.encode(audio_handler, offset_map.slice(0.0, cut)) +
+                self.encode(audio_handler, offset_map.slice(cut, offset_map.duration)))
@@ -0,0 +1,82 @@
+from typing import Dict, List, Optional
+
+
+class EncodingProfile:
+    """
+    Descrive come codificare i chunk da inviare all'API.
+
+    Il parlato non ha bisogno di stereo né di 44.1 kHz: Whisper lavora internamente a 16 kHz mono,
+    quindi ogni profilo ricampiona a 16 kHz mono. Questo riduce sia la dimensione dei file
+    sia il tempo CPU speso dall'encoder.
+    """
+
+    def __init__(self, name: str, format: str, codec: str, extension: str,
+                 bitrate: Optional[str], bytes_per_second: float,
+                 sample_rate: int = 16000, channels: int = 1):
+        """
+        Inizializza il profilo.
+
+        Args:
+            name (str): Nome breve del profilo (es. "mp3").
+            format (str): Il muxer FFmpeg di output (es. "mp3", "ogg", "flac").
+            codec (str): Il codec FFmpeg (es. "libmp3lame").
+            extension (str): Estensione usata nel nome del file inviato all'API.
+            bitrate (str, optional): Bitrate dell'encoder (None per i codec lossless).
+            bytes_per_second (float): Stima della dimensione prodotta, usata dal pianificatore.
+            sample_rate (int): Frequenza di campionamento di output.
+            channels (int): Numero di canali di output.
+        """
+        self.name = name
+        self.format = format
+        self.codec = codec
+        self.extension = extension
+        self.bitrate = bitrate
+        self.bytes_per_second = bytes_per_second
+        self.sample_rate = sample_rate
+        self.channels = channels
+
+    def ffmpeg_output_args(self) -> List[str]:
+        """
+        Restituisce gli argomenti di output di FFmpeg per questo profilo.
+
+        Returns:
+            List[str]: Argomenti da inserire prima della destinazione.
+        """
+        args = ["-ac", str(self.channels), "-ar", str(self.sample_rate), "-c:a", self.codec]
+        if self.bitrate:
+            args += ["-b:a", self.bitrate]
+        return args + ["-f", self.format]
+
+    def describe(self) -> str:
+        """Descrizione leggibile del profilo, per i log."""
+        quality = self.bitrate or "lossless"
+        return f"{self.name} {quality} {'mono' if self.channels == 1 else 'stereo'} {self.sample_rate // 1000} kHz"
+
+
+# Profili disponibili. Le stime di bytes_per_second includono un piccolo margine per l'overhead del container.
+PROFILES: Dict[str, EncodingProfile] = {
+    "mp3": EncodingProfile("mp3", "mp3", "libmp3lame", "mp3", "64k", 64000 / 8 * 1.02),
+    "opus": EncodingProfile("opus", "ogg", "libopus", "ogg", "32k", 32000 / 8 * 1.05),
+    "flac": EncodingProfile("flac", "flac", "flac", "flac", None, 16000 * 2 * 0.65),
+}
+
+DEFAULT_PROFILE = "mp3"
+
+
+def get_profile(name: str) -> EncodingProfile:
+    """
+    Restituisce il profilo di codifica con il nome indicato.
+
+    Args:
+        name (str): Il nome del profilo (vedi PROFILES).
+
+    Returns:
+        EncodingProfile: Il profilo richiesto.
+
+    Raises:
+        ValueError: Se il profilo non esiste.
+    """
+    try:
+        return PROFILES[name]
+    except KeyError:
+        raise ValueError(f"Profilo di codifica sconosciuto: {name} (disponibili: {', '.join(PROFILES)})")
@@ -0,0 +1,142 @@
+import hashlib
+import json
+import os
+from typing import Any, Dict, List, Optional, Tuple
+
+from utils import utils
+
+# Dimensione dei blocchi letti dalla fine del file per cercare l'ultima riga completa
+TAIL_BLOCK_BYTES = 64 * 1024
+
+
+class JobJournal:
+    """
+    Diario (journal) di un lavoro di trascrizione, per riprenderlo dopo un'interruzione.
+
+    È un file JSON Lines: la prima riga descrive il lavoro (sorgente, intervallo, piano dei chunk),
+    ogni riga successiva registra un chunk completato con il suo testo e i suoi segmenti
+    temporizzati. Ogni scrittura viene forzata su disco, quindi un crash o un'interruzione
+    di rete costano al massimo un chunk.
+    Al termine del lavoro il journal viene eliminato.
+    """
+
+    def __init__(self, job_id: str, folder: Optional[str] = None):
+        """
+        Inizializza il journal di un lavoro.
+
+        Args:
+            job_id (str): Identificativo del lavoro (vedi make_job_id).
+            folder (str, optional): Cartella dei journal (default: Cache/jobs).
+        """
+        self.job_id = job_id
+        self.path = os.path.join(folder or utils.get_cache_folder("jobs"), f"{job_id}.jsonl")
+        self._file = None
+
+    @staticmethod
+    def make_job_id(**params: Any) -> str:
+        """
+        Calcola l'identificativo di un lavoro a partire dai parametri che ne determinano il risultato.
+
+        Args:
+            **params: Sorgente audio, intervallo, profilo di codifica, modello, ecc.
+
+        Returns:
+            str: L'identificativo esadecimale (SHA-1).
+        """
+        return hashlib.sha1(json.dumps(params, sort_keys=True).encode()).hexdigest()
+
+    def load(self) -> Optional[Tuple[Dict[str, Any], Dict[int, Tuple[str, List[List[Any]]]]]]:
+        """
+        Legge un journal lasciato da un'esecuzione interrotta.
+
+        Returns:
+            Tuple: (intestazione del lavoro, {indice chunk: (testo, segmenti)}), oppure None se non esiste.
+        """
+        if not os.path.exists(self.path):
+            return None
+
+        header = None
+        done: Dict[int, Tuple[str, List[List[Any]]]] = {}
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    # Ultima riga troncata da un crash durante la scrittura: la ignoriamo
+                    continue
+                if record.get("type") == "job":
+                    header = record
+                elif record.get("type") == "chunk":
+                    done[record["index"]] = (record["text"], record.get("segments", []))
+
+        if header is None:
+            return None
+
+        return header, done
+
+    def start(self, header: Dict[str, Any], resume: bool = False):
+        """
+        Apre il journal in scrittura.
+
+        Args:
+            header (Dict[str, Any]): Descrizione del lavoro (scritta solo per un nuovo journal).
+            resume (bool): Se True, aggiunge in coda al journal esistente invece di ricrearlo.
+        """
+        if resume:
+            self._truncate_partial_line()
+        self._file = open(self.path, "a" if resume else "w", encoding="utf-8")
+        if not resume:
+            self._write({"type": "job", **header})
+
+    def _truncate_partial_line(self):
+        """
+        Elimina l'eventuale ultima riga troncata da un crash: altrimenti il record successivo
+        verrebbe accodato sulla stessa riga e andrebbe perso alla ripresa seguente.
+        """
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, "rb+") as f:
+            # Si legge all'indietro dalla fine a blocchi: il journal di un lavoro lungo può essere grande
+            size = f.seek(0, os.SEEK_END)
+            end = size
+            while end > 0:
+                start = max(0, end - TAIL_BLOCK_BYTES)
+                f.seek(start)
+                newline = f.read(end - start).rfind(b"\n")
+                if newline >= 0:
+                    complete = start + newline + 1
+                    break
+                end = start
+            else:
+                complete = 0
+            if complete < size:
+                f.truncate(complete)
+
+    def record_chunk(self, index: int, text: str, segments: Optional[List[List[Any]]] = None):
+        """
+        Registra un chunk completato.
+
+        Args:
+            index (int): Indice del chunk.
+            text (str): Il testo trascritto.
+            segments (List, optional): I segmenti [inizio, fine, testo], già nel tempo dell'originale.
+        """
+        self._write({"type": "chunk", "index": index, "text": text, "segments": segments or []})
+
+    def _write(self, record: Dict[str, Any]):
+        """Aggiunge un record e lo forza su disco."""
+        self._file.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def close(self):
+        """Chiude il file del journal (che resta su disco per una futura ripresa)."""
+        if self._file:
+            self._file.close()
+            self._file = None
+
+    def finish(self):
+        """Chiude ed elimina il journal: il lavoro è completo."""
+        self.close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
@@ -0,0 +1,223 @@
+import itertools
+import os
+import threading
+from typing import Any, Callable, Dict, List, Optional
+
+from backend.AudioHandler import AudioHandler
+from backend.PipelineMetrics import PipelineMetrics
+from backend.PriorityExecutor import PriorityExecutor
+from backend.Transcriber import DEFAULT_MAX_WORKERS, Transcriber
+
+# Stati possibili di un lavoro
+STATUS_QUEUED = "in coda"
+STATUS_RUNNING = "in corso"
+STATUS_DONE = "completato"
+STATUS_FAILED = "errore"
+STATUS_CANCELLED = "annullato"
+
+# Numero di lavori elaborati contemporaneamente. Con 2 lavori, mentre uno attende l'API
+# l'altro può già analizzare e codificare il proprio audio.
+DEFAULT_PARALLEL_JOBS = 2
+
+
+class TranscriptionJob:
+    """
+    Un file da trascrivere, con il proprio intervallo di ritaglio e le proprie opzioni.
+    """
+
+    _ids = itertools.count(1)
+
+    def __init__(self, filepath: str, start_sec: float, end_sec: Optional[float], output_name: str,
+                 options: Optional[Dict[str, Any]] = None, priority: int = 0):
+        """
+        Inizializza il lavoro.
+
+        Args:
+            filepath (str): Il percorso del file audio.
+            start_sec (float): Secondo di inizio del ritaglio.
+            end_sec (float, optional): Secondo di fine del ritaglio (None: fino alla fine del file).
+            output_name (str): Il nome del file di output nella libreria.
+            options (Dict[str, Any], optional): Opzioni extra per Transcriber.process_audio
+                                                (es. skip_silence, encoding_profile).
+            priority (int): Priorità (i valori più alti vengono eseguiti prima).
+        """
+        self.id = next(self._ids)
+        self.filepath = filepath
+        self.start_sec = start_sec
+        self.end_sec = end_sec
+        self.output_name = output_name
+        self.options = options or {}
+        self.priority = priority
+
+        self.status = STATUS_QUEUED
+        self.progress = 0.0
+        self.message = ""
+        self.cancel_event = threading.Event()
+        # Tempi per fase dell'esecuzione (disponibili quando il lavoro è avviato)
+        self.metrics: Optional[PipelineMetrics] = None
+
+    @property
+    def name(self) -> str:
+        """Nome breve del lavoro, per l'interfaccia."""
+        return self.output_name or os.path.basename(self.filepath)
+
+
+class JobScheduler:
+    """
+    Coda di lavori di trascrizione eseguiti in background.
+
+    I lavori vengono prelevati in ordine di priorità (a parità di priorità, nell'ordine della coda)
+    da un numero fisso di thread dispatcher. Tutti i lavori condividono lo stesso pool di thread
+    per i chunk e lo stesso Transcriber (quindi lo stesso RequestController e la stessa cache):
+    i worker restano occupati senza superare i limiti dell'API. Anche la coda del pool è ordinata
+    per priorità, così i chunk di un lavoro prioritario non attendono quelli già accodati dagli altri.
+    """
+
+    def __init__(self, api_key: str, transcriber: Optional[Transcriber] = None,
+                 parallel_jobs: int = DEFAULT_PARALLEL_JOBS, chunk_workers: int = DEFAULT_MAX_WORKERS,
+                 on_update: Optional[Callable[[TranscriptionJob], None]] = None,
+                 on_log: Optional[Callable[[TranscriptionJob, str], None]] = None):
+        """
+        Inizializza lo scheduler e avvia i thread dispatcher.
+
+        Args:
+            api_key (str): La chiave API per autenticarsi su Groq.
+            transcriber (Transcriber, optional): Il transcriber condiviso (default: uno nuovo).
+            parallel_jobs (int): Numero di lavori eseguiti contemporaneamente.
+            chunk_workers (int): Dimensione del pool di thread condiviso per i chunk.
+            on_update (Callable, optional): Chiamata (da un thread di background) a ogni cambio di stato
+                                            o di avanzamento di un lavoro.
+            on_log (Callable, optional): Chiamata (da un thread di background) per ogni riga di log.
+        """
+        self.api_key = api_key
+        self.transcriber = transcriber or Transcriber()
+        self.on_update = on_update
+        self.on_log = on_log
+
+        self.jobs: List[TranscriptionJob] = []
+        self._condition = threading.Condition()
+        self._chunk_pool = PriorityExecutor(max_workers=chunk_workers, thread_name_prefix="chunk")
+
+        for n in range(parallel_jobs):
+            threading.Thread(target=self._dispatch_loop, name=f"job-dispatcher-{n}", daemon=True).start()
+
+    # --- GESTIONE DELLA CODA ---
+
+    def add_job(self, job: TranscriptionJob) -> TranscriptionJob:
+        """Aggiunge un lavoro in fondo alla coda."""
+        with self._condition:
+            self.jobs.append(job)
+            self._condition.notify()
+        self._notify(job)
+        return job
+
+    def move(self, job: TranscriptionJob, offset: int):
+        """
+        Sposta un lavoro nella coda (offset negativo = verso l'alto, cioè prima).
+
+        Args:
+            job (TranscriptionJob): Il lavoro da spostare.
+            offset (int): Numero di posizioni di cui spostarlo.
+        """
+        with self._condition:
+            if job not in self.jobs:
+                return
+            index = self.jobs.index(job)
+            new_index = max(0, min(len(self.jobs) - 1, index + offset))
+            self.jobs.insert(new_index, self.jobs.pop(index))
+        self._notify(job)
+
+    def set_priority(self, job: TranscriptionJob, priority: int):
+        """Imposta la priorità di un lavoro (ha effetto solo se è ancora in coda)."""
+        with self._condition:
+            job.priority = priority
+        self._notify(job)
+
+    def cancel(self, job: TranscriptionJob):
+        """
+        Annulla un lavoro: se è in coda non verrà eseguito, se è in corso si ferma al prossimo chunk.
+        """
+        with self._condition:
+            job.cancel_event.set()
+            if job.status == STATUS_QUEUED:
+                job.status = STATUS_CANCELLED
+        self._notify(job)
+
+    def remove_finished(self) -> List[TranscriptionJob]:
+        """
+        Rimuove dalla lista i lavori conclusi (completati, falliti o annullati).
+
+        Returns:
+            List[TranscriptionJob]: I lavori rimossi (es. per eliminarne le righe dall'interfaccia).
+        """
+        with self._condition:
+            removed = [j for j in self.jobs if j.status not in (STATUS_QUEUED, STATUS_RUNNING)]
+            self.jobs = [j for j in self.jobs if j.status in (STATUS_QUEUED, STATUS_RUNNING)]
+        return removed
+
+    def _next_job(self) -> TranscriptionJob:
+        """Attende e restituisce il prossimo lavoro da eseguire (priorità più alta, poi ordine in coda)."""
+        with self._condition:
+            while True:
+                queued = [j for j in self.jobs if j.status == STATUS_QUEUED]
+                if queued:
+                    # max() restituisce il primo a parità di priorità, cioè il primo in coda
+                    job = max(queued, key=lambda j: j.priority)
+                    job.status = STATUS_RUNNING
+                    return job
+                self._condition.wait()
+
+    # --- ESECUZIONE ---
+
+    def _dispatch_loop(self):
+        """Ciclo di un thread dispatcher: preleva un lavoro alla volta e lo esegue."""
+        while True:
+            job = self._next_job()
+            self._notify(job)
+            self._run_job(job)
+
+    def _run_job(self, job: TranscriptionJob):
+        """Esegue un singolo lavoro con un AudioHandler dedicato."""
+        def progress(value: float):
+            job.progress = value
+            self._notify(job)
+
+        def log(text: str):
+            job.message = text.strip().splitlines()[-1] if text.strip() else job.message
+            if self.on_log:
+                self.on_log(job, text)
+
+        job.metrics = PipelineMetrics(job.name)
+        try:
+            # Ogni lavoro ha il proprio handler: più file possono essere aperti contemporaneamente.
+            # I picchi già calcolati per l'anteprima arrivano dalla cache, senza nuova decodifica.
+            # In streaming i chunk vengono estratti dal file con un seek: nessuna decodifica completa.
+            handler = AudioHandler()
+            duration = handler.load_file(job.filepath, streaming=True)
+            end_sec = duration if job.end_sec is None else job.end_sec
+
+            self.transcriber.process_audio(
+                handler, job.start_sec, end_sec, self.api_key,
+                output_filename=job.output_name,
+                progress_callback=progress,
+                text_callback=log,
+                executor=self._chunk_pool.view(lambda: job.priority),
+                cancel_event=job.cancel_event,
+                metrics=job.metrics,
+                **job.options
+            )
+            job.status = STATUS_DONE
+            job.progress = 1.0
+        except InterruptedError:
+            job.status = STATUS_CANCELLED
+        except Exception as e:
+            job.status = STATUS_FAILED
+            job.message = str(e)
+            log(f"❌ ERRORE: {e}")
+
+        self._notify(job)
+
+    def _notify(self, job: TranscriptionJob):
+        """Notifica l'interfaccia di un cambiamento (il callback deve essere thread-safe)."""
+        if self.on_update:
+            self.on_update(job)
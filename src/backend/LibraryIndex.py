@@ -0,0 +1,474 @@
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional, Set, Tuple
+
+from utils import utils
+
+# Nome del database dell'indice, dentro la cartella della libreria (nascosto: inizia con ".")
+INDEX_FILENAME = ".index.sqlite"
+
+# Ordine in cui mostrare i formati disponibili di una trascrizione
+FORMAT_ORDER = ["txt", "pdf", "docx", "srt", "vtt"]
+
+# Delimitatori delle parole trovate negli estratti di ricerca (caratteri di controllo: non compaiono nei testi)
+HIGHLIGHT_START = "\x02"
+HIGHLIGHT_END = "\x03"
+
+# Numero di parole (circa) di ogni estratto di ricerca
+SNIPPET_TOKENS = 16
+
+# File aggiornati per ogni acquisizione del lock durante una sincronizzazione: tra un blocco e l'altro
+# le letture dell'interfaccia (lista, ricerca) non devono attendere la rilettura di tutta la cartella
+SYNC_BATCH_FILES = 50
+
+
+class LibraryEntry:
+    """
+    Una trascrizione della libreria con tutte le sue varianti di formato (stesso nome, estensioni diverse).
+    """
+
+    def __init__(self, folder: str, stem: str, mtime: float, size: int, formats: List[str],
+                 duration: Optional[float] = None, source_hash: Optional[str] = None,
+                 source_path: Optional[str] = None):
+        """
+        Inizializza la voce.
+
+        Args:
+            folder (str): La cartella della libreria.
+            stem (str): Il nome della trascrizione, senza estensione.
+            mtime (float): Ultima modifica (timestamp) tra tutte le varianti.
+            size (int): Dimensione in byte del file principale.
+            formats (List[str]): Le estensioni presenti (es. ["txt", "pdf"]).
+            duration (float, optional): Durata dell'audio trascritto (secondi), se nota.
+            source_hash (str, optional): Impronta del file audio di origine, se nota.
+            source_path (str, optional): Percorso del file audio di origine, se noto.
+        """
+        self.folder = folder
+        self.stem = stem
+        self.mtime = mtime
+        self.size = size
+        self.formats = formats
+        self.duration = duration
+        self.source_hash = source_hash
+        self.source_path = source_path
+
+    @property
+    def main_format(self) -> str:
+        """Il formato principale: il .txt se esiste, altrimenti la prima variante."""
+        return "txt" if "txt" in self.formats else self.formats[0]
+
+    @property
+    def main_path(self) -> str:
+        """Il percorso del file principale."""
+        return self.path(self.main_format)
+
+    def path(self, extension: str) -> str:
+        """Il percorso della variante con l'estensione indicata."""
+        return os.path.join(self.folder, f"{self.stem}.{extension}" if extension else self.stem)
+
+
+class LibraryIndex:
+    """
+    Indice persistente (SQLite) della cartella 'Sbobinature'.
+
+    Invece di rileggere la cartella e fare uno stat per ogni file a ogni aggiornamento,
+    l'indice conserva nome, data di modifica e dimensione di ogni file, più i metadati
+    delle trascrizioni (durata, impronta dell'audio di origine) che dal solo file non si ricavano.
+    L'aggiornamento è incrementale:
+    - se la data di modifica della cartella non è cambiata, non c'è nulla da fare (un solo stat);
+    - altrimenti si confronta la cartella con l'indice e si aggiornano solo le righe cambiate.
+    Le modifiche al contenuto di un file esistente non cambiano la data della cartella: chi scrive
+    nella libreria (Transcriber, export) lo segnala con update_file, oppure serve una sincronizzazione completa.
+
+    Ogni modifica riceve un numero di sequenza crescente: l'interfaccia chiede solo le trascrizioni
+    cambiate dopo l'ultima sequenza vista (changes_since), anche se a scriverle è stato un altro thread
+    o un'altra istanza dell'indice (la sequenza è assegnata dal database, vedi _next_seq).
+
+    Il contenuto dei .txt è indicizzato in una tabella FTS5 (indice invertito): la ricerca a testo
+    pieno non apre nessun file. Un .txt viene riletto solo quando cambia.
+    """
+
+    def __init__(self, folder: Optional[str] = None, db_path: Optional[str] = None):
+        """
+        Inizializza l'indice aprendo (o creando) il database.
+
+        Args:
+            folder (str, optional): La cartella della libreria (default: 'Sbobinature').
+            db_path (str, optional): Percorso del database (default: <folder>/.index.sqlite).
+        """
+        self.folder = folder or utils.get_transcripts_folder()
+        self.db_path = db_path or os.path.join(self.folder, INDEX_FILENAME)
+        # Una sola connessione condivisa tra i thread (UI e lavori in background), protetta da un lock
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS files ("
+            " filename TEXT PRIMARY KEY,"
+            " stem TEXT NOT NULL,"
+            " ext TEXT NOT NULL,"
+            " mtime_ns INTEGER NOT NULL,"
+            " size INTEGER NOT NULL,"
+            " seq INTEGER NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_files_stem ON files(stem)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_files_seq ON files(seq)")
+        # Trascrizioni eliminate (per notificare la rimozione a chi aggiorna in modo incrementale)
+        self._conn.execute("CREATE TABLE IF NOT EXISTS removed (stem TEXT PRIMARY KEY, seq INTEGER NOT NULL)")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS transcripts ("
+            " stem TEXT PRIMARY KEY,"
+            " duration REAL,"
+            " source_hash TEXT,"
+            " source_path TEXT,"
+            " created REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE TABLE IF NOT EXISTS state (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        # Export generati: da quale versione del .txt (data, dimensione, hash del contenuto)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS exports ("
+            " output TEXT PRIMARY KEY,"
+            " source_mtime_ns INTEGER NOT NULL,"
+            " source_size INTEGER NOT NULL,"
+            " source_hash TEXT NOT NULL)"
+        )
+
+        # Ricerca a testo pieno: ogni trascrizione ha un docid stabile, usato come rowid nella tabella FTS5
+        # (cancellare per rowid è immediato, per una colonna UNINDEXED richiederebbe una scansione completa)
+        self._conn.execute("CREATE TABLE IF NOT EXISTS docs (docid INTEGER PRIMARY KEY, stem TEXT UNIQUE NOT NULL)")
+        fts_exists = self._conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'fts'").fetchone()
+        if not fts_exists:
+            self._conn.execute(
+                "CREATE VIRTUAL TABLE fts USING fts5(title, body, tokenize = 'unicode61 remove_diacritics 2')"
+            )
+            # Indice creato da una versione senza ricerca: i file verranno riletti alla prossima sincronizzazione
+            self._conn.execute("DELETE FROM files")
+            self._conn.execute("DELETE FROM state WHERE key = 'folder_mtime'")
+        self._conn.commit()
+
+    # --- SINCRONIZZAZIONE ---
+
+    def folder_mtime(self) -> int:
+        """Data di modifica (ns) della cartella: cambia quando un file viene creato, rinominato o eliminato."""
+        return os.stat(self.folder).st_mtime_ns
+
+    def has_changes(self) -> bool:
+        """True se la cartella è cambiata dall'ultima sincronizzazione (costo: un solo stat)."""
+        with self._lock:
+            return self._get_state("folder_mtime") != str(self.folder_mtime())
+
+    def sync(self, full: bool = False) -> bool:
+        """
+        Allinea l'indice alla cartella.
+
+        Args:
+            full (bool): Se True, confronta tutti i file anche se la cartella non risulta modificata
+                         (rileva anche le modifiche al contenuto fatte da programmi esterni).
+
+        Returns:
+            bool: True se almeno un file è stato aggiunto, modificato o eliminato.
+        """
+        # La data va letta prima della scansione: un file creato durante la scansione
+        # verrà rilevato alla sincronizzazione successiva
+        folder_mtime = str(self.folder_mtime())
+        with self._lock:
+            if not full and self._get_state("folder_mtime") == folder_mtime:
+                return False
+            known = {name: (mtime, size) for name, mtime, size
+                     in self._conn.execute("SELECT filename, mtime_ns, size FROM files")}
+
+        current: Dict[str, Tuple[int, int]] = {}
+        with os.scandir(self.folder) as it:
+            for entry in it:
+                # Filtra file di sistema (es. .DS_Store su Mac) e l'indice stesso
+                if entry.name.startswith(".") or not entry.is_file():
+                    continue
+                stat = entry.stat()
+                current[entry.name] = (stat.st_mtime_ns, stat.st_size)
+
+        stale = [name for name, info in current.items() if known.get(name) != info]
+        stale += [name for name in known if name not in current]
+
+        # Il lock viene rilasciato tra un blocco e l'altro: ogni file viene riletto dal disco
+        # sotto il lock, così una scrittura di un altro thread nel frattempo non viene sovrascritta
+        for i in range(0, len(stale), SYNC_BATCH_FILES):
+            with self._lock:
+                for name in stale[i:i + SYNC_BATCH_FILES]:
+                    self._refresh_file(name)
+                self._conn.commit()
+
+        with self._lock:
+            self._set_state("folder_mtime", folder_mtime)
+            self._conn.commit()
+
+        return bool(stale)
+
+    def update_file(self, path: str):
+        """
+        Aggiorna subito la riga di un file della libreria (da chiamare dopo averlo scritto).
+
+        Args:
+            path (str): Il percorso del file; i file fuori dalla libreria vengono ignorati.
+        """
+        if not self._in_library(path):
+            return
+        with self._lock:
+            self._refresh_file(os.path.basename(path))
+            self._conn.commit()
+
+    def record_transcript(self, path: str, duration: Optional[float] = None, source_hash: Optional[str] = None,
+                          source_path: Optional[str] = None):
+        """
+        Salva i metadati di una trascrizione appena completata e aggiorna la riga del suo file.
+
+        Args:
+            path (str): Il percorso del file di testo; i file fuori dalla libreria vengono ignorati.
+            duration (float, optional): Durata dell'audio trascritto (secondi).
+            source_hash (str, optional): Impronta del file audio di origine.
+            source_path (str, optional): Percorso del file audio di origine.
+        """
+        if not self._in_library(path):
+            return
+        stem = _split_name(os.path.basename(path))[0]
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO transcripts (stem, duration, source_hash, source_path, created)"
+                " VALUES (?, ?, ?, ?, ?)",
+                (stem, duration, source_hash, source_path, time.time())
+            )
+            self._conn.commit()
+        self.update_file(path)
+
+    def record_export(self, output_path: str, source_mtime_ns: int, source_size: int, source_hash: str):
+        """
+        Registra da quale versione del .txt è stato generato un export.
+
+        Args:
+            output_path (str): Il file esportato (es. .pdf o .docx).
+            source_mtime_ns (int): Data di modifica del .txt esportato.
+            source_size (int): Dimensione del .txt esportato.
+            source_hash (str): Hash del contenuto del .txt esportato.
+        """
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO exports (output, source_mtime_ns, source_size, source_hash) VALUES (?, ?, ?, ?)",
+                (os.path.basename(output_path), source_mtime_ns, source_size, source_hash)
+            )
+            self._conn.commit()
+
+    def get_export(self, output_path: str) -> Optional[Tuple[int, int, str]]:
+        """
+        Restituisce la versione del .txt da cui è stato generato un export.
+
+        Returns:
+            Tuple[int, int, str]: (data di modifica, dimensione, hash) del .txt, oppure None se non registrato.
+        """
+        with self._lock:
+            return self._conn.execute(
+                "SELECT source_mtime_ns, source_size, source_hash FROM exports WHERE output = ?",
+                (os.path.basename(output_path),)
+            ).fetchone()
+
+    # --- LETTURA ---
+
+    def search(self, text: str, limit: int = 50) -> List[Tuple[str, str, float]]:
+        """
+        Cerca nel contenuto (e nel nome) di tutte le trascrizioni.
+
+        Le parole vengono cercate tutte (AND), l'ultima anche come prefisso (ricerca mentre si digita);
+        maiuscole e accenti vengono ignorati. I risultati sono ordinati per rilevanza (BM25),
+        con il nome che pesa più del contenuto.
+
+        Args:
+            text (str): Il testo cercato, così come digitato dall'utente.
+            limit (int): Numero massimo di risultati.
+
+        Returns:
+            List[Tuple[str, str, float]]: (nome della trascrizione, estratto con le parole trovate racchiuse
+                                           tra HIGHLIGHT_START e HIGHLIGHT_END, punteggio: più basso = più rilevante).
+        """
+        query = _fts_query(text)
+        if not query:
+            return []
+        with self._lock:
+            return self._conn.execute(
+                "SELECT d.stem, snippet(fts, 1, ?, ?, '…', ?), bm25(fts, 5.0, 1.0) AS score "
+                "FROM fts JOIN docs d ON d.docid = fts.rowid "
+                "WHERE fts MATCH ? ORDER BY score LIMIT ?",
+                (HIGHLIGHT_START, HIGHLIGHT_END, SNIPPET_TOKENS, query, limit)
+            ).fetchall()
+
+    def changes_since(self, seq: int) -> Tuple[Set[str], Set[str], int]:
+        """
+        Restituisce le trascrizioni cambiate dopo una certa sequenza.
+
+        Args:
+            seq (int): L'ultima sequenza già vista (0 per avere tutto).
+
+        Returns:
+            Tuple[Set[str], Set[str], int]: Nomi delle trascrizioni aggiunte o modificate, nomi di quelle
+                                            eliminate e la sequenza attuale (da passare alla prossima chiamata).
+        """
+        with self._lock:
+            current = int(self._get_state("seq") or 0)
+            changed = {row[0] for row in self._conn.execute("SELECT DISTINCT stem FROM files WHERE seq > ?", (seq,))}
+            removed = {row[0] for row in self._conn.execute(
+                "SELECT stem FROM removed WHERE seq > ? AND stem NOT IN (SELECT stem FROM files)", (seq,))}
+        return changed, removed, current
+
+    def entries(self, stems: Optional[Set[str]] = None) -> List[LibraryEntry]:
+        """
+        Restituisce le trascrizioni indicizzate, dalla più recente alla più vecchia.
+
+        Args:
+            stems (Set[str], optional): Se indicato, solo le trascrizioni con questi nomi.
+        """
+        if stems is not None and len(stems) <= 32:
+            # Pochi nomi (il caso tipico di un aggiornamento incrementale): una query per nome
+            found = [entry for entry in map(self.get, stems) if entry]
+            return sorted(found, key=lambda entry: entry.mtime, reverse=True)
+
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT f.stem, MAX(f.mtime_ns), group_concat(f.ext || ':' || f.size), "
+                "       t.duration, t.source_hash, t.source_path "
+                "FROM files f LEFT JOIN transcripts t ON t.stem = f.stem "
+                "GROUP BY f.stem ORDER BY MAX(f.mtime_ns) DESC"
+            ).fetchall()
+        return [self._make_entry(*row) for row in rows if stems is None or row[0] in stems]
+
+    def get(self, stem: str) -> Optional[LibraryEntry]:
+        """Restituisce una singola trascrizione, oppure None se non è (più) nell'indice."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT f.stem, MAX(f.mtime_ns), group_concat(f.ext || ':' || f.size), "
+                "       t.duration, t.source_hash, t.source_path "
+                "FROM files f LEFT JOIN transcripts t ON t.stem = f.stem WHERE f.stem = ? GROUP BY f.stem",
+                (stem,)
+            ).fetchone()
+        return self._make_entry(*row) if row else None
+
+    def find_by_source(self, source_hash: str) -> List[LibraryEntry]:
+        """
+        Restituisce le trascrizioni ricavate da un file audio, dalla più recente.
+
+        Args:
+            source_hash (str): L'impronta del file audio di origine.
+        """
+        with self._lock:
+            stems = [row[0] for row in self._conn.execute(
+                "SELECT stem FROM transcripts WHERE source_hash = ? ORDER BY created DESC", (source_hash,))]
+        return [entry for entry in map(self.get, stems) if entry]
+
+    def _make_entry(self, stem: str, mtime_ns: int, variants: str, duration: Optional[float],
+                    source_hash: Optional[str], source_path: Optional[str]) -> LibraryEntry:
+        sizes = dict(variant.rsplit(":", 1) for variant in variants.split(","))
+        formats = sorted(sizes, key=lambda ext: (FORMAT_ORDER.index(ext) if ext in FORMAT_ORDER
+                                                 else len(FORMAT_ORDER), ext))
+        main = "txt" if "txt" in sizes else formats[0]
+        return LibraryEntry(self.folder, stem, mtime_ns / 1e9, int(sizes[main]), formats,
+                            duration, source_hash, source_path)
+
+    # --- SUPPORTO ---
+
+    def _next_seq(self) -> int:
+        """
+        Assegna il prossimo numero di sequenza. Da chiamare con il lock acquisito.
+
+        Il lock protegge solo questa connessione, ma GUI, Transcriber ed export aprono ciascuno
+        il proprio indice sullo stesso database: l'incremento viene quindi fatto da SQLite.
+        L'UPDATE acquisisce il lock di scrittura del database prima della lettura, che resta
+        nella stessa transazione: nessun'altra connessione può leggere lo stesso valore.
+        """
+        self._conn.execute("INSERT OR IGNORE INTO state (key, value) VALUES ('seq', '0')")
+        self._conn.execute("UPDATE state SET value = CAST(value AS INTEGER) + 1 WHERE key = 'seq'")
+        return int(self._get_state("seq"))
+
+    def _refresh_file(self, name: str):
+        """Allinea la riga di un file al suo stato su disco. Da chiamare con il lock acquisito."""
+        try:
+            stat = os.stat(os.path.join(self.folder, name))
+        except FileNotFoundError:
+            if self._conn.execute("SELECT 1 FROM files WHERE filename = ?", (name,)).fetchone():
+                self._delete_file(name)
+        else:
+            self._upsert_file(name, stat.st_mtime_ns, stat.st_size)
+
+    def _upsert_file(self, name: str, mtime_ns: int, size: int):
+        """Inserisce o aggiorna la riga di un file. Da chiamare con il lock acquisito."""
+        stem, ext = _split_name(name)
+        self._conn.execute(
+            "INSERT OR REPLACE INTO files (filename, stem, ext, mtime_ns, size, seq) VALUES (?, ?, ?, ?, ?, ?)",
+            (name, stem, ext, mtime_ns, size, self._next_seq())
+        )
+        self._conn.execute("DELETE FROM removed WHERE stem = ?", (stem,))
+        if ext == "txt":
+            self._index_text(stem, os.path.join(self.folder, name))
+
+    def _index_text(self, stem: str, path: str):
+        """(Re)indicizza il contenuto di un .txt per la ricerca. Da chiamare con il lock acquisito."""
+        try:
+            with open(path, "r", encoding="utf-8", errors="replace") as f:
+                body = f.read()
+        except OSError:
+            return
+        self._conn.execute("INSERT OR IGNORE INTO docs (stem) VALUES (?)", (stem,))
+        docid = self._conn.execute("SELECT docid FROM docs WHERE stem = ?", (stem,)).fetchone()[0]
+        self._conn.execute("DELETE FROM fts WHERE rowid = ?", (docid,))
+        self._conn.execute("INSERT INTO fts (rowid, title, body) VALUES (?, ?, ?)", (docid, stem, body))
+
+    def _unindex_text(self, stem: str):
+        """Rimuove una trascrizione dall'indice di ricerca. Da chiamare con il lock acquisito."""
+        row = self._conn.execute("SELECT docid FROM docs WHERE stem = ?", (stem,)).fetchone()
+        if row:
+            self._conn.execute("DELETE FROM fts WHERE rowid = ?", row)
+            self._conn.execute("DELETE FROM docs WHERE docid = ?", row)
+
+    def _delete_file(self, name: str):
+        """Elimina la riga di un file e registra la modifica della trascrizione. Da chiamare con il lock acquisito."""
+        stem, ext = _split_name(name)
+        self._conn.execute("DELETE FROM files WHERE filename = ?", (name,))
+        if ext == "txt":
+            self._unindex_text(stem)
+        else:
+            self._conn.execute("DELETE FROM exports WHERE output = ?", (name,))
+        seq = self._next_seq()
+        if self._conn.execute("SELECT 1 FROM files WHERE stem = ? LIMIT 1", (stem,)).fetchone():
+            # Resta almeno una variante: la trascrizione è cambiata, non eliminata
+            self._conn.execute("UPDATE files SET seq = ? WHERE stem = ?", (seq, stem))
+        else:
+            self._conn.execute("DELETE FROM transcripts WHERE stem = ?", (stem,))
+            self._conn.execute("INSERT OR REPLACE INTO removed (stem, seq) VALUES (?, ?)", (stem, seq))
+
+    def _in_library(self, path: str) -> bool:
+        return os.path.dirname(os.path.abspath(path)) == os.path.abspath(self.folder)
+
+    def _get_state(self, key: str) -> Optional[str]:
+        row = self._conn.execute("SELECT value FROM state WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def _set_state(self, key: str, value: str):
+        self._conn.execute("INSERT OR REPLACE INTO state (key, value) VALUES (?, ?)", (key, value))
+
+
+def _fts_query(text: str) -> str:
+    """
+    Converte il testo digitato in una query FTS5 sicura: ogni parola tra virgolette
+    (nessun operatore interpretato), l'ultima anche come prefisso.
+    """
+    words = re.findall(r"\w+", text)
+    if not words:
+        return ""
+    terms = [f'"{word}"' for word in words]
+    terms[-1] += "*"
+    return " ".join(terms)
+
+
+def _split_name(filename: str) -> Tuple[str, str]:
+    """Divide un nome file in (nome senza estensione, estensione in minuscolo senza punto)."""
+    stem, ext = os.path.splitext(filename)
+    return stem, ext[1:].lower()
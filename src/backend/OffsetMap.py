@@ -0,0 +1,94 @@
+import numpy as np
+from typing import List, Tuple
+
+# Durata minima (secondi) di uno span: sotto questa soglia si tratta solo di errore di arrotondamento
+# (es. un taglio che cade esattamente sul bordo di uno span) e lo span viene scartato.
+MIN_SPAN_SEC = 1e-3
+
+
+class OffsetMap:
+    """
+    Mappa tra il tempo dell'audio caricato sull'API e il tempo della registrazione originale.
+
+    Quando i silenzi lunghi vengono rimossi, l'audio inviato è la concatenazione di più
+    intervalli (span) dell'originale. La mappa memorizza, per ogni span, dove inizia
+    nell'audio caricato e dove inizia nell'originale: la conversione è una ricerca binaria.
+    """
+
+    def __init__(self, spans: List[Tuple[float, float]]):
+        """
+        Costruisce la mappa a partire dagli intervalli mantenuti.
+
+        Args:
+            spans (List[Tuple[float, float]]): Intervalli (inizio, fine) in secondi dell'originale,
+                                               ordinati e non sovrapposti.
+        """
+        self.spans = [(float(s), float(e)) for s, e in spans if e - s >= MIN_SPAN_SEC]
+        lengths = np.array([e - s for s, e in self.spans], dtype=np.float64)
+
+        self.original_starts = np.array([s for s, _ in self.spans], dtype=np.float64)
+        # Inizio di ogni span nel tempo dell'audio caricato (somma cumulativa delle lunghezze)
+        self.upload_starts = np.concatenate(([0.0], np.cumsum(lengths)[:-1])) if len(lengths) else lengths
+        self.duration = float(lengths.sum())
+
+    def to_original(self, upload_sec: float) -> float:
+        """
+        Converte un istante dell'audio caricato nel corrispondente istante dell'originale.
+
+        Args:
+            upload_sec (float): Tempo in secondi relativo all'audio caricato.
+
+        Returns:
+            float: Tempo in secondi relativo alla registrazione originale.
+        """
+        if not self.spans:
+            return upload_sec
+
+        index = int(np.searchsorted(self.upload_starts, upload_sec, side="right")) - 1
+        index = min(max(index, 0), len(self.spans) - 1)
+        return float(self.original_starts[index] + (upload_sec - self.upload_starts[index]))
+
+    def to_upload(self, original_sec: float) -> float:
+        """
+        Converte un istante dell'originale nel tempo dell'audio caricato.
+        Gli istanti che cadono in un silenzio rimosso vengono agganciati all'inizio dello span successivo.
+
+        Args:
+            original_sec (float): Tempo in secondi relativo alla registrazione originale.
+
+        Returns:
+            float: Tempo in secondi relativo all'audio caricato.
+        """
+        if not self.spans:
+            return original_sec
+
+        index = int(np.searchsorted(self.original_starts, original_sec, side="right")) - 1
+        if index < 0:
+            return 0.0
+
+        start, end = self.spans[index]
+        return float(self.upload_starts[index] + min(original_sec, end) - start)
+
+    def slice(self, upload_start: float, upload_end: float) -> List[Tuple[float, float]]:
+        """
+        Restituisce gli intervalli dell'originale che compongono una porzione dell'audio caricato.
+
+        Args:
+            upload_start (float): Inizio della porzione (tempo caricato).
+            upload_end (float): Fine della porzione (tempo caricato).
+
+        Returns:
+            List[Tuple[float, float]]: Gli span originali, nell'ordine di riproduzione.
+        """
+        result = []
+        for (start, end), offset in zip(self.spans, self.upload_starts):
+            span_upload_end = offset + (end - start)
+            if span_upload_end - upload_start < MIN_SPAN_SEC or upload_end - offset < MIN_SPAN_SEC:
+                continue
+            # I bordi vicini a quelli dello span vengono agganciati ai valori esatti invece di essere
+            # ricalcolati in virgola mobile (altrimenti nascono span larghi 1e-13 secondi)
+            clipped_start = start if upload_start - offset < MIN_SPAN_SEC else start + (upload_start - offset)
+            clipped_end = end if span_upload_end - upload_end < MIN_SPAN_SEC else start + (upload_end - offset)
+            if clipped_end - clipped_start >= MIN_SPAN_SEC:
+                result.append((float(clipped_start), float(clipped_end)))
+        return result
@@ -0,0 +1,176 @@
+import collections
+import os
+import shutil
+import struct
+import subprocess
+import threading
+import numpy as np
+from typing import Optional
+
+from utils import utils
+
+# Dimensione massima complessiva dei file PCM su disco (in byte): ~18 ore di audio a 16 kHz mono.
+DEFAULT_MAX_BYTES = 2 * 1024 * 1024 * 1024
+
+# Formato dei campioni salvati: 16 kHz mono int16, lo stesso inviato all'API (nessuna perdita utile).
+SAMPLE_RATE = 16000
+
+# Intestazione: magic, versione, canali, frequenza, numero di campioni.
+# Occupa 64 byte così i campioni restano allineati per la mappatura in memoria.
+HEADER_FORMAT = "<4sHHIQ"
+HEADER_SIZE = 64
+MAGIC = b"TPCM"
+VERSION = 1
+
+# Dimensione dei blocchi copiati dalla pipe di FFmpeg al file (memoria costante durante la decodifica).
+COPY_BUFFER_BYTES = 1024 * 1024
+
+
+class PCMStore:
+    """
+    Archivio su disco dell'audio decodificato, in PCM grezzo mappato in memoria.
+
+    Ogni registrazione viene decodificata una sola volta da FFmpeg direttamente in un file
+    (intestazione di 64 byte seguita dai campioni int16 mono), identificato dall'impronta del file audio.
+    Il file viene poi aperto con np.memmap: forma d'onda, analisi dei silenzi e codifica dei chunk
+    leggono viste NumPy senza copie e la cache delle pagine del sistema operativo fa il resto,
+    quindi la memoria del processo resta bassa e riaprire la stessa registrazione non richiede decodifica.
+    Quando l'archivio supera la dimensione massima vengono eliminate le voci usate meno di recente (LRU).
+    """
+
+    def __init__(self, folder: Optional[str] = None, max_bytes: int = DEFAULT_MAX_BYTES):
+        """
+        Inizializza l'archivio.
+
+        Args:
+            folder (str, optional): Cartella dei file PCM (default: Cache/pcm).
+            max_bytes (int): Dimensione massima complessiva delle voci salvate.
+        """
+        self.folder = folder or utils.get_cache_folder("pcm")
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+
+    def _entry_path(self, fingerprint: str) -> str:
+        """Percorso del file PCM associato a un'impronta."""
+        return os.path.join(self.folder, f"{fingerprint}.pcm")
+
+    def load(self, fingerprint: str) -> Optional[np.ndarray]:
+        """
+        Apre i campioni di una registrazione già decodificata, senza leggerli.
+
+        Args:
+            fingerprint (str): L'impronta del file audio (vedi utils.file_fingerprint).
+
+        Returns:
+            np.ndarray: Vista in sola lettura (np.memmap) dei campioni int16 mono a SAMPLE_RATE Hz,
+                        oppure None se la registrazione non è nell'archivio.
+        """
+        path = self._entry_path(fingerprint)
+        try:
+            with open(path, "rb") as f:
+                magic, version, channels, sample_rate, count = struct.unpack(
+                    HEADER_FORMAT, f.read(struct.calcsize(HEADER_FORMAT)))
+            if (magic != MAGIC or version != VERSION or channels != 1 or sample_rate != SAMPLE_RATE or
+                    os.path.getsize(path) < HEADER_SIZE + count * 2):
+                return None
+        except (OSError, struct.error):
+            # Voce assente o corrotta: verrà decodificata di nuovo
+            return None
+
+        # Aggiorniamo la data di modifica: è il criterio usato dall'LRU
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+
+        if count == 0:
+            return np.zeros(0, dtype=np.int16)
+        return np.memmap(path, dtype=np.int16, mode="r", offset=HEADER_SIZE, shape=(count,))
+
+    def decode(self, fingerprint: str, filepath: str) -> np.ndarray:
+        """
+        Decodifica la registrazione nell'archivio (se non già presente) e la apre.
+
+        I campioni passano dalla pipe di FFmpeg al file a blocchi fissi: la memoria usata
+        non dipende dalla durata della registrazione.
+
+        Args:
+            fingerprint (str): L'impronta del file audio.
+            filepath (str): Il percorso del file audio.
+
+        Returns:
+            np.ndarray: Vista in sola lettura dei campioni (vedi load).
+
+        Raises:
+            RuntimeError: Se FFmpeg non riesce a decodificare il file.
+        """
+        samples = self.load(fingerprint)
+        if samples is not None:
+            return samples
+
+        path = self._entry_path(fingerprint)
+        # Scrittura atomica: un crash a metà non lascia voci incomplete
+        temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+
+        ffmpeg, _ = utils.get_ffmpeg_binaries()
+        command = [ffmpeg, "-nostdin", "-v", "error", "-i", filepath,
+                   "-f", "s16le", "-ac", "1", "-ar", str(SAMPLE_RATE), "pipe:1"]
+
+        try:
+            with open(temp_path, "wb") as f:
+                f.write(b"\0" * HEADER_SIZE)
+                process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+                # stderr va svuotato in parallelo: un file danneggiato produce un errore per ogni frame
+                # e, a pipe piena, FFmpeg si bloccherebbe prima di chiudere stdout (deadlock)
+                # (conserviamo solo le ultime righe: bastano per il messaggio d'errore)
+                stderr_lines = collections.deque(maxlen=20)
+                reader = threading.Thread(target=lambda: stderr_lines.extend(iter(process.stderr.readline, b"")),
+                                          daemon=True)
+                reader.start()
+                shutil.copyfileobj(process.stdout, f, COPY_BUFFER_BYTES)
+                process.stdout.close()
+                returncode = process.wait()
+                reader.join()
+                process.stderr.close()
+                if returncode != 0:
+                    stderr = b"".join(stderr_lines).decode(errors="replace").strip()
+                    raise RuntimeError(f"Impossibile decodificare {filepath}: {stderr}")
+
+                count = (f.tell() - HEADER_SIZE) // 2
+                f.seek(0)
+                f.write(struct.pack(HEADER_FORMAT, MAGIC, VERSION, 1, SAMPLE_RATE, count))
+            os.replace(temp_path, path)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+        self.evict(keep=path)
+        return self.load(fingerprint)
+
+    def evict(self, keep: Optional[str] = None):
+        """
+        Elimina le voci meno recenti finché l'archivio non rientra nella dimensione massima.
+
+        Args:
+            keep (str, optional): Una voce da non eliminare (es. quella appena decodificata).
+        """
+        with self._lock:
+            entries = []
+            for entry in os.scandir(self.folder):
+                if entry.is_file() and entry.name.endswith(".pcm") and entry.path != keep:
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+
+            total = sum(size for _, size, _ in entries)
+            if keep and os.path.exists(keep):
+                total += os.path.getsize(keep)
+            # Dalla più vecchia alla più recente
+            for _, size, path in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                try:
+                    # Su Windows un file ancora mappato da un altro handler non può essere eliminato
+                    os.remove(path)
+                    total -= size
+                except OSError:
+                    pass
@@ -0,0 +1,113 @@
+import os
+import threading
+import numpy as np
+from typing import Optional, Tuple
+
+from backend.PeakPyramid import PeakPyramid
+from utils import utils
+
+# Dimensione massima complessiva della cache su disco (in byte).
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+
+class PeakCache:
+    """
+    Cache persistente su disco dei picchi della forma d'onda e della durata di ogni registrazione.
+
+    Ogni voce è un file .npz identificato dall'impronta del file audio (contenuto + dimensione + mtime),
+    quindi riaprire una registrazione già vista non richiede alcuna decodifica.
+    Quando la cache supera la dimensione massima vengono eliminate le voci usate meno di recente (LRU).
+    """
+
+    def __init__(self, folder: Optional[str] = None, max_bytes: int = DEFAULT_MAX_BYTES):
+        """
+        Inizializza la cache.
+
+        Args:
+            folder (str, optional): Cartella della cache (default: Cache/peaks).
+            max_bytes (int): Dimensione massima complessiva delle voci salvate.
+        """
+        self.folder = folder or utils.get_cache_folder("peaks")
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+
+    def _entry_path(self, fingerprint: str) -> str:
+        """Percorso del file .npz associato a un'impronta."""
+        return os.path.join(self.folder, f"{fingerprint}.npz")
+
+    def load(self, fingerprint: str) -> Optional[Tuple[float, PeakPyramid]]:
+        """
+        Recupera durata e piramide dei picchi di un file già analizzato.
+
+        Args:
+            fingerprint (str): L'impronta del file audio (vedi utils.file_fingerprint).
+
+        Returns:
+            Tuple[float, PeakPyramid]: (durata in secondi, piramide), oppure None se assente.
+        """
+        path = self._entry_path(fingerprint)
+        try:
+            with np.load(path) as data:
+                duration = float(data["duration"])
+                pyramid = PeakPyramid(int(data["sample_rate"]), int(data["bin_size"]),
+                                      data["mins"], data["maxs"], data["mean_squares"])
+        except (OSError, KeyError, ValueError):
+            # Voce assente o corrotta: verrà ricalcolata
+            return None
+
+        # Aggiorniamo la data di modifica: è il criterio usato dall'LRU
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+
+        return duration, pyramid
+
+    def save(self, fingerprint: str, duration: float, pyramid: PeakPyramid):
+        """
+        Salva durata e livello base della piramide (i livelli superiori si ricostruiscono al caricamento).
+
+        Args:
+            fingerprint (str): L'impronta del file audio.
+            duration (float): La durata dell'audio in secondi.
+            pyramid (PeakPyramid): La piramide da salvare.
+        """
+        mins, maxs, mean_squares = pyramid.levels[0]
+        path = self._entry_path(fingerprint)
+        # Scrittura atomica: un crash a metà non lascia voci corrotte
+        temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+
+        try:
+            with open(temp_path, "wb") as f:
+                np.savez(f, duration=duration, sample_rate=pyramid.sample_rate, bin_size=pyramid.bin_size,
+                         mins=mins, maxs=maxs, mean_squares=mean_squares)
+            os.replace(temp_path, path)
+        except OSError as e:
+            print(f"Error saving peak cache: {e}")
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            return
+
+        self.evict()
+
+    def evict(self):
+        """
+        Elimina le voci meno recenti finché la cache non rientra nella dimensione massima.
+        """
+        with self._lock:
+            entries = []
+            for entry in os.scandir(self.folder):
+                if entry.is_file() and entry.name.endswith(".npz"):
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+
+            total = sum(size for _, size, _ in entries)
+            # Dalla più vecchia alla più recente
+            for _, size, path in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.remove(path)
+                    total -= size
+                except OSError:
+                    pass
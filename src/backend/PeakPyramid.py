@@ -0,0 +1,145 @@
+import numpy as np
+from typing import Iterable, List, Optional
+
+# Durata di un bin del livello base della piramide (in secondi).
+# 25 ms: 10 ore di audio = ~1.4 milioni di bin, circa 11 MB per il livello base.
+BASE_BIN_SECONDS = 0.025
+
+
+class PeakPyramid:
+    """
+    Piramide multi-risoluzione dell'inviluppo audio (min, max, RMS).
+
+    Il livello 0 contiene, per ogni bin di BASE_BIN_SECONDS, il campione minimo, quello massimo
+    e il quadrato medio (da cui si ricava l'RMS). Ogni livello successivo dimezza la risoluzione
+    fondendo coppie di bin del livello precedente.
+
+    In questo modo qualsiasi livello di zoom viene servito in O(punti richiesti),
+    senza rileggere il PCM grezzo e senza l'aliasing del semplice campionamento a passo fisso.
+    """
+
+    def __init__(self, sample_rate: int, bin_size: int,
+                 mins: np.ndarray, maxs: np.ndarray, mean_squares: np.ndarray):
+        """
+        Inizializza la piramide a partire dal livello base già calcolato.
+
+        Args:
+            sample_rate (int): Frequenza di campionamento dei dati sorgente.
+            bin_size (int): Numero di campioni per bin nel livello base.
+            mins (np.ndarray): Minimo (int16) di ogni bin del livello base.
+            maxs (np.ndarray): Massimo (int16) di ogni bin del livello base.
+            mean_squares (np.ndarray): Quadrato medio (float32) di ogni bin del livello base.
+        """
+        self.sample_rate = sample_rate
+        self.bin_size = bin_size
+        self.levels: List[tuple] = [(mins, maxs, mean_squares)]
+        self._build_levels()
+
+    @classmethod
+    def from_blocks(cls, blocks: Iterable[np.ndarray], sample_rate: int,
+                    bin_seconds: float = BASE_BIN_SECONDS) -> "PeakPyramid":
+        """
+        Costruisce la piramide in un solo passaggio su un flusso di blocchi PCM.
+
+        Args:
+            blocks (Iterable[np.ndarray]): Blocchi di campioni int16 mono.
+            sample_rate (int): Frequenza di campionamento dei blocchi.
+            bin_seconds (float): Durata di un bin del livello base.
+
+        Returns:
+            PeakPyramid: La piramide costruita.
+        """
+        bin_size = max(1, int(round(sample_rate * bin_seconds)))
+        mins, maxs, mean_squares = [], [], []
+
+        # I campioni che non riempiono un bin intero vengono riportati al blocco successivo
+        carry = np.empty(0, dtype=np.int16)
+        for block in blocks:
+            data = np.concatenate((carry, block)) if len(carry) else block
+            full = len(data) // bin_size * bin_size
+            if full:
+                frames = data[:full].reshape(-1, bin_size)
+                mins.append(frames.min(axis=1))
+                maxs.append(frames.max(axis=1))
+                squares = frames.astype(np.float32)
+                mean_squares.append(np.einsum("ij,ij->i", squares, squares) / bin_size)
+            carry = data[full:]
+
+        # Ultimo bin parziale
+        if len(carry):
+            squares = carry.astype(np.float32)
+            mins.append(np.array([carry.min()], dtype=np.int16))
+            maxs.append(np.array([carry.max()], dtype=np.int16))
+            mean_squares.append(np.array([np.dot(squares, squares) / len(carry)], dtype=np.float32))
+
+        def join(parts, dtype):
+            return np.concatenate(parts).astype(dtype) if parts else np.empty(0, dtype=dtype)
+
+        return cls(sample_rate, bin_size,
+                   join(mins, np.int16), join(maxs, np.int16), join(mean_squares, np.float32))
+
+    def _build_levels(self):
+        """
+        Genera i livelli superiori fondendo coppie di bin finché ne resta uno solo.
+        """
+        mins, maxs, mean_squares = self.levels[0]
+        while len(mins) > 1:
+            starts = np.arange(0, len(mins), 2)
+            counts = np.minimum(2, len(mins) - starts)
+            mins = np.minimum.reduceat(mins, starts)
+            maxs = np.maximum.reduceat(maxs, starts)
+            mean_squares = (np.add.reduceat(mean_squares, starts) / counts).astype(np.float32)
+            self.levels.append((mins, maxs, mean_squares))
+
+    @property
+    def duration(self) -> float:
+        """Durata coperta dalla piramide, in secondi (arrotondata al bin)."""
+        return len(self.levels[0][0]) * self.bin_size / self.sample_rate
+
+    def get_peaks(self, points: int, start_sec: float = 0.0, end_sec: Optional[float] = None) -> np.ndarray:
+        """
+        Restituisce l'inviluppo dell'intervallo richiesto ridotto a (al massimo) `points` colonne.
+
+        Args:
+            points (int): Numero di colonne desiderato (es. la larghezza in pixel del grafico).
+            start_sec (float): Inizio dell'intervallo in secondi.
+            end_sec (float, optional): Fine dell'intervallo in secondi (default: fine audio).
+
+        Returns:
+            np.ndarray: Matrice (N, 3) float32 con colonne [min, max, rms] normalizzate in [-1, 1].
+        """
+        base_len = len(self.levels[0][0])
+        if base_len == 0 or points <= 0:
+            return np.empty((0, 3), dtype=np.float32)
+
+        seconds_per_bin = self.bin_size / self.sample_rate
+        first = max(0, int(start_sec / seconds_per_bin))
+        last = base_len if end_sec is None else min(base_len, int(np.ceil(end_sec / seconds_per_bin)))
+        if last <= first:
+            return np.empty((0, 3), dtype=np.float32)
+
+        # Scegliamo il livello più grossolano che abbia ancora almeno `points` bin nell'intervallo:
+        # in quel livello i bin sono meno di 2 * points, quindi la riduzione finale costa O(points).
+        level = 0
+        while level + 1 < len(self.levels) and ((last - first) >> (level + 1)) >= points:
+            level += 1
+
+        mins, maxs, mean_squares = self.levels[level]
+        lo = first >> level
+        hi = min(len(mins), -(-last // (1 << level)))
+
+        count = hi - lo
+        if count > points:
+            edges = np.unique(np.linspace(lo, hi, points + 1).astype(np.int64)[:-1])
+            counts = np.diff(np.append(edges, hi))
+            col_min = np.minimum.reduceat(mins[lo:hi], edges - lo)
+            col_max = np.maximum.reduceat(maxs[lo:hi], edges - lo)
+            col_ms = np.add.reduceat(mean_squares[lo:hi], edges - lo) / counts
+        else:
+            col_min, col_max, col_ms = mins[lo:hi], maxs[lo:hi], mean_squares[lo:hi]
+
+        peaks = np.empty((len(col_min), 3), dtype=np.float32)
+        peaks[:, 0] = col_min / 32768.0
+        peaks[:, 1] = col_max / 32768.0
+        peaks[:, 2] = np.sqrt(col_ms) / 32768.0
+        return peaks
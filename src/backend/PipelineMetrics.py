@@ -0,0 +1,221 @@
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from utils import utils
+
+# Nomi dei file scritti nella cartella delle metriche
+JSONL_FILENAME = "pipeline.jsonl"
+PROMETHEUS_FILENAME = "pipeline.prom"
+
+# Prefisso delle metriche in formato Prometheus
+PROMETHEUS_PREFIX = "sbobinator"
+
+# Percentili della latenza come quantili Prometheus
+_QUANTILES = {"p50": "0.5", "p95": "0.95", "max": "1"}
+
+# Più lavori possono terminare insieme: le scritture sui file condivisi vanno serializzate
+_write_lock = threading.Lock()
+
+
+class PipelineMetrics:
+    """
+    Tempi e contatori di un lavoro di trascrizione, fase per fase.
+
+    Ogni fase (decodifica, pianificazione, codifica, attesa e richiesta API, salvataggio...)
+    accumula la propria durata; i chunk registrano latenza, byte inviati e tentativi ripetuti.
+    Le fasi eseguite nei thread del pool si sommano, quindi il loro totale può superare
+    la durata reale del lavoro: indica dove si è speso il tempo, non quanto è durato.
+    Al termine il riepilogo viene aggiunto a un file JSON lines e a un file di testo
+    in formato Prometheus (leggibile dal textfile collector di node_exporter).
+    """
+
+    def __init__(self, job: str = ""):
+        """
+        Inizializza le metriche di un lavoro.
+
+        Args:
+            job (str): Il nome del lavoro (es. il file di output), usato come etichetta.
+        """
+        self.job = job
+        self.status = ""
+        self.started_at = time.time()
+        self.finished_at: Optional[float] = None
+        self.stages: Dict[str, float] = {}
+        self.counters: Dict[str, float] = {}
+        self.chunks: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """
+        Misura la durata del blocco e la aggiunge alla fase indicata (anche se il blocco solleva un'eccezione).
+
+        Esempio:
+            with metrics.stage("plan"):
+                chunks = planner.plan(...)
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(name, time.perf_counter() - start)
+
+    def add_time(self, name: str, seconds: float):
+        """Aggiunge una durata (secondi) alla fase indicata. Sicuro da qualsiasi thread."""
+        with self._lock:
+            self.stages[name] = self.stages.get(name, 0.0) + seconds
+
+    def count(self, name: str, value: float = 1):
+        """Incrementa un contatore (es. byte inviati, tentativi ripetuti). Sicuro da qualsiasi thread."""
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def record_chunk(self, index: int, **fields: Any):
+        """
+        Registra il risultato di un chunk.
+
+        Args:
+            index (int): Indice del chunk.
+            **fields: Misure del chunk (es. latency_s, encode_s, bytes, retries, cached).
+        """
+        with self._lock:
+            self.chunks.append({"index": index, **fields})
+
+    def merge(self, other: Optional["PipelineMetrics"]):
+        """Aggiunge fasi e contatori di un'altra raccolta (es. quelle del caricamento dell'audio)."""
+        if other is None:
+            return
+        with other._lock:
+            stages, counters = dict(other.stages), dict(other.counters)
+        for name, seconds in stages.items():
+            self.add_time(name, seconds)
+        for name, value in counters.items():
+            self.count(name, value)
+
+    def finish(self, status: str):
+        """Segna la fine del lavoro con il suo esito (es. "completato", "interrotto")."""
+        self.status = status
+        self.finished_at = time.time()
+
+    @property
+    def wall_seconds(self) -> float:
+        """Durata reale del lavoro (fino ad ora, se non ancora terminato)."""
+        return (self.finished_at or time.time()) - self.started_at
+
+    def chunk_latency(self) -> Dict[str, float]:
+        """Percentili della latenza dei chunk inviati all'API (esclusi quelli arrivati dalla cache)."""
+        with self._lock:
+            latencies = [chunk["latency_s"] for chunk in self.chunks
+                         if not chunk.get("cached") and "latency_s" in chunk]
+        if not latencies:
+            return {}
+        return {"p50": float(np.percentile(latencies, 50)), "p95": float(np.percentile(latencies, 95)),
+                "max": float(max(latencies))}
+
+    def summary(self) -> Dict[str, Any]:
+        """
+        Riepilogo del lavoro, serializzabile in JSON.
+
+        Returns:
+            Dict[str, Any]: Nome, esito, inizio, durata reale, fasi, contatori e latenza dei chunk.
+        """
+        with self._lock:
+            stages, counters = dict(self.stages), dict(self.counters)
+        return {
+            "type": "job",
+            "job": self.job,
+            "status": self.status,
+            "started_at": datetime.fromtimestamp(self.started_at).isoformat(timespec="seconds"),
+            "wall_seconds": round(self.wall_seconds, 3),
+            "stages": {name: round(seconds, 3) for name, seconds in stages.items()},
+            "counters": counters,
+            "chunk_latency": {name: round(seconds, 3) for name, seconds in self.chunk_latency().items()},
+        }
+
+    def describe(self) -> str:
+        """Riepilogo leggibile su più righe, per log e interfaccia."""
+        summary = self.summary()
+        lines = [f"{self.job or 'Lavoro'} ({summary['status'] or 'in corso'}): "
+                 f"{utils.seconds_to_hms(summary['wall_seconds'])} totali"]
+        for name, seconds in sorted(summary["stages"].items(), key=lambda item: item[1], reverse=True):
+            if seconds < 0.005:
+                # Fasi trascurabili (es. letture dalla cache): non aiutano a trovare il collo di bottiglia
+                continue
+            lines.append(f"  {name:<14}{seconds:9.2f} s")
+        counters = summary["counters"]
+        lines.append(f"  {int(counters.get('chunks', 0))} parti, {int(counters.get('cache_hits', 0))} dalla cache, "
+                     f"{counters.get('bytes_uploaded', 0) / 1024 / 1024:.1f} MB inviati, "
+                     f"{int(counters.get('retries', 0))} tentativi ripetuti")
+        latency = summary["chunk_latency"]
+        if latency:
+            lines.append(f"  latenza API per parte: mediana {latency['p50']:.1f} s, "
+                         f"p95 {latency['p95']:.1f} s, max {latency['max']:.1f} s")
+        return "\n".join(lines)
+
+    def write(self, folder: Optional[str] = None) -> Tuple[str, str]:
+        """
+        Aggiunge il lavoro al file JSON lines (una riga per chunk e una per il riepilogo)
+        e riscrive il file Prometheus con le misure di questo lavoro.
+
+        Args:
+            folder (str, optional): Cartella di destinazione (default: Cache/metrics).
+
+        Returns:
+            Tuple[str, str]: (percorso del file JSON lines, percorso del file Prometheus).
+        """
+        folder = folder or utils.get_cache_folder("metrics")
+        jsonl_path = os.path.join(folder, JSONL_FILENAME)
+        prometheus_path = os.path.join(folder, PROMETHEUS_FILENAME)
+        summary = self.summary()
+        with self._lock:
+            chunks = sorted(self.chunks, key=lambda c: c["index"])
+
+        with _write_lock:
+            try:
+                with open(jsonl_path, "a", encoding="utf-8") as f:
+                    for chunk in chunks:
+                        f.write(json.dumps({"type": "chunk", "job": self.job, **chunk}, ensure_ascii=False) + "\n")
+                    f.write(json.dumps(summary, ensure_ascii=False) + "\n")
+
+                # Scrittura atomica: il collector non deve mai leggere un file a metà
+                temp_path = prometheus_path + ".tmp"
+                with open(temp_path, "w", encoding="utf-8") as f:
+                    f.write(self._prometheus_text(summary))
+                os.replace(temp_path, prometheus_path)
+            except OSError as e:
+                print(f"Error writing pipeline metrics: {e}")
+
+        return jsonl_path, prometheus_path
+
+    def _prometheus_text(self, summary: Dict[str, Any]) -> str:
+        """Le misure del lavoro nel formato di testo di Prometheus."""
+        job = _label(self.job)
+        lines = []
+
+        def metric(name: str, kind: str, help_text: str, samples: List[Tuple[str, float]]):
+            full_name = f"{PROMETHEUS_PREFIX}_{name}"
+            lines.append(f"# HELP {full_name} {help_text}")
+            lines.append(f"# TYPE {full_name} {kind}")
+            lines.extend(f"{full_name}{{job=\"{job}\"{labels}}} {value:.15g}" for labels, value in samples)
+
+        metric("job_seconds", "gauge", "Durata reale dell'ultimo lavoro.",
+               [(f",status=\"{_label(summary['status'])}\"", summary["wall_seconds"])])
+        metric("stage_seconds", "gauge", "Tempo per fase dell'ultimo lavoro (somma sui thread).",
+               [(f",stage=\"{_label(name)}\"", seconds) for name, seconds in summary["stages"].items()])
+        for name, value in sorted(summary["counters"].items()):
+            metric(name, "gauge", f"Contatore {name} dell'ultimo lavoro.", [("", value)])
+        metric("chunk_latency_seconds", "gauge", "Latenza API per parte dell'ultimo lavoro.",
+               [(f",quantile=\"{_QUANTILES[name]}\"", value) for name, value in summary["chunk_latency"].items()])
+        return "\n".join(lines) + "\n"
+
+
+def _label(value: str) -> str:
+    """Valore di un'etichetta Prometheus con i caratteri speciali protetti."""
+    return value.replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
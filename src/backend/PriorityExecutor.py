@@ -0,0 +1,91 @@
+import heapq
+import itertools
+import threading
+from concurrent.futures import Executor, Future
+from typing import Any, Callable, List, Tuple
+
+
+class PriorityExecutor:
+    """
+    Pool di thread la cui coda è ordinata per priorità invece che per ordine di arrivo.
+
+    Le attività in attesa vengono eseguite dalla priorità più alta alla più bassa e, a parità
+    di priorità, nell'ordine in cui sono state inviate: i chunk di un lavoro prioritario
+    passano davanti a quelli già in coda degli altri lavori, senza interrompere quelli in corso.
+    Ogni lavoro invia le proprie attività attraverso una vista (vedi `view`), che si comporta
+    come un normale Executor e aggiunge la priorità del lavoro a ogni invio.
+    """
+
+    def __init__(self, max_workers: int, thread_name_prefix: str = "priority"):
+        """
+        Inizializza il pool e avvia i thread.
+
+        Args:
+            max_workers (int): Numero di thread del pool.
+            thread_name_prefix (str): Prefisso del nome dei thread (utile nei profiler).
+        """
+        self._queue: List[Tuple[int, int, Future, Callable, tuple, dict]] = []
+        self._condition = threading.Condition()
+        self._seq = itertools.count()
+
+        for n in range(max_workers):
+            threading.Thread(target=self._worker_loop, name=f"{thread_name_prefix}-{n}", daemon=True).start()
+
+    def submit(self, priority: int, fn: Callable, *args: Any, **kwargs: Any) -> Future:
+        """
+        Accoda un'attività con la priorità indicata.
+
+        Args:
+            priority (int): Priorità dell'attività (più alta = eseguita prima).
+            fn (Callable): La funzione da eseguire, seguita dai suoi argomenti.
+
+        Returns:
+            Future: Il risultato dell'attività (annullabile finché è in coda).
+        """
+        future = Future()
+        with self._condition:
+            # heapq estrae il minimo: priorità negata, poi numero progressivo (FIFO a parità di priorità)
+            heapq.heappush(self._queue, (-priority, next(self._seq), future, fn, args, kwargs))
+            self._condition.notify()
+        return future
+
+    def view(self, priority: Callable[[], int]) -> Executor:
+        """
+        Restituisce un Executor che invia al pool con la priorità corrente di un lavoro.
+
+        Args:
+            priority (Callable): Restituisce la priorità da usare al momento di ogni invio.
+
+        Returns:
+            Executor: La vista sul pool condiviso (shutdown non ferma il pool).
+        """
+        return _PriorityView(self, priority)
+
+    def _worker_loop(self):
+        """Ciclo di un thread del pool: esegue un'attività alla volta, la più prioritaria."""
+        while True:
+            with self._condition:
+                while not self._queue:
+                    self._condition.wait()
+                _, _, future, fn, args, kwargs = heapq.heappop(self._queue)
+
+            # Le attività annullate mentre erano in coda vengono scartate
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                result = fn(*args, **kwargs)
+            except BaseException as e:
+                future.set_exception(e)
+            else:
+                future.set_result(result)
+
+
+class _PriorityView(Executor):
+    """Executor che inoltra gli invii a un PriorityExecutor con la priorità di un lavoro."""
+
+    def __init__(self, pool: PriorityExecutor, priority: Callable[[], int]):
+        self._pool = pool
+        self._priority = priority
+
+    def submit(self, fn, /, *args, **kwargs) -> Future:
+        return self._pool.submit(self._priority(), fn, *args, **kwargs)
@@ -0,0 +1,223 @@
+import random
+import re
+import threading
+import time
+from typing import Any, Callable, Mapping, Optional, Tuple
+
+# Codici HTTP per cui ha senso ritentare la stessa richiesta
+RETRIABLE_STATUS = {408, 409, 429, 500, 502, 503, 504}
+
+
+class RequestController:
+    """
+    Controlla le richieste verso l'API: limite di concorrenza adattivo e tentativi ripetuti.
+
+    - Concorrenza AIMD (Additive Increase / Multiplicative Decrease): dopo un "giro" di richieste
+      riuscite il numero di richieste in volo sale di uno; a ogni evento di congestione viene dimezzato.
+      I 429 di richieste partite prima dell'ultimo dimezzamento appartengono allo stesso evento
+      e non riducono di nuovo il limite (prolungano solo la pausa).
+      Così il throughput si stabilizza appena sotto la quota del provider.
+    - Retry con backoff esponenziale e jitter per errori 429, 5xx e problemi di rete;
+      se il server indica quando riprovare (retry-after, x-ratelimit-reset-*) si usa quel valore.
+
+    Un'unica istanza va condivisa da tutte le richieste fatte con la stessa chiave API.
+    """
+
+    def __init__(self, max_concurrency: int = 8, initial_concurrency: int = 3, min_concurrency: int = 1,
+                 max_retries: int = 6, base_delay: float = 1.0, max_delay: float = 60.0):
+        """
+        Inizializza il controller.
+
+        Args:
+            max_concurrency (int): Numero massimo di richieste contemporanee.
+            initial_concurrency (int): Limite iniziale di richieste contemporanee.
+            min_concurrency (int): Limite minimo (anche dopo molti 429).
+            max_retries (int): Numero massimo di nuovi tentativi per richiesta.
+            base_delay (float): Attesa di base (secondi) del backoff esponenziale.
+            max_delay (float): Attesa massima (secondi) tra due tentativi.
+        """
+        self.max_concurrency = max_concurrency
+        self.min_concurrency = min_concurrency
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+        self.limit = float(max(min_concurrency, min(initial_concurrency, max_concurrency)))
+        self.in_flight = 0
+        self.paused_until = 0.0
+        self.last_decrease = float("-inf")
+        self._condition = threading.Condition()
+
+    def call(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Tuple[Any, int]:
+        """
+        Esegue `fn` rispettando il limite di concorrenza e ritentando gli errori temporanei.
+
+        Se `fn` restituisce una risposta grezza (con attributo `headers`), gli header di rate-limit
+        vengono letti per rallentare in anticipo, prima ancora di ricevere un 429.
+
+        Args:
+            fn (Callable): La funzione che esegue la richiesta.
+            *args, **kwargs: Argomenti passati a `fn`.
+
+        Returns:
+            Tuple[Any, int]: Il risultato di `fn` e il numero di nuovi tentativi effettuati.
+
+        Raises:
+            Exception: L'ultimo errore, se non ritentabile o se i tentativi sono esauriti.
+        """
+        attempt = 0
+        while True:
+            self._acquire()
+            sent_at = time.monotonic()
+            try:
+                result = fn(*args, **kwargs)
+            except Exception as e:
+                self._release()
+                delay = self._handle_error(e, attempt, sent_at)
+                if delay is None:
+                    raise
+                attempt += 1
+                time.sleep(delay)
+                continue
+
+            self._release(success=True)
+            headers = getattr(result, "headers", None)
+            if headers is not None:
+                self._observe_headers(headers)
+            return result, attempt
+
+    def _acquire(self):
+        """Attende uno slot libero (e la fine di eventuali pause imposte dal server)."""
+        with self._condition:
+            while True:
+                wait = self.paused_until - time.monotonic()
+                if wait <= 0 and self.in_flight < int(self.limit):
+                    self.in_flight += 1
+                    return
+                self._condition.wait(timeout=wait if wait > 0 else None)
+
+    def _release(self, success: bool = False):
+        """Libera uno slot; in caso di successo aumenta il limite (incremento additivo)."""
+        with self._condition:
+            self.in_flight -= 1
+            if success:
+                # +1 ogni `limit` successi, cioè circa +1 per ogni giro completo di richieste
+                self.limit = min(self.max_concurrency, self.limit + 1.0 / self.limit)
+            self._condition.notify_all()
+
+    def _throttle(self, delay: float, sent_at: float):
+        """
+        Mette in pausa tutte le richieste e riduce il limite (decremento moltiplicativo),
+        una sola volta per evento di congestione.
+
+        Args:
+            delay (float): Secondi di pausa.
+            sent_at (float): Istante (time.monotonic) in cui era partita la richiesta rifiutata.
+        """
+        with self._condition:
+            # Una raffica di 429 dalle richieste già in volo è un unico sovraccarico: un solo dimezzamento
+            if sent_at >= self.last_decrease:
+                self.limit = max(self.min_concurrency, self.limit / 2)
+                self.last_decrease = time.monotonic()
+            self.paused_until = max(self.paused_until, time.monotonic() + delay)
+            self._condition.notify_all()
+
+    def _handle_error(self, error: Exception, attempt: int, sent_at: float) -> Optional[float]:
+        """
+        Classifica un errore e calcola quanto attendere prima del prossimo tentativo.
+
+        Args:
+            error (Exception): L'errore sollevato dalla richiesta.
+            attempt (int): Numero di tentativi già ripetuti.
+            sent_at (float): Istante (time.monotonic) in cui era partita la richiesta.
+
+        Returns:
+            float: I secondi di attesa, oppure None se l'errore non va ritentato.
+        """
+        if attempt >= self.max_retries:
+            return None
+
+        # Import locale: il client è già stato caricato da chi ha fatto la richiesta
+        import groq
+
+        status = getattr(error, "status_code", None)
+        if isinstance(error, (groq.APIConnectionError, groq.APITimeoutError)):
+            # Timeout e problemi di rete: nessuna indicazione dal server
+            return self._backoff(attempt)
+        if status not in RETRIABLE_STATUS:
+            return None
+
+        response = getattr(error, "response", None)
+        hint = self._retry_after(response.headers) if response is not None else None
+        delay = hint if hint is not None else self._backoff(attempt)
+
+        if status == 429:
+            self._throttle(delay, sent_at)
+
+        return delay
+
+    def _backoff(self, attempt: int) -> float:
+        """Backoff esponenziale con "full jitter": evita che i thread riprovino tutti insieme."""
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+    def _observe_headers(self, headers: Mapping[str, str]):
+        """
+        Legge gli header di rate-limit di una risposta riuscita: se la quota di richieste
+        è esaurita, sospende le nuove richieste fino al reset invece di andare incontro a un 429.
+        """
+        remaining = headers.get("x-ratelimit-remaining-requests")
+        if remaining is None:
+            return
+        try:
+            if int(remaining) > 0:
+                return
+        except ValueError:
+            return
+
+        reset = _parse_duration(headers.get("x-ratelimit-reset-requests", ""))
+        if reset:
+            with self._condition:
+                self.paused_until = max(self.paused_until, time.monotonic() + min(reset, self.max_delay))
+
+    def _retry_after(self, headers: Mapping[str, str]) -> Optional[float]:
+        """Estrae dagli header l'attesa suggerita dal server, se presente."""
+        for name in ("retry-after-ms", "retry-after", "x-ratelimit-reset-requests", "x-ratelimit-reset-tokens"):
+            value = headers.get(name)
+            if not value:
+                continue
+            if name == "retry-after-ms":
+                try:
+                    return min(self.max_delay, float(value) / 1000)
+                except ValueError:
+                    continue
+            seconds = _parse_duration(value)
+            if seconds is not None:
+                # Un piccolo jitter evita che tutti i thread ripartano nello stesso istante
+                return min(self.max_delay, seconds + random.uniform(0, self.base_delay / 2))
+        return None
+
+
+def _parse_duration(value: str) -> Optional[float]:
+    """
+    Converte una durata come "7.5", "250ms", "2m59.56s" o "1h2m" in secondi.
+
+    Args:
+        value (str): La durata restituita dagli header dell'API.
+
+    Returns:
+        float: I secondi, oppure None se il formato non è riconosciuto.
+    """
+    value = value.strip()
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+
+    parts = re.findall(r"(\d+(?:\.\d+)?)(ms|h|m|s)", value)
+    if not parts or "".join(n + u for n, u in parts) != value:
+        return None
+
+    factors = {"h": 3600.0, "m": 60.0, "s": 1.0, "ms": 0.001}
+    return sum(float(number) * factors[unit] for number, unit in parts)
@@ -0,0 +1,122 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from utils import utils
+
+# Dimensione massima complessiva dei testi salvati in cache (in byte).
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+
+class ResultCache:
+    """
+    Cache locale (SQLite) dei risultati di trascrizione, indirizzata per contenuto.
+
+    La chiave è l'hash dei byte del chunk codificato insieme al modello e ai parametri
+    della richiesta: se lo stesso audio viene inviato di nuovo (nuovo tentativo dopo un errore,
+    slider spostati di poco) il testo torna immediatamente, senza un nuovo upload.
+    Quando la dimensione supera il limite vengono eliminate le voci usate meno di recente.
+    Insieme al testo vengono conservati i segmenti temporizzati (relativi all'audio inviato).
+    """
+
+    def __init__(self, db_path: Optional[str] = None, max_bytes: int = DEFAULT_MAX_BYTES):
+        """
+        Inizializza la cache aprendo (o creando) il database.
+
+        Args:
+            db_path (str, optional): Percorso del database (default: Cache/results/results.sqlite).
+            max_bytes (int): Dimensione massima complessiva dei testi salvati.
+        """
+        self.db_path = db_path or os.path.join(utils.get_cache_folder("results"), "results.sqlite")
+        self.max_bytes = max_bytes
+        # Una sola connessione condivisa tra i thread del pool, protetta da un lock
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS results ("
+            " key TEXT PRIMARY KEY,"
+            " text TEXT NOT NULL,"
+            " size INTEGER NOT NULL,"
+            " last_access REAL NOT NULL)"
+        )
+        # Database creati prima dei segmenti temporizzati: aggiungiamo la colonna
+        columns = [row[1] for row in self._conn.execute("PRAGMA table_info(results)")]
+        if "segments" not in columns:
+            self._conn.execute("ALTER TABLE results ADD COLUMN segments TEXT")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_results_access ON results(last_access)")
+        self._conn.commit()
+
+    @staticmethod
+    def make_key(data: bytes, model: str, params: Dict[str, Any]) -> str:
+        """
+        Calcola la chiave di un chunk.
+
+        Args:
+            data (bytes): I byte del chunk codificato.
+            model (str): Il modello usato per la trascrizione.
+            params (Dict[str, Any]): Gli altri parametri della richiesta che influenzano il risultato.
+
+        Returns:
+            str: La chiave esadecimale (SHA-256).
+        """
+        digest = hashlib.sha256(data)
+        digest.update(model.encode())
+        digest.update(json.dumps(params, sort_keys=True).encode())
+        return digest.hexdigest()
+
+    def get(self, key: str) -> Optional[Tuple[str, List[List[Any]]]]:
+        """
+        Restituisce il risultato associato alla chiave, aggiornandone l'ultimo accesso.
+
+        Args:
+            key (str): La chiave calcolata con make_key.
+
+        Returns:
+            Tuple: (testo trascritto, segmenti [inizio, fine, testo]), oppure None se non presente.
+        """
+        with self._lock:
+            row = self._conn.execute("SELECT text, segments FROM results WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            self._conn.execute("UPDATE results SET last_access = ? WHERE key = ?", (time.time(), key))
+            self._conn.commit()
+        return row[0], json.loads(row[1]) if row[1] else []
+
+    def put(self, key: str, text: str, segments: Optional[List[List[Any]]] = None):
+        """
+        Salva un risultato e applica il limite di dimensione.
+
+        Args:
+            key (str): La chiave calcolata con make_key.
+            text (str): Il testo trascritto.
+            segments (List, optional): I segmenti temporizzati [inizio, fine, testo] del chunk.
+        """
+        encoded_segments = json.dumps(segments, ensure_ascii=False) if segments else None
+        size = len(text.encode("utf-8")) + len(encoded_segments.encode("utf-8") if encoded_segments else b"")
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO results (key, text, segments, size, last_access) "
+                               "VALUES (?, ?, ?, ?, ?)", (key, text, encoded_segments, size, time.time()))
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        """
+        Elimina le voci meno recenti finché la dimensione totale non rientra nel limite.
+        Da chiamare con il lock acquisito.
+        """
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM results").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        to_delete = []
+        for key, size in self._conn.execute("SELECT key, size FROM results ORDER BY last_access"):
+            if total <= self.max_bytes:
+                break
+            to_delete.append((key,))
+            total -= size
+        self._conn.executemany("DELETE FROM results WHERE key = ?", to_delete)
@@ -0,0 +1,166 @@
+import os
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+# Un segmento: (inizio, fine, testo), tempi in secondi della registrazione originale
+Segment = Tuple[float, float, str]
+
+
+class SegmentStore:
+    """
+    Archivio colonnare dei segmenti temporizzati di una trascrizione.
+
+    I segmenti restituiti dall'API (già riportati al tempo della registrazione originale)
+    vengono salvati in un file .npz accanto al .txt: tre array di tempi e offset più un unico
+    blob UTF-8 con tutti i testi. Trovare il segmento di un istante è una ricerca binaria,
+    quindi sottotitoli SRT/VTT e salti dalla forma d'onda al testo non richiedono
+    una nuova trascrizione.
+    """
+
+    def __init__(self, starts: np.ndarray, ends: np.ndarray, text_offsets: np.ndarray, blob: bytes):
+        """
+        Inizializza l'archivio dagli array colonnari (vedi from_segments e load).
+
+        Args:
+            starts (np.ndarray): Inizio di ogni segmento (secondi, ordinati).
+            ends (np.ndarray): Fine di ogni segmento (secondi).
+            text_offsets (np.ndarray): Offset del testo di ogni segmento nel blob (n + 1 valori).
+            blob (bytes): I testi concatenati, codificati in UTF-8.
+        """
+        self.starts = starts
+        self.ends = ends
+        self.text_offsets = text_offsets
+        self.blob = blob
+
+    @classmethod
+    def from_segments(cls, segments: Iterable[Segment]) -> "SegmentStore":
+        """
+        Costruisce l'archivio da una sequenza di segmenti (anche non ordinati).
+
+        Args:
+            segments (Iterable[Segment]): I segmenti (inizio, fine, testo).
+
+        Returns:
+            SegmentStore: L'archivio.
+        """
+        ordered = sorted(((float(s), float(e), text.strip()) for s, e, text in segments), key=lambda x: x[0])
+        encoded = [text.encode("utf-8") for _, _, text in ordered]
+        lengths = np.fromiter((len(data) for data in encoded), dtype=np.int64, count=len(encoded))
+        return cls(
+            starts=np.fromiter((s for s, _, _ in ordered), dtype=np.float64, count=len(ordered)),
+            ends=np.fromiter((e for _, e, _ in ordered), dtype=np.float64, count=len(ordered)),
+            text_offsets=np.concatenate(([0], np.cumsum(lengths))).astype(np.int64),
+            blob=b"".join(encoded),
+        )
+
+    @staticmethod
+    def sidecar_path(txt_path: str) -> str:
+        """
+        Percorso del file dei segmenti di una trascrizione.
+        È un file nascosto, quindi la libreria non lo mostra come formato a sé.
+        """
+        folder, filename = os.path.split(txt_path)
+        return os.path.join(folder, f".{os.path.splitext(filename)[0]}.segments.npz")
+
+    @classmethod
+    def load(cls, txt_path: str) -> Optional["SegmentStore"]:
+        """
+        Carica i segmenti di una trascrizione.
+
+        Args:
+            txt_path (str): Il file di testo della trascrizione.
+
+        Returns:
+            SegmentStore: L'archivio, oppure None se la trascrizione non ha segmenti salvati.
+        """
+        path = cls.sidecar_path(txt_path)
+        if not os.path.exists(path):
+            return None
+        with np.load(path) as data:
+            return cls(data["starts"], data["ends"], data["text_offsets"], data["blob"].tobytes())
+
+    def save(self, txt_path: str):
+        """Salva i segmenti accanto alla trascrizione (scrittura atomica)."""
+        path = self.sidecar_path(txt_path)
+        temp_path = path + ".tmp"
+        with open(temp_path, "wb") as f:
+            np.savez(f, starts=self.starts, ends=self.ends, text_offsets=self.text_offsets,
+                     blob=np.frombuffer(self.blob, dtype=np.uint8))
+        os.replace(temp_path, path)
+
+    @classmethod
+    def delete(cls, txt_path: str):
+        """Elimina il file dei segmenti di una trascrizione, se esiste."""
+        path = cls.sidecar_path(txt_path)
+        if os.path.exists(path):
+            os.remove(path)
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    def text(self, index: int) -> str:
+        """Il testo del segmento `index`."""
+        return self.blob[self.text_offsets[index]:self.text_offsets[index + 1]].decode("utf-8")
+
+    def segment(self, index: int) -> Segment:
+        """Il segmento `index` come (inizio, fine, testo)."""
+        return float(self.starts[index]), float(self.ends[index]), self.text(index)
+
+    def index_at(self, seconds: float) -> Optional[int]:
+        """
+        Trova il segmento in corso all'istante indicato (ricerca binaria sugli inizi).
+        In una pausa tra due segmenti restituisce quello appena terminato.
+
+        Args:
+            seconds (float): Tempo in secondi della registrazione originale.
+
+        Returns:
+            int: L'indice del segmento, oppure None se l'istante precede il primo segmento.
+        """
+        index = int(np.searchsorted(self.starts, seconds, side="right")) - 1
+        return index if index >= 0 else None
+
+    def between(self, start: float, end: float) -> List[Segment]:
+        """I segmenti che si sovrappongono all'intervallo [start, end)."""
+        first = max(0, int(np.searchsorted(self.starts, start, side="right")) - 1)
+        last = int(np.searchsorted(self.starts, end, side="left"))
+        return [self.segment(i) for i in range(first, last) if self.ends[i] > start]
+
+    def __iter__(self) -> Iterator[Segment]:
+        for i in range(len(self)):
+            yield self.segment(i)
+
+    # --- SOTTOTITOLI ---
+
+    def write_srt(self, path: str) -> str:
+        """Scrive i segmenti come sottotitoli SRT e restituisce il percorso."""
+        return self._write_subtitles(path, header="", separator=",", numbered=True)
+
+    def write_vtt(self, path: str) -> str:
+        """Scrive i segmenti come sottotitoli WebVTT e restituisce il percorso."""
+        return self._write_subtitles(path, header="WEBVTT\n\n", separator=".", numbered=False)
+
+    def _write_subtitles(self, path: str, header: str, separator: str, numbered: bool) -> str:
+        temp_path = os.path.join(os.path.dirname(path), f".{os.path.basename(path)}.tmp")
+        with open(temp_path, "w", encoding="utf-8") as f:
+            f.write(header)
+            n = 0
+            for start, end, text in self:
+                if not text:
+                    continue
+                n += 1
+                if numbered:
+                    f.write(f"{n}\n")
+                f.write(f"{_timestamp(start, separator)} --> {_timestamp(max(end, start), separator)}\n{text}\n\n")
+        os.replace(temp_path, path)
+        return path
+
+
+def _timestamp(seconds: float, separator: str) -> str:
+    """Formatta un tempo come HH:MM:SS,mmm (SRT) o HH:MM:SS.mmm (VTT)."""
+    millis = int(round(seconds * 1000))
+    h, millis = divmod(millis, 3600_000)
+    m, millis = divmod(millis, 60_000)
+    s, millis = divmod(millis, 1000)
+    return f"{h:02d}:{m:02d}:{s:02d}{separator}{millis:03d}"
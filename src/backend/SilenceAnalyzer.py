@@ -0,0 +1,137 @@
+import numpy as np
+from typing import List, Tuple
+
+from backend.PeakPyramid import PeakPyramid
+
+# Margine (in dB) sopra il rumore di fondo stimato entro cui un frame è considerato silenzio.
+DEFAULT_MARGIN_DB = 8.0
+
+# Soglia assoluta massima: sopra questo livello un frame non è mai silenzio.
+MAX_THRESHOLD_DB = -30.0
+
+# Durata minima di un silenzio utile come punto di taglio.
+MIN_SILENCE_SEC = 0.4
+
+
+class SilenceAnalyzer:
+    """
+    Individua i silenzi di una registrazione analizzando l'energia per frame.
+
+    L'analisi riusa il livello base della PeakPyramid (quadrato medio ogni 25 ms), quindi
+    non richiede una nuova decodifica: tutto il lavoro è vettoriale in NumPy.
+    La soglia è adattiva: rumore di fondo stimato (10° percentile) più un margine.
+    """
+
+    def __init__(self, margin_db: float = DEFAULT_MARGIN_DB, min_silence_sec: float = MIN_SILENCE_SEC):
+        """
+        Inizializza l'analizzatore.
+
+        Args:
+            margin_db (float): Margine sopra il rumore di fondo per classificare un frame come silenzio.
+            min_silence_sec (float): Durata minima di un silenzio per essere riportato.
+        """
+        self.margin_db = margin_db
+        self.min_silence_sec = min_silence_sec
+
+    def find_silences(self, peaks: PeakPyramid,
+                      start_sec: float = 0.0, end_sec: float = None) -> List[Tuple[float, float]]:
+        """
+        Restituisce gli intervalli di silenzio contenuti nell'intervallo richiesto.
+
+        Args:
+            peaks (PeakPyramid): La piramide dei picchi della registrazione.
+            start_sec (float): Inizio dell'intervallo da analizzare.
+            end_sec (float, optional): Fine dell'intervallo da analizzare (default: fine audio).
+
+        Returns:
+            List[Tuple[float, float]]: Intervalli (inizio, fine) in secondi, ordinati.
+        """
+        mean_squares = peaks.levels[0][2]
+        frame_sec = peaks.bin_size / peaks.sample_rate
+
+        first = max(0, int(start_sec / frame_sec))
+        last = len(mean_squares) if end_sec is None else min(len(mean_squares), int(np.ceil(end_sec / frame_sec)))
+        if last <= first:
+            return []
+
+        # 1. Energia per frame in dBFS (il piccolo epsilon evita log(0) sul silenzio digitale)
+        energy_db = 10 * np.log10(mean_squares[first:last] / (32768.0 ** 2) + 1e-12)
+
+        # 2. Soglia adattiva
+        threshold = min(np.percentile(energy_db, 10) + self.margin_db, MAX_THRESHOLD_DB)
+        silent = energy_db < threshold
+
+        # 3. Ricerca delle sequenze consecutive di frame silenziosi (run-length tramite diff)
+        edges = np.diff(np.concatenate(([0], silent.astype(np.int8), [0])))
+        run_starts = np.flatnonzero(edges == 1)
+        run_ends = np.flatnonzero(edges == -1)
+
+        min_frames = max(1, int(self.min_silence_sec / frame_sec))
+        keep = (run_ends - run_starts) >= min_frames
+
+        silences = []
+        for run_start, run_end in zip(run_starts[keep], run_ends[keep]):
+            silence_start = max(start_sec, float((first + run_start) * frame_sec))
+            silence_end = float((first + run_end) * frame_sec)
+            if end_sec is not None:
+                silence_end = min(end_sec, silence_end)
+            silences.append((silence_start, silence_end))
+
+        return silences
+
+    @staticmethod
+    def speech_spans(start_sec: float, end_sec: float, silences: List[Tuple[float, float]],
+                     min_skip_sec: float = 2.0, padding_sec: float = 0.25) -> List[Tuple[float, float]]:
+        """
+        Calcola gli intervalli da inviare escludendo i silenzi più lunghi di `min_skip_sec`.
+
+        Args:
+            start_sec (float): Inizio dell'intervallo complessivo.
+            end_sec (float): Fine dell'intervallo complessivo.
+            silences (List[Tuple[float, float]]): I silenzi individuati da find_silences.
+            min_skip_sec (float): Durata minima di un silenzio per essere rimosso.
+            padding_sec (float): Margine di silenzio lasciato ai due lati di ogni taglio.
+
+        Returns:
+            List[Tuple[float, float]]: Gli intervalli da mantenere, ordinati.
+        """
+        spans = []
+        cursor = start_sec
+        for silence_start, silence_end in silences:
+            if silence_end - silence_start < min_skip_sec:
+                continue
+            cut_start = max(cursor, silence_start + padding_sec)
+            cut_end = min(end_sec, silence_end - padding_sec)
+            if cut_end <= cut_start:
+                continue
+            if cut_start > cursor:
+                spans.append((cursor, cut_start))
+            cursor = cut_end
+
+        if end_sec > cursor:
+            spans.append((cursor, end_sec))
+
+        return spans
+
+    @staticmethod
+    def snap_cut(target: float, candidates: np.ndarray, window: float, lower_bound: float) -> float:
+        """
+        Sposta un punto di taglio sul candidato (silenzio) più vicino che lo precede.
+
+        Il taglio non viene mai spostato in avanti, così la lunghezza massima del chunk è rispettata.
+
+        Args:
+            target (float): Il punto di taglio ideale.
+            candidates (np.ndarray): Possibili punti di taglio ordinati (centri dei silenzi).
+            window (float): Distanza massima all'indietro entro cui cercare.
+            lower_bound (float): Il taglio deve restare strettamente dopo questo istante.
+
+        Returns:
+            float: Il punto di taglio scelto (target stesso se non c'è alcun silenzio vicino).
+        """
+        index = int(np.searchsorted(candidates, target, side="right")) - 1
+        if index >= 0:
+            candidate = float(candidates[index])
+            if candidate > lower_bound and target - candidate <= window:
+                return candidate
+        return target
@@ -1,8 +1,36 @@
 import os
-import math
+import threading
+import time
+from concurrent.futures import Executor, ThreadPoolExecutor, as_completed, wait
+from backend.ChunkPlanner import DEFAULT_TARGET_BYTES, ChunkPlanner
+from backend.EncodingProfile import DEFAULT_PROFILE, get_profile
+from backend.JobJournal import JobJournal
+from backend.LibraryIndex import LibraryIndex
+from backend.OffsetMap import OffsetMap
+from backend.PipelineMetrics import PipelineMetrics
+from backend.RequestController import RequestController
+from backend.ResultCache import ResultCache
+from backend.SegmentStore import SegmentStore
+from backend.SilenceAnalyzer import SilenceAnalyzer
 from utils import utils
-from groq import Groq
-from typing import Optional, Callable, Any
+from typing import TYPE_CHECKING, Optional, Callable, Any, List, Tuple
+
+if TYPE_CHECKING:
+    # Il client Groq (con pydantic e httpx) costa ~0.25s di import: viene caricato alla prima trascrizione
+    from groq import Groq
+
+# Numero massimo di chunk elaborati in parallelo (codifica + invio).
+# Ogni richiesta passa la maggior parte del tempo in attesa di rete, quindi i thread sono sufficienti.
+# Il numero effettivo di richieste in volo è regolato dal RequestController in base ai limiti dell'API.
+DEFAULT_MAX_WORKERS = 8
+
+# Il modello SOTA per la trascrizione
+MODEL = "whisper-large-v3"
+
+# Parametri della richiesta (oltre al modello) che influenzano il testo restituito.
+# verbose_json include i segmenti con i tempi: servono per sottotitoli e ricerca per istante,
+# e costano pochi KB in più per chunk invece di una seconda trascrizione a pagamento.
+REQUEST_PARAMS = {"response_format": "verbose_json"}
 
 
 class Transcriber:
@@ -12,9 +40,26 @@ class Transcriber:
     e ricomporre il testo finale.
     """
 
-    def __init__(self):
-        """Inizializza il transcriber."""
-        pass
+    def __init__(self, base_url: Optional[str] = None, target_bytes: int = DEFAULT_TARGET_BYTES,
+                 max_concurrency: int = DEFAULT_MAX_WORKERS, use_library: bool = True):
+        """
+        Inizializza il transcriber.
+
+        Args:
+            base_url (str, optional): Indirizzo alternativo dell'API (es. il server finto di tools/FakeGroqServer
+                                      per i test di carico). Se None si usa l'API reale di Groq.
+            target_bytes (int): Dimensione desiderata di ogni chunk inviato.
+            max_concurrency (int): Numero massimo di richieste contemporanee verso l'API.
+            use_library (bool): Se False non apre l'indice della libreria e non vi registra le trascrizioni
+                                (es. la CLI con una cartella di output esterna).
+        """
+        self.base_url = base_url
+        self.target_bytes = target_bytes
+        self.silence_analyzer = SilenceAnalyzer()
+        self.result_cache = ResultCache()
+        self.library_index = LibraryIndex() if use_library else None
+        # Condiviso tra tutti i lavori: la quota dell'API è per chiave, non per file
+        self.request_controller = RequestController(max_concurrency=max_concurrency)
 
     def process_audio(self,
                       audio_handler: Any,
@@ -23,7 +68,15 @@ class Transcriber:
                       api_key: str,
                       output_filename: str,
                       progress_callback: Optional[Callable[[float], None]] = None,
-                      text_callback: Optional[Callable[[str], None]] = None) -> str:
+                      text_callback: Optional[Callable[[str], None]] = None,
+                      max_workers: int = DEFAULT_MAX_WORKERS,
+                      skip_silence: bool = False,
+                      encoding_profile: str = DEFAULT_PROFILE,
+                      use_cache: bool = True,
+                      resume: bool = True,
+                      executor: Optional[Executor] = None,
+                      cancel_event: Optional[threading.Event] = None,
+                      metrics: Optional[PipelineMetrics] = None) -> str:
         """
         Esegue il flusso principale di trascrizione: taglio, chunking, invio API e unione risultati.
 
@@ -35,88 +88,377 @@ class Transcriber:
             output_filename (str): Il nome desiderato per il file di output finale.
             progress_callback (Callable, optional): Funzione per aggiornare la barra di progresso (0.0 a 1.0).
             text_callback (Callable, optional): Funzione per scrivere log/testo nella console UI.
+            max_workers (int): Numero massimo di chunk trascritti contemporaneamente.
+            skip_silence (bool): Se True, i silenzi lunghi non vengono inviati all'API.
+            encoding_profile (str): Profilo di codifica dei chunk ("mp3", "opus", "flac").
+            use_cache (bool): Se True, i chunk già trascritti vengono letti dalla cache locale.
+            resume (bool): Se True e lo stesso lavoro era stato interrotto, riparte dal primo chunk mancante.
+            executor (Executor, optional): Pool di thread condiviso tra più lavori (es. dal JobScheduler).
+                                           Se None, viene creato un pool dedicato di `max_workers` thread.
+            cancel_event (threading.Event, optional): Se impostato durante l'esecuzione, il lavoro viene
+                                                      interrotto (i chunk completati restano nel journal).
+            metrics (PipelineMetrics, optional): Dove registrare tempi per fase, byte inviati e latenza
+                                                 dei chunk (es. per mostrarli nell'interfaccia). Se None,
+                                                 ne viene creata una nuova. A fine lavoro viene scritta su disco.
+
+        I segmenti temporizzati restituiti dall'API vengono riportati al tempo della registrazione
+        originale e salvati accanto al testo (vedi SegmentStore).
 
         Returns:
             str: Il testo completo trascritto.
 
         Raises:
             ValueError: Se nessun audio è stato caricato nell'handler.
+            InterruptedError: Se il lavoro viene annullato tramite `cancel_event`.
         """
-        if not audio_handler.audio:
+        if not audio_handler.is_loaded():
             raise ValueError("Nessun audio caricato nell'AudioHandler.")
 
+        metrics = metrics or PipelineMetrics(os.path.basename(output_filename))
+
         # 1. Configurazione del Client API
         # Inizializziamo la connessione a Groq usando la chiave fornita.
-        client = Groq(api_key=api_key)
+        with metrics.stage("client"):
+            client = self.create_client(api_key, self.base_url)
 
-        # 2. Preparazione del Segmento Audio
-        # Pydub lavora in millisecondi, quindi convertiamo i secondi.
-        # Questo crea un nuovo oggetto audio in memoria contenente solo la parte interessata.
-        total_audio = audio_handler.audio[start_sec * 1000: end_sec * 1000]
-        total_duration_ms = len(total_audio)
+        # 2. Preparazione dell'intervallo da trascrivere
+        # Non creiamo una copia del segmento: ogni chunk viene estratto dall'handler
+        # (dall'archivio PCM mappato in memoria o direttamente dal file sorgente).
+        end_sec = min(end_sec, audio_handler.duration)
 
-        # 3. Logica di Chunking (Spezzettamento)
-        # Groq (come OpenAI) ha un limite di 25MB per file.
-        # Un MP3 a 64kbit/s occupa circa 0.5 MB al minuto.
-        # 20 minuti = ~10 MB, un margine di sicurezza molto ampio per evitare errori 413 (Payload Too Large).
-        CHUNK_LENGTH_MS = 20 * 60 * 1000
+        # 3. Journal del lavoro: identifica sorgente, parametri e file di output, per poter riprendere
+        # dopo un'interruzione (lo stesso audio salvato con due nomi diversi ha due journal distinti)
+        txt_path = self.get_output_path(output_filename)
+        with metrics.stage("journal"):
+            source = audio_handler.fingerprint or utils.file_fingerprint(audio_handler.filepath)
+            journal = JobJournal(JobJournal.make_job_id(
+                source=source, start=round(start_sec, 3), end=round(end_sec, 3),
+                profile=encoding_profile, skip_silence=skip_silence, model=MODEL, params=REQUEST_PARAMS,
+                output=os.path.normcase(os.path.abspath(txt_path))
+            ))
+            previous = journal.load() if resume else None
 
-        # Calcoliamo in quante parti dobbiamo dividere il file (arrotondando per eccesso)
-        num_chunks = math.ceil(total_duration_ms / CHUNK_LENGTH_MS)
-        full_transcript = ""
+        # 4. Logica di Chunking (Spezzettamento)
+        # Groq (come OpenAI) ha un limite di 25MB per file: la durata dei chunk è ricavata dal
+        # profilo di codifica, i tagli vengono fatti nei silenzi e, se richiesto, i silenzi lunghi esclusi.
+        planner = ChunkPlanner(get_profile(encoding_profile), target_bytes=self.target_bytes,
+                               silence_analyzer=self.silence_analyzer)
+        if previous:
+            # In ripresa usiamo il piano salvato: gli indici dei chunk devono coincidere
+            header, done = previous
+            chunks = [[tuple(span) for span in chunk] for chunk in header["chunks"]]
+            offset_map = OffsetMap([span for chunk in chunks for span in chunk])
+        else:
+            done = {}
+            with metrics.stage("plan"):
+                chunks, offset_map = planner.plan(audio_handler, start_sec, end_sec, skip_silence)
+        num_chunks = len(chunks)
+        pending = [i for i in range(num_chunks) if i not in done]
+        workers = max(1, min(max_workers, len(pending)))
 
         if text_callback:
+            if done:
+                text_callback(f"--> Ripresa lavoro interrotto: {len(done)}/{num_chunks} parti già completate.")
+            if skip_silence:
+                removed = (end_sec - start_sec) - offset_map.duration
+                text_callback(f"--> Silenzi esclusi dall'invio: {utils.seconds_to_hms(removed)}")
+            text_callback(f"--> Codifica: {planner.profile.describe()}, "
+                          f"parti da circa {utils.seconds_to_hms(planner.chunk_seconds)}")
             text_callback(f"--> Audio diviso in {num_chunks} parti per rispettare i limiti API (25MB).\n")
+            text_callback(f"--> Elaborazione con {workers} richieste in parallelo...")
 
-        # 4. Elaborazione Sequenziale dei Chunk
-        for i in range(num_chunks):
-            # Calcolo degli indici di inizio e fine per il pezzo corrente
-            chunk_start = i * CHUNK_LENGTH_MS
-            chunk_end = min((i + 1) * CHUNK_LENGTH_MS, total_duration_ms)
+        # 5. Elaborazione Concorrente dei Chunk
+        # I risultati vengono salvati per indice, così l'ordine finale non dipende
+        # dall'ordine di completamento delle richieste.
+        results: List[Optional[str]] = [done[i][0] if i in done else None for i in range(num_chunks)]
+        segments: List[List[List[Any]]] = [done[i][1] if i in done else [] for i in range(num_chunks)]
+        completed = len(done)
 
-            # Estrazione del chunk
-            chunk = total_audio[chunk_start:chunk_end]
-            temp_filename = f"temp_chunk_{i}.mp3"
+        # Il file di output viene scritto man mano: appena un prefisso contiguo di chunk è pronto
+        # viene aggiunto in coda (UTF-8 per supportare caratteri speciali ed emoji).
+        # Viene aperto solo dentro il try, dopo l'avvio del journal: un errore prima non lo lascia troncato.
+        output = None
+        next_to_write = 0
 
-            # Esportazione Temporanea
-            # Usiamo bitrate="64k" per bilanciare qualità vocale e dimensione file ridotta.
-            chunk.export(temp_filename, format="mp3", bitrate="64k")
+        def write_ready():
+            nonlocal next_to_write
+            while next_to_write < num_chunks and results[next_to_write] is not None:
+                output.write(results[next_to_write] + " ")
+                next_to_write += 1
+            output.flush()
 
-            try:
-                # Feedback Utente
-                if text_callback:
-                    text_callback(f"--> Elaborazione parte {i + 1}/{num_chunks}...")
+        journal.start({"source": source, "start": start_sec, "end": end_sec, "chunks": chunks},
+                      resume=bool(previous))
+        own_executor = executor is None
+        futures = {}
+        try:
+            if own_executor:
+                executor = ThreadPoolExecutor(max_workers=workers)
+            output = open(txt_path, "w", encoding="utf-8")
+            write_ready()
+            futures = {
+                executor.submit(self._transcribe_chunk, client, planner, audio_handler, chunks[i], i, use_cache,
+                                metrics): i
+                for i in pending
+            }
 
-                # Chiamata API Groq
-                # Apriamo il file temporaneo in modalità binaria ('rb')
-                with open(temp_filename, "rb") as file:
-                    transcription = client.audio.transcriptions.create(
-                        file=(temp_filename, file.read()),
-                        model="whisper-large-v3",  # Il modello SOTA per la trascrizione
-                        response_format="json"  # JSON è più leggero e veloce da parsare del verbose_json
-                    )
+            # I callback vengono invocati solo da questo thread, man mano che i chunk terminano
+            for future in as_completed(futures):
+                if cancel_event is not None and cancel_event.is_set():
+                    raise InterruptedError("Lavoro annullato dall'utente.")
+
+                i = futures[future]
+                segment_text, from_cache, retries, segments[i] = future.result()
+                results[i] = segment_text
+                completed += 1
 
-                segment_text = transcription.text
-                full_transcript += segment_text + " "
+                # Prima il journal (fonte di verità per la ripresa), poi il file di output
+                with metrics.stage("write"):
+                    journal.record_chunk(i, segment_text, segments[i])
+                    write_ready()
 
                 # Mostra anteprima live del testo ricevuto
                 if text_callback:
-                    text_callback(f"   [Parte {i + 1} OK]: {segment_text[:50]}...")
+                    span_range = f"{utils.seconds_to_hms(chunks[i][0][0])} - {utils.seconds_to_hms(chunks[i][-1][1])}"
+                    status = "CACHE" if from_cache else "OK"
+                    if retries:
+                        status += f", {retries} tentativi ripetuti"
+                    text_callback(f"   [Parte {i + 1}/{num_chunks} {status} | {span_range}]: {segment_text[:50]}...")
 
                 # Aggiornamento Barra Progresso
                 if progress_callback:
-                    progress_callback((i + 1) / num_chunks)
+                    progress_callback(completed / num_chunks)
+        except BaseException:
+            # Se un chunk fallisce annulliamo quelli non ancora partiti invece di consumare quota inutilmente.
+            # Il journal resta su disco: la prossima esecuzione ripartirà dal primo chunk mancante.
+            if own_executor:
+                if executor is not None:
+                    executor.shutdown(wait=True, cancel_futures=True)
+            else:
+                # Pool condiviso: annulliamo solo i nostri chunk e attendiamo quelli già partiti
+                for future in futures:
+                    future.cancel()
+                wait(futures)
+
+            # I chunk già in volo al momento dell'errore vengono comunque registrati
+            for future, i in futures.items():
+                if results[i] is None and future.done() and not future.cancelled() and future.exception() is None:
+                    results[i], _, _, segments[i] = future.result()
+                    completed += 1
+                    journal.record_chunk(i, results[i], segments[i])
+
+            journal.close()
+            if output is not None:
+                write_ready()
+                output.close()
+            self._finish_metrics(metrics, audio_handler, "interrotto")
+            if text_callback:
+                text_callback(f"⚠️ Lavoro interrotto: {completed}/{num_chunks} parti salvate, verrà ripreso al prossimo avvio.")
+            raise
+        else:
+            if own_executor:
+                executor.shutdown(wait=True)
+            with metrics.stage("save"):
+                output.close()
+                # I segmenti vanno salvati prima di eliminare il journal, che ne è l'unica altra copia
+                all_segments = [segment for chunk_segments in segments for segment in chunk_segments]
+                if all_segments:
+                    SegmentStore.from_segments(all_segments).save(txt_path)
+                else:
+                    SegmentStore.delete(txt_path)
+                journal.finish()
+                # Metadati per la libreria (durata e audio di origine non si ricavano dal solo file di testo)
+                if self.library_index is not None:
+                    self.library_index.record_transcript(txt_path, duration=end_sec - start_sec,
+                                                         source_hash=source, source_path=audio_handler.filepath)
+            self._finish_metrics(metrics, audio_handler, "completato")
+
+        if text_callback:
+            text_callback(f"\n⏱️ {metrics.describe()}")
+            text_callback(f"\n✅ SALVATO IN LIBRERIA:\n{os.path.basename(txt_path)}")
 
-            finally:
-                # Pulizia: Rimuoviamo il file temporaneo per non intasare il disco
-                # Il blocco 'finally' garantisce l'esecuzione anche se la chiamata API fallisce.
-                if os.path.exists(temp_filename):
-                    os.remove(temp_filename)
+        # Ricomposizione nell'ordine originale dei chunk
+        return "".join(text + " " for text in results)
 
-        # 5. Salvataggio su File
-        self.save_to_file(output_filename, full_transcript, text_callback)
+    @staticmethod
+    def _finish_metrics(metrics: PipelineMetrics, audio_handler: Any, status: str):
+        """Chiude le metriche del lavoro (con i tempi di caricamento dell'audio) e le scrive su disco."""
+        metrics.merge(getattr(audio_handler, "metrics", None))
+        metrics.finish(status)
+        metrics.write()
+
+    def _transcribe_chunk(self, client: "Groq", planner: ChunkPlanner, audio_handler: Any,
+                          spans: List[Tuple[float, float]], index: int, use_cache: bool,
+                          metrics: Optional[PipelineMetrics] = None) -> Tuple[str, bool, int, List[List[Any]]]:
+        """
+        Codifica un singolo chunk in memoria e lo invia all'API. Eseguito nei thread del pool.
+
+        Se la dimensione reale supera il limite, il pianificatore lo divide in più parti
+        che vengono inviate in sequenza e ricomposte. Le parti già trascritte in passato
+        (stessi byte, stesso modello e parametri) vengono lette dalla cache senza upload.
+        Le richieste passano dal RequestController (concorrenza adattiva e retry).
+
+        Args:
+            client (Groq): Il client API condiviso tra i thread.
+            planner (ChunkPlanner): Il pianificatore (profilo di codifica e verifica dimensione).
+            audio_handler (AudioHandler): L'handler da cui estrarre l'audio.
+            spans (List[Tuple[float, float]]): Gli intervalli originali che compongono il chunk.
+            index (int): Indice del chunk da elaborare.
+            use_cache (bool): Se True, consulta e aggiorna la cache dei risultati.
+            metrics (PipelineMetrics, optional): Dove registrare i tempi e la latenza del chunk.
+
+        Returns:
+            Tuple[str, bool, int, List]: Il testo trascritto del chunk, se è arrivato interamente dalla cache,
+                                         il numero di tentativi ripetuti e i segmenti temporizzati.
+        """
+        # Codifica in memoria: i byte prodotti da FFmpeg vengono passati così come sono all'upload
+        start = time.perf_counter()
+        parts = planner.encode(audio_handler, spans)
+        encoded = time.perf_counter()
+        result = self.transcribe_encoded(client, parts, index, planner.profile.extension, use_cache, metrics)
+
+        if metrics:
+            metrics.add_time("encode", encoded - start)
+            metrics.count("chunks")
+            metrics.record_chunk(index, encode_s=round(encoded - start, 3),
+                                 latency_s=round(time.perf_counter() - encoded, 3),
+                                 bytes=sum(len(data) for _, data in parts), parts=len(parts),
+                                 retries=result[2], cached=result[1])
+        return result
+
+    @staticmethod
+    def create_client(api_key: str, base_url: Optional[str] = None) -> "Groq":
+        """
+        Crea il client Groq usato per le trascrizioni.
+
+        Args:
+            api_key (str): La chiave API per autenticarsi su Groq.
+            base_url (str, optional): Indirizzo alternativo dell'API (None: API reale).
+
+        Returns:
+            Groq: Il client, con i retry interni disattivati (li gestisce il RequestController).
+        """
+        from groq import Groq
 
-        return full_transcript
+        return Groq(api_key=api_key, base_url=base_url, max_retries=0)
+
+    def transcribe_encoded(self, client: "Groq", parts: List[Tuple[List[Tuple[float, float]], bytes]],
+                           index: int, extension: str, use_cache: bool = True,
+                           metrics: Optional[PipelineMetrics] = None) -> Tuple[str, bool, int, List[List[Any]]]:
+        """
+        Invia all'API le parti già codificate di un chunk e ne ricompone il testo.
+
+        Args:
+            client (Groq): Il client API condiviso tra i thread.
+            parts (List): Le parti (span, byte codificati) prodotte da ChunkPlanner.encode.
+            index (int): Indice del chunk (usato solo per il nome del file inviato).
+            extension (str): Estensione del formato di codifica (es. "mp3").
+            use_cache (bool): Se True, consulta e aggiorna la cache dei risultati.
+            metrics (PipelineMetrics, optional): Dove registrare attesa e durata delle richieste e byte inviati.
+
+        Returns:
+            Tuple[str, bool, int, List]: Il testo trascritto, se è arrivato interamente dalla cache,
+                                         il numero di tentativi ripetuti e i segmenti [inizio, fine, testo]
+                                         nel tempo della registrazione originale.
+        """
+        texts = []
+        segments = []
+        all_cached = True
+        retries = 0
+        metrics = metrics or PipelineMetrics()
+        for part, (spans, data) in enumerate(parts):
+            with metrics.stage("cache"):
+                key = ResultCache.make_key(data, MODEL, REQUEST_PARAMS)
+                cached = self.result_cache.get(key) if use_cache else None
+
+            if cached is not None:
+                text, part_segments = cached
+                metrics.count("cache_hits")
+            else:
+                all_cached = False
+                request_seconds = 0.0
+
+                def timed_request(**kwargs):
+                    # Solo la richiesta vera e propria: il resto della chiamata è attesa
+                    # di uno slot libero o backoff tra un tentativo e l'altro
+                    nonlocal request_seconds
+                    request_start = time.perf_counter()
+                    try:
+                        return client.audio.transcriptions.with_raw_response.create(**kwargs)
+                    finally:
+                        request_seconds += time.perf_counter() - request_start
+
+                # Chiamata API Groq
+                # Usiamo la risposta grezza per leggere gli header di rate-limit.
+                # Il nome serve solo all'API per riconoscere il formato del contenuto
+                call_start = time.perf_counter()
+                response, attempts = self.request_controller.call(
+                    timed_request,
+                    file=(f"chunk_{index}_{part}.{extension}", data),
+                    model=MODEL,
+                    **REQUEST_PARAMS
+                )
+                metrics.add_time("api_request", request_seconds)
+                metrics.add_time("api_wait", time.perf_counter() - call_start - request_seconds)
+                metrics.count("bytes_uploaded", len(data))
+                metrics.count("retries", attempts)
+                retries += attempts
+                result = response.parse()
+                text = result.text
+                part_segments = self.parse_segments(result)
+                if use_cache:
+                    # In cache i tempi restano relativi all'audio inviato: la chiave dipende solo dai byte
+                    self.result_cache.put(key, text, part_segments)
+
+            texts.append(text)
+            # I tempi dell'API sono relativi all'audio inviato, che può essere la concatenazione di più span
+            offset_map = OffsetMap(spans)
+            segments.extend([offset_map.to_original(start), offset_map.to_original(end), segment_text]
+                            for start, end, segment_text in part_segments)
+
+        return " ".join(texts), all_cached, retries, segments
+
+    @staticmethod
+    def parse_segments(result: Any) -> List[List[Any]]:
+        """
+        Estrae i segmenti temporizzati da una risposta verbose_json.
+
+        Args:
+            result (Any): La risposta dell'API già decodificata.
+
+        Returns:
+            List[List[Any]]: I segmenti [inizio, fine, testo] (vuota se la risposta non ne contiene).
+        """
+        segments = []
+        for segment in getattr(result, "segments", None) or []:
+            # Il client espone i campi non previsti dal suo modello come dizionari
+            fields = segment if isinstance(segment, dict) else vars(segment)
+            segments.append([float(fields["start"]), float(fields["end"]), str(fields.get("text", ""))])
+        return segments
+
+    @staticmethod
+    def get_output_path(filename_input: str) -> str:
+        """
+        Costruisce il percorso del file di testo nella cartella centralizzata.
+
+        Args:
+            filename_input (str): Il nome del file (o percorso) scelto dall'utente o derivato dall'audio.
+
+        Returns:
+            str: Il percorso del file .txt nella cartella 'Sbobinature'.
+        """
+        # 1. Recupero della cartella di destinazione (Sbobinature)
+        folder = utils.get_transcripts_folder()
+
+        # 2. Sanitizzazione del nome file
+        # os.path.basename assicura che prendiamo solo il nome file ed evitiamo percorsi malevoli
+        filename_only = os.path.basename(filename_input)
+
+        # Rimuoviamo l'estensione originale se presente (es. se l'input era "audio.mp3")
+        base_name = os.path.splitext(filename_only)[0]
+
+        # 3. Costruzione del percorso finale
+        return os.path.join(folder, f"{base_name}.txt")
 
     def save_to_file(self, filename_input: str, text: str, callback: Optional[Callable[[str], None]] = None):
         """
@@ -128,28 +470,17 @@ class Transcriber:
             callback (Callable, optional): Funzione per notificare l'avvenuto salvataggio.
         """
         try:
-            # 1. Recupero della cartella di destinazione (Sbobinature)
-            folder = utils.get_transcripts_folder()
-
-            # 2. Sanitizzazione del nome file
-            # os.path.basename assicura che prendiamo solo il nome file ed evitiamo percorsi malevoli
-            filename_only = os.path.basename(filename_input)
-
-            # Rimuoviamo l'estensione originale se presente (es. se l'input era "audio.mp3")
-            base_name = os.path.splitext(filename_only)[0]
-
-            # 3. Costruzione del percorso finale
-            txt_path = os.path.join(folder, f"{base_name}.txt")
+            txt_path = self.get_output_path(filename_input)
 
             # Scrittura del file (UTF-8 per supportare caratteri speciali ed emoji)
             with open(txt_path, "w", encoding="utf-8") as f:
                 f.write(text)
 
             if callback:
-                callback(f"\n✅ SALVATO IN LIBRERIA:\n{base_name}.txt")
+                callback(f"\n✅ SALVATO IN LIBRERIA:\n{os.path.basename(txt_path)}")
 
         except Exception as e:
             if callback:
                 callback(f"❌ Errore critico durante il salvataggio: {e}")
             # È buona norma stampare l'errore anche su console per debug
-            print(f"Error saving file: {e}")
\ No newline at end of file
+            print(f"Error saving file: {e}")
@@ -0,0 +1,331 @@
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from typing import Any, Dict, List, Optional, Tuple
+
+from dotenv import load_dotenv
+
+from backend.AudioHandler import AudioHandler
+from backend.ChunkPlanner import ChunkPlanner
+from backend.EncodingProfile import DEFAULT_PROFILE, PROFILES, get_profile
+from backend.SegmentStore import SegmentStore
+from backend.Transcriber import DEFAULT_MAX_WORKERS, Transcriber
+from utils import utils
+
+# Estensioni considerate audio quando viene passata una cartella
+AUDIO_EXTENSIONS = {".mp3", ".wav", ".m4a", ".ogg", ".opus", ".flac", ".aac", ".wma", ".mp4", ".webm"}
+
+
+# --- FUNZIONI ESEGUITE NEI PROCESSI WORKER ---
+# Devono stare a livello di modulo per poter essere serializzate (pickle) dal ProcessPoolExecutor.
+
+def _init_worker():
+    """Inizializzazione di ogni processo worker: configura i percorsi di FFmpeg."""
+    utils.setup_ffmpeg()
+
+
+# Handler già aperti in questo processo worker, per file: i chunk dello stesso file
+# non ricalcolano l'impronta né rileggono le cache. Pochi file alla volta sono in codifica.
+MAX_WORKER_HANDLERS = 4
+_worker_handlers: Dict[str, AudioHandler] = {}
+
+
+def _worker_handler(path: str, fingerprint: Optional[str] = None) -> AudioHandler:
+    """
+    Restituisce l'handler del file per questo processo, aprendolo solo la prima volta.
+
+    Args:
+        path (str): Il percorso del file audio.
+        fingerprint (str, optional): L'impronta calcolata da _prepare_file (None: da calcolare).
+    """
+    handler = _worker_handlers.pop(path, None)
+    if handler is None or (fingerprint and handler.fingerprint != fingerprint):
+        handler = AudioHandler()
+        handler.load_file(path, streaming=True, fingerprint=fingerprint)
+    # Reinserito in fondo: il primo del dizionario è quello usato meno di recente
+    _worker_handlers[path] = handler
+    while len(_worker_handlers) > MAX_WORKER_HANDLERS:
+        del _worker_handlers[next(iter(_worker_handlers))]
+    return handler
+
+
+def _prepare_file(path: str, profile_name: str, skip_silence: bool) -> Dict[str, Any]:
+    """
+    Analizza un file (durata, picchi, silenzi) e ne calcola il piano dei chunk.
+
+    Returns:
+        Dict[str, Any]: Durata, impronta del file e chunk (liste di span originali).
+    """
+    handler = _worker_handler(path)
+    planner = ChunkPlanner(get_profile(profile_name))
+    chunks, _ = planner.plan(handler, 0.0, handler.duration, skip_silence)
+    return {"duration": handler.duration, "fingerprint": handler.fingerprint, "chunks": chunks}
+
+
+def _encode_chunk(path: str, fingerprint: str, spans: List[Tuple[float, float]],
+                  profile_name: str) -> List[Tuple[List[Tuple[float, float]], bytes]]:
+    """
+    Codifica un singolo chunk con l'handler del file già aperto in questo processo
+    (o aperto ora con l'impronta di _prepare_file: picchi e durata arrivano dalla cache).
+
+    Returns:
+        List: Le parti (span, byte codificati), divise solo se oltre il limite di upload.
+    """
+    return ChunkPlanner(get_profile(profile_name)).encode(_worker_handler(path, fingerprint), spans)
+
+
+# --- ORCHESTRAZIONE NEL PROCESSO PRINCIPALE ---
+
+def expand_inputs(inputs: List[str], recursive: bool) -> List[str]:
+    """
+    Espande file, cartelle e pattern glob in una lista ordinata di file audio (senza duplicati).
+
+    Args:
+        inputs (List[str]): Percorsi o pattern passati da riga di comando.
+        recursive (bool): Se True, le cartelle vengono esplorate anche nelle sottocartelle.
+
+    Returns:
+        List[str]: I percorsi assoluti dei file trovati.
+    """
+    found = []
+    for item in inputs:
+        if os.path.isdir(item):
+            pattern = os.path.join(item, "**", "*") if recursive else os.path.join(item, "*")
+            candidates = [p for p in glob.glob(pattern, recursive=recursive)
+                          if os.path.splitext(p)[1].lower() in AUDIO_EXTENSIONS]
+        elif os.path.isfile(item):
+            candidates = [item]
+        else:
+            candidates = [p for p in glob.glob(item, recursive=True) if os.path.isfile(p)]
+
+        found.extend(os.path.abspath(p) for p in candidates)
+
+    return sorted(set(found))
+
+
+def emit(event: str, **fields: Any):
+    """Stampa un evento di avanzamento come riga JSON (leggibile da script e log collector)."""
+    print(json.dumps({"event": event, "time": round(time.time(), 3), **fields}, ensure_ascii=False), flush=True)
+
+
+class BatchRunner:
+    """
+    Esegue la trascrizione di molti file senza interfaccia grafica.
+
+    - Analisi e codifica (CPU) girano in un pool di processi, uno per core.
+    - Gli upload (rete) girano in un pool di thread, regolato dal RequestController.
+    Le due fasi si sovrappongono: appena un chunk è codificato parte il suo upload, mentre
+    i processi continuano a codificare i successivi. Il numero di chunk codificati in attesa
+    di upload è limitato, così la memoria resta contenuta.
+    """
+
+    def __init__(self, api_key: str, profile_name: str, skip_silence: bool, processes: int,
+                 uploads: int, output_dir: Optional[str], use_cache: bool):
+        self.profile_name = profile_name
+        self.extension = get_profile(profile_name).extension
+        self.skip_silence = skip_silence
+        self.processes = processes
+        self.uploads = uploads
+        self.output_dir = output_dir
+        self.use_cache = use_cache
+
+        # Il limite del RequestController segue --uploads (altrimenti resterebbe quello della GUI).
+        # L'indice della libreria serve solo se l'output finisce nella libreria.
+        in_library = output_dir is None or (os.path.normcase(os.path.abspath(output_dir)) ==
+                                            os.path.normcase(os.path.abspath(utils.get_transcripts_folder())))
+        self.transcriber = Transcriber(max_concurrency=uploads, use_library=in_library)
+        self.client = Transcriber.create_client(api_key)
+
+        # Stato per file: chunk pianificati, testi ricevuti, tempo di inizio
+        self.jobs: Dict[str, Dict[str, Any]] = {}
+        # File audio -> .txt di output (vedi assign_outputs)
+        self.outputs: Dict[str, str] = {}
+        # Chunk in attesa di codifica: (file, indice)
+        self.encode_queue: List[Tuple[str, int]] = []
+        self.failed: Dict[str, str] = {}
+
+    def assign_outputs(self, files: List[str]):
+        """
+        Decide il .txt di output di ogni file, senza che due file scrivano sullo stesso.
+
+        I file con un nome unico nel lotto mantengono il proprio nome. Se più file hanno lo stesso
+        nome (es. a/lezione.mp3 e b/lezione.mp3), l'output ne conserva il percorso relativo alla
+        cartella comune: sottocartelle con --output-dir, prefisso "a - " nella libreria.
+        Le collisioni residue (es. lezione.mp3 e lezione.wav) ricevono un suffisso " (2)", " (3)"...
+        """
+        stems: Dict[str, int] = {}
+        for path in files:
+            stem = os.path.splitext(os.path.basename(path))[0].lower()
+            stems[stem] = stems.get(stem, 0) + 1
+        root = os.path.commonpath([os.path.dirname(path) for path in files]) if files else ""
+
+        used = {os.path.normcase(output) for output in self.outputs.values()}
+        for path in files:
+            stem = os.path.splitext(os.path.basename(path))[0]
+            relative_dir = os.path.relpath(os.path.dirname(path), root) if stems[stem.lower()] > 1 else os.curdir
+            if self.output_dir:
+                folder = os.path.normpath(os.path.join(self.output_dir, relative_dir))
+                base = os.path.join(folder, stem)
+            else:
+                prefix = "" if relative_dir == os.curdir else " - ".join(relative_dir.split(os.sep)) + " - "
+                base = os.path.splitext(Transcriber.get_output_path(prefix + stem))[0]
+
+            candidate, n = f"{base}.txt", 1
+            while os.path.normcase(candidate) in used:
+                n += 1
+                candidate = f"{base} ({n}).txt"
+            used.add(os.path.normcase(candidate))
+            self.outputs[path] = candidate
+
+    def output_path(self, path: str) -> str:
+        """Percorso del .txt di output per un file audio (vedi assign_outputs)."""
+        if path not in self.outputs:
+            self.assign_outputs([path])
+        return self.outputs[path]
+
+    def run(self, files: List[str]) -> int:
+        """
+        Elabora tutti i file e restituisce il numero di file falliti.
+        """
+        started = time.monotonic()
+        # Limite ai chunk codificati non ancora caricati (memoria ~ limite * dimensione chunk)
+        max_buffered = self.uploads + self.processes
+
+        with ProcessPoolExecutor(max_workers=self.processes, initializer=_init_worker) as procs, \
+                ThreadPoolExecutor(max_workers=self.uploads) as threads:
+
+            # future -> (tipo, file, indice chunk)
+            active: Dict[Future, Tuple[str, str, int]] = {}
+            for path in files:
+                active[procs.submit(_prepare_file, path, self.profile_name, self.skip_silence)] = ("prepare", path, -1)
+
+            # Anche con nessun lavoro attivo possono restare chunk da codificare (es. un solo file appena analizzato)
+            while active or self.encode_queue:
+                # Avvia nuove codifiche finché il buffer lo consente
+                buffered = sum(1 for kind, _, _ in active.values() if kind in ("encode", "upload"))
+                while self.encode_queue and buffered < max_buffered:
+                    path, index = self.encode_queue.pop(0)
+                    if path in self.failed:
+                        continue
+                    job = self.jobs[path]
+                    active[procs.submit(_encode_chunk, path, job["fingerprint"], job["chunks"][index],
+                                        self.profile_name)] = ("encode", path, index)
+                    buffered += 1
+
+                done, _ = wait(list(active), return_when=FIRST_COMPLETED)
+                for future in done:
+                    kind, path, index = active.pop(future)
+                    if path in self.failed:
+                        continue
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        self.failed[path] = str(e)
+                        emit("file_error", file=path, stage=kind, error=str(e))
+                        continue
+
+                    if kind == "prepare":
+                        self.on_prepared(path, result)
+                    elif kind == "encode":
+                        active[threads.submit(self.transcriber.transcribe_encoded, self.client, result,
+                                              index, self.extension, self.use_cache)] = ("upload", path, index)
+                    else:
+                        self.on_uploaded(path, index, result)
+
+        ok = len(files) - len(self.failed)
+        emit("batch_done", files=len(files), ok=ok, failed=len(self.failed),
+             elapsed=round(time.monotonic() - started, 3))
+        return len(self.failed)
+
+    def on_prepared(self, path: str, plan: Dict[str, Any]):
+        """Registra il piano di un file e mette in coda la codifica dei suoi chunk."""
+        chunks = plan["chunks"]
+        self.jobs[path] = {"chunks": chunks, "texts": [None] * len(chunks), "segments": [[] for _ in chunks],
+                           "done": 0, "duration": plan["duration"], "fingerprint": plan["fingerprint"],
+                           "started": time.monotonic()}
+        emit("file_start", file=path, duration=round(plan["duration"], 3), chunks=len(chunks))
+
+        if not chunks:
+            self.finish(path)
+            return
+        self.encode_queue.extend((path, i) for i in range(len(chunks)))
+
+    def on_uploaded(self, path: str, index: int, result: Tuple[str, bool, int, List[List[Any]]]):
+        """Registra il testo di un chunk e, se era l'ultimo, scrive il file di output."""
+        text, from_cache, retries, segments = result
+        job = self.jobs[path]
+        job["texts"][index] = text
+        job["segments"][index] = segments
+        job["done"] += 1
+        emit("chunk_done", file=path, index=index, total=len(job["chunks"]), cached=from_cache, retries=retries)
+
+        if job["done"] == len(job["chunks"]):
+            self.finish(path)
+
+    def finish(self, path: str):
+        """Scrive la trascrizione completa di un file."""
+        job = self.jobs[path]
+        txt_path = self.output_path(path)
+        os.makedirs(os.path.dirname(txt_path), exist_ok=True)
+        # Stesso formato di Transcriber.process_audio: chunk nell'ordine originale
+        with open(txt_path, "w", encoding="utf-8") as f:
+            f.write("".join(text + " " for text in job["texts"]))
+        segments = [segment for chunk_segments in job["segments"] for segment in chunk_segments]
+        if segments:
+            SegmentStore.from_segments(segments).save(txt_path)
+        if self.transcriber.library_index is not None:
+            self.transcriber.library_index.record_transcript(txt_path, duration=job["duration"],
+                                                             source_hash=job["fingerprint"], source_path=path)
+        emit("file_done", file=path, output=txt_path, elapsed=round(time.monotonic() - job["started"], 3))
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """
+    Entry point da riga di comando.
+
+    Esempio:
+        python src/cli.py lezioni/ "registrazioni/**/*.m4a" --profile opus --skip-silence
+    """
+    parser = argparse.ArgumentParser(description="Sbobinator headless: trascrive file e cartelle in batch.")
+    parser.add_argument("inputs", nargs="+", help="File audio, cartelle o pattern glob.")
+    parser.add_argument("-r", "--recursive", action="store_true", help="Esplora anche le sottocartelle.")
+    parser.add_argument("--profile", default=DEFAULT_PROFILE, choices=list(PROFILES),
+                        help="Profilo di codifica dei chunk.")
+    parser.add_argument("--skip-silence", action="store_true", help="Non invia i silenzi lunghi.")
+    parser.add_argument("--processes", type=int, default=os.cpu_count() or 1,
+                        help="Processi per analisi e codifica (default: numero di core).")
+    parser.add_argument("--uploads", type=int, default=DEFAULT_MAX_WORKERS,
+                        help="Upload contemporanei massimi.")
+    parser.add_argument("--output-dir", help="Cartella di output (default: la libreria 'Sbobinature').")
+    parser.add_argument("--skip-existing", action="store_true", help="Salta i file già trascritti.")
+    parser.add_argument("--no-cache", action="store_true", help="Ignora la cache dei risultati.")
+    args = parser.parse_args(argv)
+
+    load_dotenv()
+    api_key = os.getenv("GROQ_API_KEY")
+    if not api_key:
+        print("GROQ_API_KEY mancante (variabile d'ambiente o file .env).", file=sys.stderr)
+        return 2
+
+    utils.setup_ffmpeg()
+
+    runner = BatchRunner(api_key, args.profile, args.skip_silence, max(1, args.processes),
+                         max(1, args.uploads), args.output_dir, not args.no_cache)
+
+    files = expand_inputs(args.inputs, args.recursive)
+    runner.assign_outputs(files)
+    if args.skip_existing:
+        files = [f for f in files if not os.path.exists(runner.output_path(f))]
+
+    emit("batch_start", files=len(files), processes=runner.processes, uploads=runner.uploads)
+    failed = runner.run(files)
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,22 @@
+import os
+
+import pytest
+
+from utils import utils
+
+
+@pytest.fixture(autouse=True)
+def isolated_folders(tmp_path, monkeypatch):
+    """Cache e libreria in una cartella temporanea: i test non scrivono accanto ai sorgenti."""
+    def get_cache_folder(name):
+        folder = os.path.join(str(tmp_path), "Cache", name)
+        os.makedirs(folder, exist_ok=True)
+        return folder
+
+    def get_transcripts_folder():
+        folder = os.path.join(str(tmp_path), "Sbobinature")
+        os.makedirs(folder, exist_ok=True)
+        return folder
+
+    monkeypatch.setattr(utils, "get_cache_folder", get_cache_folder)
+    monkeypatch.setattr(utils, "get_transcripts_folder", get_transcripts_folder)
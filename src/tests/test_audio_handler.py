@@ -0,0 +1,90 @@
+import os
+import shutil
+import subprocess
+import tempfile
+
+import numpy as np
+import pytest
+
+from backend.AudioHandler import AudioHandler
+from backend.EncodingProfile import PROFILES
+from backend.OffsetMap import OffsetMap
+from tools.loadtest import generate_speech_like_wav
+from utils import utils
+
+pytestmark = pytest.mark.skipif(shutil.which("ffmpeg") is None, reason="FFmpeg non disponibile")
+
+
+@pytest.fixture(scope="module")
+def handler(tmp_path_factory):
+    path = str(tmp_path_factory.mktemp("audio") / "speech.wav")
+    generate_speech_like_wav(path, 120, seed=4)
+    audio_handler = AudioHandler(use_cache=False)
+    audio_handler.load_file(path, streaming=True)
+    return audio_handler
+
+
+def encoded_seconds(audio_handler, spans):
+    """Durata dell'audio prodotto da encode_spans, misurata decodificandolo (FLAC, senza ritardo del codec)."""
+    data = audio_handler.encode_spans(spans, PROFILES["flac"])
+    ffmpeg, _ = utils.get_ffmpeg_binaries()
+    pcm = subprocess.run([ffmpeg, "-v", "error", "-i", "pipe:0", "-f", "s16le", "-ac", "1", "-ar", "16000", "pipe:1"],
+                         input=data, capture_output=True, check=True).stdout
+    return len(np.frombuffer(pcm, dtype=np.int16)) / 16000
+
+
+def test_encoded_duration_matches_spans(handler):
+    spans = [(3.0, 10.5), (20.25, 31.0), (60.0, 61.5)]
+    expected = sum(end - start for start, end in spans)
+    assert abs(encoded_seconds(handler, spans) - expected) < 0.1
+
+
+def test_zero_width_spans_do_not_extend_the_chunk(handler):
+    # Span degeneri come quelli prodotti da OffsetMap.slice sui bordi, in mezzo a span normali
+    spans = [(3.0, 10.0), (10.0, 10.000000000000002), (20.0, 25.0)]
+    assert abs(encoded_seconds(handler, spans) - 12.0) < 0.1
+
+
+def test_encoded_duration_matches_offset_map_slices(handler):
+    offset_map = OffsetMap([(1.0, 9.5), (11.0, 40.25), (41.0, 100.0)])
+    cut = offset_map.upload_starts[1]
+    for spans in (offset_map.slice(0.0, cut), offset_map.slice(cut, offset_map.duration)):
+        expected = sum(end - start for start, end in spans)
+        assert abs(encoded_seconds(handler, spans) - expected) < 0.1
+
+
+def test_streaming_decode_failure_raises(tmp_path):
+    path = str(tmp_path / "sparito.wav")
+    generate_speech_like_wav(path, 10, seed=1)
+    audio_handler = AudioHandler(use_cache=False)
+    audio_handler.load_file(path, streaming=True)
+    # Sorgente non più leggibile (es. disco scollegato): FFmpeg termina con errore
+    os.remove(path)
+
+    with pytest.raises(RuntimeError):
+        list(audio_handler.iter_pcm_blocks(0.0, 5.0))
+    with pytest.raises(RuntimeError):
+        audio_handler.encode_chunk(0.0, 5.0)
+
+
+def test_streaming_and_decoded_modes_read_the_same_samples(tmp_path):
+    path = str(tmp_path / "breve.wav")
+    generate_speech_like_wav(path, 12, seed=2)
+    streaming = AudioHandler(use_cache=False)
+    streaming.load_file(path, streaming=True)
+    decoded = AudioHandler()
+    decoded.load_file(path, streaming=False)
+
+    assert streaming.duration == pytest.approx(decoded.duration)
+    from_pipe = np.concatenate(list(streaming.iter_pcm_blocks(2.0, 9.0, block_seconds=1.5)))
+    from_store = np.concatenate(list(decoded.iter_pcm_blocks(2.0, 9.0, block_seconds=1.5)))
+    np.testing.assert_array_equal(from_pipe, from_store)
+
+
+def test_encoding_leaves_no_temporary_files(handler, tmp_path, monkeypatch):
+    # I chunk passano in memoria da e verso FFmpeg: nessun file intermedio su disco
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(tempfile, "tempdir", str(tmp_path))
+    data = handler.encode_chunk(10.0, 20.0)
+    assert data
+    assert os.listdir(tmp_path) == []
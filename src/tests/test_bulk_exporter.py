@@ -0,0 +1,53 @@
+import os
+
+import pytest
+
+from backend.BulkExporter import BulkExporter
+from backend.LibraryIndex import LibraryIndex
+
+pytest.importorskip("fpdf")
+
+
+def write(path, text):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(text)
+
+
+def test_only_stale_exports_are_regenerated(tmp_path):
+    folder = str(tmp_path)
+    txt_paths = [os.path.join(folder, f"lezione{n}.txt") for n in range(3)]
+    for n, path in enumerate(txt_paths):
+        write(path, f"Trascrizione numero {n}.")
+    exporter = BulkExporter(LibraryIndex(folder=folder), processes=2)
+    progress = []
+
+    first = exporter.run(txt_paths, ["pdf"], progress_callback=lambda done, total: progress.append((done, total)))
+
+    assert sorted(first["exported"]) == [os.path.join(folder, f"lezione{n}.pdf") for n in range(3)]
+    assert first["skipped"] == 0 and first["failed"] == {}
+    assert progress[-1] == (3, 3)
+    assert exporter.run(txt_paths, ["pdf"])["skipped"] == 3
+
+    # Stesso contenuto con una data nuova: basta l'hash; contenuto cambiato: va rigenerato
+    os.utime(txt_paths[0], ns=(os.stat(txt_paths[0]).st_atime_ns, os.stat(txt_paths[0]).st_mtime_ns + 10**9))
+    write(txt_paths[1], "Trascrizione corretta.")
+    todo, skipped = exporter.plan(txt_paths, ["pdf"])
+    assert todo == [(txt_paths[1], "pdf")]
+    assert len(skipped) == 2
+    assert len(exporter.plan(txt_paths, ["pdf"], force=True)[0]) == 3
+
+
+def test_exports_older_than_the_index_are_trusted_by_date(tmp_path):
+    folder = str(tmp_path)
+    txt_path = os.path.join(folder, "lezione.txt")
+    write(txt_path, "Testo.")
+    pdf_path = os.path.join(folder, "lezione.pdf")
+    write(pdf_path, "%PDF finto")
+    exporter = BulkExporter(LibraryIndex(folder=folder))
+
+    assert exporter.is_up_to_date(txt_path, pdf_path)
+    # Un .txt più recente dell'export lo rende da rigenerare
+    stat = os.stat(pdf_path)
+    write(txt_path, "Testo modificato.")
+    os.utime(txt_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    assert not exporter.is_up_to_date(txt_path, pdf_path)
@@ -0,0 +1,85 @@
+import shutil
+import wave
+
+import numpy as np
+import pytest
+
+from backend.AudioHandler import AudioHandler
+from backend.ChunkPlanner import ChunkPlanner
+from backend.EncodingProfile import get_profile
+from backend.SilenceAnalyzer import SilenceAnalyzer
+
+pytestmark = pytest.mark.skipif(shutil.which("ffmpeg") is None, reason="FFmpeg non disponibile")
+
+SAMPLE_RATE = 16000
+# 6 s di "parlato" seguiti da 3 s di silenzio, ripetuti: i silenzi lunghi sono noti in anticipo
+SPEECH_SEC, PAUSE_SEC, REPEATS = 6.0, 3.0, 10
+
+
+@pytest.fixture(scope="module")
+def handler(tmp_path_factory):
+    path = str(tmp_path_factory.mktemp("audio") / "pause.wav")
+    rng = np.random.default_rng(0)
+    with wave.open(path, "wb") as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(SAMPLE_RATE)
+        for _ in range(REPEATS):
+            speech = rng.normal(0, 6000, int(SPEECH_SEC * SAMPLE_RATE))
+            pause = rng.normal(0, 20, int(PAUSE_SEC * SAMPLE_RATE))
+            f.writeframes(np.clip(np.concatenate((speech, pause)), -32768, 32767).astype("<i2").tobytes())
+    audio_handler = AudioHandler(use_cache=False)
+    audio_handler.load_file(path, streaming=True)
+    return audio_handler
+
+
+def uploaded_seconds(chunk):
+    return sum(end - start for start, end in chunk)
+
+
+def test_silences_are_found_where_the_pauses_are(handler):
+    silences = SilenceAnalyzer().find_silences(handler.get_peaks())
+
+    long_silences = [(start, end) for start, end in silences if end - start >= 2.0]
+    assert len(long_silences) == REPEATS
+    for n, (start, end) in enumerate(long_silences):
+        expected_start = n * (SPEECH_SEC + PAUSE_SEC) + SPEECH_SEC
+        assert start == pytest.approx(expected_start, abs=0.1)
+        assert end == pytest.approx(expected_start + PAUSE_SEC, abs=0.1)
+
+
+def test_chunks_cover_the_range_within_the_byte_budget(handler):
+    planner = ChunkPlanner(get_profile("mp3"), target_bytes=160_000)
+
+    chunks, offset_map = planner.plan(handler, 0.0, handler.duration)
+
+    assert len(chunks) > 1
+    assert all(uploaded_seconds(chunk) <= planner.chunk_seconds + 1e-6 for chunk in chunks)
+    assert sum(uploaded_seconds(chunk) for chunk in chunks) == pytest.approx(handler.duration)
+    # I tagli interni cadono nelle pause, non a metà del parlato
+    for chunk in chunks[:-1]:
+        position = chunk[-1][1] % (SPEECH_SEC + PAUSE_SEC)
+        assert position >= SPEECH_SEC - 0.1
+
+
+def test_skip_silence_removes_long_pauses(handler):
+    planner = ChunkPlanner(get_profile("mp3"), target_bytes=160_000)
+
+    chunks, offset_map = planner.plan(handler, 0.0, handler.duration, skip_silence=True)
+
+    # Restano il parlato e i margini attorno a ogni taglio
+    assert offset_map.duration < handler.duration - REPEATS * (PAUSE_SEC - 1.0)
+    assert offset_map.duration >= REPEATS * SPEECH_SEC
+    assert sum(uploaded_seconds(chunk) for chunk in chunks) == pytest.approx(offset_map.duration)
+
+
+def test_encoded_parts_respect_the_upload_limit(handler):
+    # Limite artificialmente basso: il chunk codificato va diviso di nuovo
+    planner = ChunkPlanner(get_profile("flac"), target_bytes=10_000_000, max_bytes=400_000)
+    chunks, _ = planner.plan(handler, 0.0, 30.0)
+
+    parts = planner.encode(handler, chunks[0])
+
+    assert len(parts) > 1
+    assert all(len(data) <= planner.max_bytes for _, data in parts)
+    assert sum(uploaded_seconds(spans) for spans, _ in parts) == pytest.approx(30.0)
@@ -0,0 +1,60 @@
+import os
+import shutil
+import subprocess
+
+import pytest
+
+from backend.EncodingProfile import DEFAULT_PROFILE
+import cli
+from cli import BatchRunner
+from tools.FakeGroqServer import FakeGroqServer
+
+
+def make_runner(output_dir, uploads=4):
+    # Il client viene solo creato: nessuna richiesta parte finché non si chiama run()
+    return BatchRunner("gsk_test", DEFAULT_PROFILE, skip_silence=False, processes=1, uploads=uploads,
+                       output_dir=output_dir, use_cache=False)
+
+
+def test_same_name_in_different_folders_gets_distinct_outputs(tmp_path):
+    out = str(tmp_path / "out")
+    files = [os.path.join("/data", "a", "lecture.mp3"), os.path.join("/data", "b", "lecture.mp3"),
+             os.path.join("/data", "a", "intro.mp3")]
+    runner = make_runner(out)
+    runner.assign_outputs(files)
+
+    assert runner.output_path(files[0]) == os.path.join(out, "a", "lecture.txt")
+    assert runner.output_path(files[1]) == os.path.join(out, "b", "lecture.txt")
+    assert runner.output_path(files[2]) == os.path.join(out, "intro.txt")
+
+
+def test_same_stem_in_same_folder_gets_suffix(tmp_path):
+    files = [os.path.join("/data", "lecture.mp3"), os.path.join("/data", "lecture.wav")]
+    runner = make_runner(str(tmp_path))
+    runner.assign_outputs(files)
+    assert len({runner.output_path(f) for f in files}) == 2
+
+
+def test_upload_limit_and_external_output_dir(tmp_path):
+    runner = make_runner(str(tmp_path), uploads=16)
+    # --uploads oltre il default non viene ridotto dal RequestController
+    assert runner.transcriber.request_controller.max_concurrency == 16
+    # Output fuori dalla libreria: l'indice della GUI non viene toccato
+    assert runner.transcriber.library_index is None
+
+
+@pytest.mark.skipif(shutil.which("ffmpeg") is None, reason="FFmpeg non disponibile")
+def test_single_file_batch_writes_output(tmp_path, monkeypatch):
+    # Un solo file: dopo l'analisi non resta nessun lavoro attivo, ma i chunk vanno comunque codificati
+    audio = tmp_path / "lezione.mp3"
+    subprocess.run(["ffmpeg", "-v", "error", "-f", "lavfi", "-i", "sine=frequency=440:duration=5", str(audio)],
+                   check=True)
+    server = FakeGroqServer(latency_median=0.01).start()
+    try:
+        monkeypatch.setenv("GROQ_BASE_URL", server.base_url)
+        monkeypatch.setenv("GROQ_API_KEY", "gsk_test")
+        out = tmp_path / "out"
+        assert cli.main([str(audio), "--output-dir", str(out), "--processes", "1", "--no-cache"]) == 0
+    finally:
+        server.stop()
+    assert (out / "lezione.txt").read_text(encoding="utf-8").strip()
@@ -0,0 +1,83 @@
+import threading
+
+import pytest
+
+from ui.EventBus import EventBus
+
+
+class ManualWidget:
+    """Sostituto di un widget Tk: i tick programmati con after() partono solo quando il test lo decide."""
+
+    def __init__(self):
+        self.scheduled = {}
+        self._ids = iter(range(1, 1_000_000))
+
+    def after(self, ms, callback):
+        timer = f"after#{next(self._ids)}"
+        self.scheduled[timer] = callback
+        return timer
+
+    def after_cancel(self, timer):
+        self.scheduled.pop(timer, None)
+
+    def run_pending(self):
+        for timer in list(self.scheduled):
+            self.scheduled.pop(timer)()
+
+
+def test_latest_values_are_coalesced_and_batches_keep_order():
+    bus = EventBus(ManualWidget())
+    progress, logs = [], []
+    bus.subscribe_latest("progress", lambda key, value: progress.append((key, value)))
+    bus.subscribe_batch("log", logs.append)
+
+    def worker(job):
+        for n in range(100):
+            bus.publish("progress", n, key=job)
+            bus.publish("log", f"{job}:{n}")
+
+    threads = [threading.Thread(target=worker, args=(job,)) for job in ("a", "b")]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    bus.drain()
+
+    # Un solo aggiornamento per lavoro, con l'ultimo valore; tutti i log in una sola chiamata
+    assert sorted(progress) == [("a", 99), ("b", 99)]
+    assert len(logs) == 1 and len(logs[0]) == 200
+    assert [line for line in logs[0] if line.startswith("a:")] == [f"a:{n}" for n in range(100)]
+
+
+def test_ticks_deliver_events_until_stopped():
+    widget = ManualWidget()
+    bus = EventBus(widget)
+    received = []
+    bus.subscribe_latest("stato", lambda key, value: received.append(value))
+
+    bus.start()
+    bus.publish("stato", "pronto")
+    widget.run_pending()
+    assert received == ["pronto"]
+    # Il tick successivo è già programmato
+    assert len(widget.scheduled) == 1
+
+    bus.stop()
+    bus.publish("stato", "in coda")
+    assert widget.scheduled == {}
+    assert received == ["pronto"]
+
+
+def test_handler_error_does_not_stop_the_ticks():
+    widget = ManualWidget()
+    bus = EventBus(widget)
+
+    def broken(key, value):
+        raise RuntimeError("gestore rotto")
+
+    bus.subscribe_latest("stato", broken)
+    bus.start()
+    bus.publish("stato", 1)
+    with pytest.raises(RuntimeError):
+        widget.run_pending()
+    assert len(widget.scheduled) == 1
@@ -0,0 +1,43 @@
+from backend import JobJournal as journal_module
+from backend.JobJournal import JobJournal
+
+
+def test_resume_after_truncated_line_keeps_new_records(tmp_path):
+    journal = JobJournal("job", folder=str(tmp_path))
+    journal.start({"chunks": [[0, 1], [1, 2], [2, 3]]})
+    journal.record_chunk(0, "uno")
+    journal.close()
+
+    # Crash durante la scrittura del secondo chunk: riga incompleta, senza a capo
+    with open(journal.path, "a", encoding="utf-8") as f:
+        f.write('{"type": "chunk", "index": 1, "te')
+
+    journal = JobJournal("job", folder=str(tmp_path))
+    header, done = journal.load()
+    assert set(done) == {0}
+    journal.start(header, resume=True)
+    journal.record_chunk(1, "due")
+    journal.close()
+
+    _, done = JobJournal("job", folder=str(tmp_path)).load()
+    assert done == {0: ("uno", []), 1: ("due", [])}
+
+
+def test_truncated_line_longer_than_read_block(tmp_path, monkeypatch):
+    # Blocchi piccoli: la riga incompleta viene cercata su più letture all'indietro
+    monkeypatch.setattr(journal_module, "TAIL_BLOCK_BYTES", 8)
+    journal = JobJournal("job", folder=str(tmp_path))
+    journal.start({"chunks": [[0, 1], [1, 2]]})
+    journal.record_chunk(0, "uno")
+    journal.close()
+    with open(journal.path, "a", encoding="utf-8") as f:
+        f.write('{"type": "chunk", "index": 1, "text": "' + "x" * 100)
+
+    journal = JobJournal("job", folder=str(tmp_path))
+    header, _ = journal.load()
+    journal.start(header, resume=True)
+    journal.record_chunk(1, "due")
+    journal.close()
+
+    _, done = JobJournal("job", folder=str(tmp_path)).load()
+    assert done == {0: ("uno", []), 1: ("due", [])}
@@ -0,0 +1,81 @@
+import os
+import shutil
+import threading
+import time
+
+import pytest
+
+from backend.JobScheduler import (JobScheduler, STATUS_CANCELLED, STATUS_DONE, STATUS_FAILED, STATUS_QUEUED,
+                                  STATUS_RUNNING, TranscriptionJob)
+from backend.Transcriber import Transcriber
+from tools.FakeGroqServer import FakeGroqServer
+from tools.loadtest import generate_speech_like_wav
+from utils import utils
+
+pytestmark = pytest.mark.skipif(shutil.which("ffmpeg") is None, reason="FFmpeg non disponibile")
+
+
+def wait_until(condition, timeout=60.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timeout"
+        time.sleep(0.02)
+
+
+def test_jobs_run_by_priority_and_cancelled_jobs_are_skipped(tmp_path):
+    path = str(tmp_path / "lezione.wav")
+    generate_speech_like_wav(path, 20, seed=3)
+    server = FakeGroqServer(latency_median=0.05, latency_sigma=0.0).start()
+    started = []
+    first_running = threading.Event()
+    release = threading.Event()
+
+    def on_update(job):
+        if job.status == STATUS_RUNNING and job not in started:
+            started.append(job)
+            if len(started) == 1:
+                # Il primo lavoro resta fermo finché la coda non è pronta
+                first_running.set()
+                release.wait(timeout=10)
+
+    try:
+        scheduler = JobScheduler("gsk_test", Transcriber(base_url=server.base_url, target_bytes=50_000),
+                                 parallel_jobs=1, on_update=on_update)
+        first = scheduler.add_job(TranscriptionJob(path, 0, None, "primo", options={"use_cache": False}))
+        assert first_running.wait(timeout=10)
+        normal = scheduler.add_job(TranscriptionJob(path, 0, 10, "normale", options={"use_cache": False}))
+        urgent = scheduler.add_job(TranscriptionJob(path, 0, 10, "urgente", options={"use_cache": False}))
+        dropped = scheduler.add_job(TranscriptionJob(path, 0, 10, "annullato"))
+        scheduler.set_priority(urgent, 5)
+        scheduler.cancel(dropped)
+        release.set()
+
+        jobs = [first, normal, urgent]
+        wait_until(lambda: all(job.status not in (STATUS_QUEUED, STATUS_RUNNING) for job in jobs))
+    finally:
+        server.stop()
+
+    assert started == [first, urgent, normal]
+    assert [job.status for job in jobs] == [STATUS_DONE] * 3
+    assert dropped.status == STATUS_CANCELLED
+    for name in ("primo", "normale", "urgente"):
+        assert os.path.exists(os.path.join(utils.get_transcripts_folder(), f"{name}.txt"))
+    assert not os.path.exists(os.path.join(utils.get_transcripts_folder(), "annullato.txt"))
+    assert first.metrics is not None and first.metrics.status == "completato"
+    assert scheduler.remove_finished() == [first, normal, urgent, dropped] and scheduler.jobs == []
+
+
+def test_unreadable_file_marks_the_job_as_failed(tmp_path):
+    done = threading.Event()
+    logs = []
+
+    def on_update(job):
+        if job.status == STATUS_FAILED:
+            done.set()
+
+    scheduler = JobScheduler("gsk_test", Transcriber(base_url="http://127.0.0.1:9"), parallel_jobs=1,
+                             on_update=on_update, on_log=lambda job, text: logs.append(text))
+    job = scheduler.add_job(TranscriptionJob(str(tmp_path / "mancante.wav"), 0, None, "mancante"))
+
+    assert done.wait(timeout=30)
+    assert job.message and any("ERRORE" in line for line in logs)
@@ -0,0 +1,83 @@
+import os
+import threading
+
+from backend import LibraryIndex as library_index_module
+from backend.LibraryIndex import LibraryIndex
+
+
+def write(folder, name, text):
+    with open(os.path.join(folder, name), "w", encoding="utf-8") as f:
+        f.write(text)
+
+
+def test_sync_in_batches_indexes_and_removes(tmp_path, monkeypatch):
+    # Blocchi piccoli: la sincronizzazione rilascia e riprende il lock più volte
+    monkeypatch.setattr(library_index_module, "SYNC_BATCH_FILES", 2)
+    folder = str(tmp_path)
+    for n in range(5):
+        write(folder, f"lezione{n}.txt", f"parola{n} comune")
+    index = LibraryIndex(folder=folder)
+
+    assert index.sync(full=True)
+    changed, removed, seq = index.changes_since(0)
+    assert changed == {f"lezione{n}" for n in range(5)} and not removed
+    assert len(index.search("comune")) == 5
+
+    os.remove(os.path.join(folder, "lezione3.txt"))
+    assert index.sync(full=True)
+    changed, removed, _ = index.changes_since(seq)
+    assert removed == {"lezione3"}
+    assert [stem for stem, _, _ in index.search("parola3")] == []
+    assert not index.sync(full=True)
+
+
+def test_update_file_of_missing_unknown_file_is_ignored(tmp_path):
+    index = LibraryIndex(folder=str(tmp_path))
+    index.update_file(os.path.join(str(tmp_path), "mai_esistito.txt"))
+    assert index.changes_since(0) == (set(), set(), 0)
+
+
+def test_two_instances_never_share_a_sequence_number(tmp_path):
+    # GUI, Transcriber ed export aprono ciascuno il proprio LibraryIndex sullo stesso database
+    folder = str(tmp_path)
+    first, second = LibraryIndex(folder=folder), LibraryIndex(folder=folder)
+    names = [f"parte{n}.txt" for n in range(200)]
+    for name in names:
+        write(folder, name, "testo")
+
+    def record(index, subset):
+        for name in subset:
+            index.update_file(os.path.join(folder, name))
+
+    threads = [threading.Thread(target=record, args=(first, names[0::2])),
+               threading.Thread(target=record, args=(second, names[1::2]))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    # Ogni scrittura ha una sequenza diversa: chi legge in modo incrementale non perde modifiche
+    reader = LibraryIndex(folder=folder)
+    changed, _, current = reader.changes_since(0)
+    assert len(changed) == len(names)
+    assert current == len(names)
+
+
+def test_search_ignores_case_and_accents_and_matches_prefixes(tmp_path):
+    folder = str(tmp_path)
+    write(folder, "fisica.txt", "Oggi parliamo di Termodinamica e di entropia.")
+    write(folder, "chimica.txt", "La termodinamica chimica studia l'equilibrio.")
+    write(folder, "storia.txt", "La città di Roma fu fondata... così dice la leggenda.")
+    index = LibraryIndex(folder=folder)
+    index.sync(full=True)
+
+    assert {stem for stem, _, _ in index.search("TERMODINAMICA")} == {"fisica", "chimica"}
+    # Tutte le parole devono comparire; l'ultima anche solo come inizio di parola
+    assert [stem for stem, _, _ in index.search("termodinamica entr")] == ["fisica"]
+    assert [stem for stem, _, _ in index.search("citta cosi")] == ["storia"]
+    # Il nome pesa più del contenuto
+    assert index.search("chimica")[0][0] == "chimica"
+    # Le parole trovate sono evidenziate nell'estratto
+    _, snippet, _ = index.search("entropia")[0]
+    assert f"{library_index_module.HIGHLIGHT_START}entropia{library_index_module.HIGHLIGHT_END}" in snippet
+    assert index.search('"') == []
@@ -0,0 +1,29 @@
+from backend.OffsetMap import MIN_SPAN_SEC, OffsetMap
+
+
+def test_slice_on_span_edges_has_no_zero_width_spans():
+    offset_map = OffsetMap([(0.0, 10.1), (12.3, 20.7), (25.0, 537.275), (540.0, 600.0)])
+    # Tagli che cadono esattamente sulle giunzioni tra gli span (nel tempo caricato)
+    cuts = [0.0, *offset_map.upload_starts[1:], offset_map.duration]
+    for upload_start, upload_end in zip(cuts, cuts[1:]):
+        spans = offset_map.slice(upload_start, upload_end)
+        assert len(spans) == 1
+        assert spans[0] in offset_map.spans
+
+
+def test_slice_snaps_edges_and_drops_float_noise():
+    offset_map = OffsetMap([(0.0, 10.1), (12.3, 20.7)])
+    junction = offset_map.upload_starts[1]
+    spans = offset_map.slice(junction - 1e-9, junction + 5.0)
+    assert len(spans) == 1 and spans[0][0] == 12.3 and abs(spans[0][1] - 17.3) < 1e-9
+    assert all(end - start >= MIN_SPAN_SEC for start, end in spans)
+
+    spans = offset_map.slice(2.0, junction + 1e-12)
+    assert spans == [(2.0, 10.1)]
+
+
+def test_slice_total_duration_matches_request():
+    offset_map = OffsetMap([(0.0, 3.3), (4.4, 9.9), (10.0, 17.7)])
+    parts = [offset_map.slice(a, b) for a, b in ((0.0, 3.3), (3.3, 8.8), (8.8, offset_map.duration))]
+    total = sum(end - start for spans in parts for start, end in spans)
+    assert abs(total - offset_map.duration) < 1e-9
@@ -0,0 +1,67 @@
+import os
+import shutil
+import wave
+
+import numpy as np
+import pytest
+
+from backend.PCMStore import PCMStore
+
+pytestmark = pytest.mark.skipif(shutil.which("ffmpeg") is None, reason="FFmpeg non disponibile")
+
+
+def write_wav(path, samples, sample_rate=16000):
+    with wave.open(path, "wb") as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(sample_rate)
+        f.writeframes(samples.astype("<i2").tobytes())
+
+
+def make_store(tmp_path, **kwargs):
+    folder = tmp_path / "pcm"
+    folder.mkdir()
+    return PCMStore(folder=str(folder), **kwargs)
+
+
+def test_decode_once_then_map_from_disk(tmp_path):
+    samples = np.random.default_rng(1).integers(-3000, 3000, size=16000 * 5, dtype=np.int16)
+    path = str(tmp_path / "lezione.wav")
+    write_wav(path, samples)
+    store = make_store(tmp_path)
+
+    assert store.load("impronta") is None
+    decoded = store.decode("impronta", path)
+    np.testing.assert_array_equal(decoded, samples)
+
+    # Anche senza il file sorgente: i campioni arrivano dall'archivio, mappati in memoria
+    os.remove(path)
+    loaded = store.decode("impronta", path)
+    assert isinstance(loaded, np.memmap)
+    np.testing.assert_array_equal(loaded, samples)
+
+
+def test_failed_decode_leaves_no_entry(tmp_path):
+    path = str(tmp_path / "rotto.wav")
+    with open(path, "wb") as f:
+        f.write(b"non audio" * 100)
+    store = make_store(tmp_path)
+
+    with pytest.raises(RuntimeError):
+        store.decode("rotto", path)
+    assert store.load("rotto") is None
+    assert os.listdir(store.folder) == []
+
+
+def test_oldest_entries_are_evicted(tmp_path):
+    samples = np.zeros(16000, dtype=np.int16)
+    path = str(tmp_path / "uno.wav")
+    write_wav(path, samples)
+    # Spazio per una sola voce (32 KB di campioni più l'intestazione)
+    store = make_store(tmp_path, max_bytes=40_000)
+
+    store.decode("prima", path)
+    store.decode("seconda", path)
+
+    assert store.load("prima") is None
+    assert store.load("seconda") is not None
@@ -0,0 +1,71 @@
+import shutil
+
+import numpy as np
+import pytest
+
+from backend.AudioHandler import AudioHandler
+from backend.PeakCache import PeakCache
+from backend.PeakPyramid import PeakPyramid
+from tools.loadtest import generate_speech_like_wav
+
+SAMPLE_RATE = 16000
+
+
+def make_pyramid(samples, block=4096):
+    blocks = (samples[i:i + block] for i in range(0, len(samples), block))
+    return PeakPyramid.from_blocks(blocks, SAMPLE_RATE, bin_seconds=0.01)
+
+
+def test_peaks_match_min_max_of_each_column():
+    rng = np.random.default_rng(3)
+    samples = rng.integers(-20000, 20000, size=SAMPLE_RATE * 30, dtype=np.int16)
+    pyramid = make_pyramid(samples)
+
+    for points, start, end in ((100, 0.0, None), (37, 5.0, 12.5), (1000, 10.0, 11.0)):
+        peaks = pyramid.get_peaks(points, start, end)
+        assert 0 < len(peaks) <= points
+        first = int(start * SAMPLE_RATE)
+        last = len(samples) if end is None else int(end * SAMPLE_RATE)
+        # L'inviluppo dell'intervallo coincide con quello dei campioni, a qualsiasi livello di zoom
+        assert peaks[:, 0].min() == pytest.approx(samples[first:last].min() / 32768.0)
+        assert peaks[:, 1].max() == pytest.approx(samples[first:last].max() / 32768.0)
+        assert np.all(peaks[:, 0] <= peaks[:, 2]) and np.all(peaks[:, 2] <= peaks[:, 1].max())
+
+
+def test_blocks_of_any_size_give_the_same_pyramid():
+    rng = np.random.default_rng(5)
+    samples = rng.integers(-1000, 1000, size=SAMPLE_RATE * 3 + 77, dtype=np.int16)
+    # Blocchi non allineati ai bin e un ultimo bin parziale
+    np.testing.assert_array_equal(make_pyramid(samples, block=333).get_peaks(50),
+                                  make_pyramid(samples, block=SAMPLE_RATE).get_peaks(50))
+    assert make_pyramid(samples).duration == pytest.approx(len(samples) / SAMPLE_RATE, abs=0.01)
+
+
+def test_peak_cache_round_trip(tmp_path):
+    samples = np.random.default_rng(7).integers(-5000, 5000, size=SAMPLE_RATE * 10, dtype=np.int16)
+    pyramid = make_pyramid(samples)
+    cache = PeakCache(folder=str(tmp_path))
+
+    assert cache.load("impronta") is None
+    cache.save("impronta", 10.0, pyramid)
+    duration, loaded = cache.load("impronta")
+
+    assert duration == 10.0
+    np.testing.assert_array_equal(loaded.get_peaks(200), pyramid.get_peaks(200))
+
+
+@pytest.mark.skipif(shutil.which("ffmpeg") is None, reason="FFmpeg non disponibile")
+def test_second_load_reads_peaks_from_cache(tmp_path):
+    path = str(tmp_path / "lezione.wav")
+    generate_speech_like_wav(path, 20, seed=1)
+    first = AudioHandler()
+    first.load_file(path, streaming=True)
+    peaks = first.get_peaks().get_peaks(100)
+
+    second = AudioHandler()
+    second.load_file(path, streaming=True)
+
+    # Picchi e durata disponibili subito, senza decodificare di nuovo il file
+    assert second.peaks is not None
+    assert second.duration == pytest.approx(first.duration)
+    np.testing.assert_array_equal(second.get_peaks().get_peaks(100), peaks)
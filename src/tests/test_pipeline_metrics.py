@@ -0,0 +1,64 @@
+import json
+
+from backend.PipelineMetrics import PipelineMetrics
+
+
+def test_write_appends_jsonl_and_replaces_prometheus_file(tmp_path):
+    folder = str(tmp_path)
+    metrics = PipelineMetrics('lezione "1"')
+    with metrics.stage("plan"):
+        pass
+    metrics.add_time("api_request", 1.5)
+    metrics.count("bytes_uploaded", 2048)
+    metrics.record_chunk(1, latency_s=2.0, cached=False)
+    metrics.record_chunk(0, latency_s=1.0, cached=False)
+    metrics.record_chunk(2, latency_s=0.0, cached=True)
+    metrics.finish("completato")
+
+    jsonl_path, prometheus_path = metrics.write(folder)
+    PipelineMetrics("secondo").write(folder)
+
+    with open(jsonl_path, encoding="utf-8") as f:
+        records = [json.loads(line) for line in f]
+    # Una riga per chunk (in ordine di indice) e una per il riepilogo, per ogni lavoro
+    assert [r["type"] for r in records] == ["chunk", "chunk", "chunk", "job", "job"]
+    assert [r["index"] for r in records[:3]] == [0, 1, 2]
+    summary = records[3]
+    assert summary["status"] == "completato"
+    assert summary["counters"] == {"bytes_uploaded": 2048}
+    assert summary["stages"]["api_request"] == 1.5 and "plan" in summary["stages"]
+    # I chunk dalla cache non entrano nella latenza dell'API
+    assert summary["chunk_latency"]["max"] == 2.0
+
+    with open(prometheus_path, encoding="utf-8") as f:
+        prometheus = f.read()
+    # Il file Prometheus descrive solo l'ultimo lavoro scritto
+    assert 'job="secondo"' in prometheus and "lezione" not in prometheus
+
+
+def test_merge_adds_stages_and_counters():
+    metrics = PipelineMetrics("lezione")
+    metrics.add_time("encode", 1.0)
+    loading = PipelineMetrics()
+    loading.add_time("encode", 0.5)
+    loading.add_time("decode", 2.0)
+    loading.count("chunks", 3)
+
+    metrics.merge(loading)
+    metrics.merge(None)
+
+    assert metrics.stages == {"encode": 1.5, "decode": 2.0}
+    assert metrics.counters == {"chunks": 3}
+
+
+def test_prometheus_labels_are_escaped(tmp_path):
+    metrics = PipelineMetrics('lezione "1"\\bis')
+    metrics.count("chunks", 4)
+    metrics.finish("completato")
+
+    _, prometheus_path = metrics.write(str(tmp_path))
+
+    with open(prometheus_path, encoding="utf-8") as f:
+        prometheus = f.read()
+    assert 'sbobinator_chunks{job="lezione \\"1\\"\\\\bis"} 4' in prometheus
+    assert "# TYPE sbobinator_job_seconds gauge" in prometheus
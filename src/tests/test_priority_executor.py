@@ -0,0 +1,35 @@
+import threading
+
+from backend.PriorityExecutor import PriorityExecutor
+
+
+def test_higher_priority_runs_first_then_fifo():
+    pool = PriorityExecutor(max_workers=1)
+    gate = threading.Event()
+    order = []
+    # Il primo invio occupa l'unico thread: gli altri restano in coda
+    blocker = pool.submit(0, gate.wait)
+    futures = [pool.submit(0, order.append, "normale-1"),
+               pool.submit(0, order.append, "normale-2"),
+               pool.submit(1, order.append, "prioritario")]
+    gate.set()
+    for future in [blocker] + futures:
+        future.result(timeout=5)
+    assert order == ["prioritario", "normale-1", "normale-2"]
+
+
+def test_view_uses_current_priority_and_cancel_skips():
+    pool = PriorityExecutor(max_workers=1)
+    gate = threading.Event()
+    order = []
+    priority = {"value": 0}
+    view = pool.view(lambda: priority["value"])
+    blocker = pool.submit(0, gate.wait)
+    cancelled = view.submit(order.append, "annullato")
+    priority["value"] = 1
+    urgent = view.submit(order.append, "prioritario")
+    assert cancelled.cancel()
+    gate.set()
+    blocker.result(timeout=5)
+    urgent.result(timeout=5)
+    assert order == ["prioritario"]
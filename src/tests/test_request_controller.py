@@ -0,0 +1,57 @@
+import threading
+
+import groq
+import httpx
+
+from backend.RequestController import RequestController
+
+
+def rate_limit_error():
+    """Un 429 come quelli del client Groq, con l'attesa suggerita dal server (10 ms)."""
+    request = httpx.Request("POST", "http://127.0.0.1/openai/v1/audio/transcriptions")
+    response = httpx.Response(429, headers={"retry-after-ms": "10"}, request=request)
+    return groq.RateLimitError("Rate limit reached", response=response, body=None)
+
+
+def test_burst_of_429_halves_the_limit_once():
+    controller = RequestController(max_concurrency=8, initial_concurrency=8)
+    # Tutte le 8 richieste sono in volo quando ricevono 429 per lo stesso sovraccarico
+    barrier = threading.Barrier(8)
+    limits_on_retry = []
+    lock = threading.Lock()
+
+    def request(attempts):
+        attempts.append(1)
+        if len(attempts) == 1:
+            barrier.wait(timeout=5)
+            raise rate_limit_error()
+        with lock:
+            limits_on_retry.append(controller.limit)
+        return "ok"
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(controller.call(request, []))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results == [("ok", 1)] * 8
+    # Un solo dimezzamento: il primo tentativo ripetuto vede 4, non 1
+    assert min(limits_on_retry) == 4
+
+
+def test_new_congestion_event_halves_again():
+    controller = RequestController(max_concurrency=8, initial_concurrency=8)
+    limits = []
+
+    def request(attempts):
+        attempts.append(1)
+        limits.append(controller.limit)
+        # Anche il secondo tentativo, partito dopo il dimezzamento, riceve 429: è un nuovo evento
+        if len(attempts) <= 2:
+            raise rate_limit_error()
+        return "ok"
+
+    assert controller.call(request, []) == ("ok", 2)
+    assert limits == [8, 4, 2]
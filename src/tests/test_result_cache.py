@@ -0,0 +1,35 @@
+from backend.ResultCache import ResultCache
+
+
+def test_key_depends_on_audio_model_and_params():
+    key = ResultCache.make_key(b"audio", "whisper", {"response_format": "verbose_json", "language": "it"})
+    # L'ordine dei parametri non conta
+    assert key == ResultCache.make_key(b"audio", "whisper", {"language": "it", "response_format": "verbose_json"})
+    assert key != ResultCache.make_key(b"audio!", "whisper", {"response_format": "verbose_json", "language": "it"})
+    assert key != ResultCache.make_key(b"audio", "altro", {"response_format": "verbose_json", "language": "it"})
+    assert key != ResultCache.make_key(b"audio", "whisper", {"response_format": "json", "language": "it"})
+
+
+def test_results_survive_reopening(tmp_path):
+    db_path = str(tmp_path / "results.sqlite")
+    cache = ResultCache(db_path=db_path)
+    cache.put("k1", "Buongiorno a tutti", [[0.0, 1.5, "Buongiorno a tutti"]])
+    cache.put("k2", "Senza segmenti")
+
+    reopened = ResultCache(db_path=db_path)
+    assert reopened.get("k1") == ("Buongiorno a tutti", [[0.0, 1.5, "Buongiorno a tutti"]])
+    assert reopened.get("k2") == ("Senza segmenti", [])
+    assert reopened.get("assente") is None
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    cache = ResultCache(db_path=str(tmp_path / "results.sqlite"), max_bytes=25)
+    cache.put("vecchia", "x" * 10)
+    cache.put("usata", "y" * 10)
+    # Leggere una voce la rende la più recente
+    assert cache.get("vecchia") is not None
+
+    cache.put("nuova", "z" * 10)
+
+    assert cache.get("usata") is None
+    assert cache.get("vecchia") is not None and cache.get("nuova") is not None
@@ -0,0 +1,37 @@
+from backend.SegmentStore import SegmentStore
+
+SEGMENTS = [(12.5, 15.0, " terzo"), (0.0, 4.2, "Primo segmento "), (4.2, 9.0, "secondo è qui"), (9.5, 9.5, "  ")]
+
+
+def test_segments_are_sorted_and_survive_a_round_trip(tmp_path):
+    txt_path = str(tmp_path / "lezione.txt")
+    SegmentStore.from_segments(SEGMENTS).save(txt_path)
+
+    store = SegmentStore.load(txt_path)
+
+    assert list(store) == [(0.0, 4.2, "Primo segmento"), (4.2, 9.0, "secondo è qui"),
+                           (9.5, 9.5, ""), (12.5, 15.0, "terzo")]
+    SegmentStore.delete(txt_path)
+    assert SegmentStore.load(txt_path) is None
+
+
+def test_lookup_by_time():
+    store = SegmentStore.from_segments(SEGMENTS)
+
+    assert store.index_at(-1.0) is None
+    assert store.text(store.index_at(0.0)) == "Primo segmento"
+    assert store.text(store.index_at(5.0)) == "secondo è qui"
+    # In una pausa resta selezionato il segmento appena terminato
+    assert store.text(store.index_at(11.0)) == ""
+    assert [text for _, _, text in store.between(4.0, 13.0)] == ["Primo segmento", "secondo è qui", "", "terzo"]
+
+
+def test_subtitles_skip_empty_segments(tmp_path):
+    store = SegmentStore.from_segments(SEGMENTS)
+
+    srt = open(store.write_srt(str(tmp_path / "lezione.srt")), encoding="utf-8").read()
+    vtt = open(store.write_vtt(str(tmp_path / "lezione.vtt")), encoding="utf-8").read()
+
+    assert srt.startswith("1\n00:00:00,000 --> 00:00:04,200\nPrimo segmento\n\n")
+    assert "3\n00:00:12,500 --> 00:00:15,000\nterzo\n" in srt and "4\n" not in srt
+    assert vtt.startswith("WEBVTT\n\n00:00:00.000 --> 00:00:04.200\nPrimo segmento\n\n")
@@ -0,0 +1,116 @@
+import json
+import os
+import re
+import shutil
+import threading
+
+import pytest
+
+from backend.AudioHandler import AudioHandler
+from backend.LibraryIndex import LibraryIndex
+from backend.SegmentStore import SegmentStore
+from backend.Transcriber import Transcriber
+from tools.FakeGroqServer import FakeGroqServer
+from tools.loadtest import generate_speech_like_wav
+from utils import utils
+
+pytestmark = pytest.mark.skipif(shutil.which("ffmpeg") is None, reason="FFmpeg non disponibile")
+
+# Chunk da ~12 s con il profilo mp3 predefinito: 60 s di audio diventano più parti
+TARGET_BYTES = 100_000
+
+
+@pytest.fixture
+def server():
+    fake = FakeGroqServer(latency_median=0.2, latency_sigma=0.0).start()
+    yield fake
+    fake.stop()
+
+
+@pytest.fixture
+def handler(tmp_path):
+    path = str(tmp_path / "lezione.wav")
+    generate_speech_like_wav(path, 60, seed=2)
+    audio_handler = AudioHandler(use_cache=False)
+    audio_handler.load_file(path, streaming=True)
+    return audio_handler
+
+
+def chunk_indices(text):
+    """Gli indici dei chunk nell'ordine in cui compaiono nel testo restituito dal server finto."""
+    return [int(index) for index in re.findall(r"\[chunk_(\d+)_\d+\.\w+:", text)]
+
+
+def test_chunks_are_sent_concurrently_and_joined_in_order(server, handler):
+    transcriber = Transcriber(base_url=server.base_url, target_bytes=TARGET_BYTES)
+
+    text = transcriber.process_audio(handler, 0, handler.duration, "gsk_test", "lezione",
+                                     max_workers=3, use_cache=False, resume=False)
+
+    indices = chunk_indices(text)
+    assert len(indices) >= 4
+    assert indices == list(range(len(indices)))
+    assert server.stats["max_in_flight"] > 1
+    txt_path = os.path.join(utils.get_transcripts_folder(), "lezione.txt")
+    with open(txt_path, encoding="utf-8") as f:
+        assert f.read() == text
+    # Segmenti riportati al tempo della registrazione e metadati nella libreria
+    store = SegmentStore.load(txt_path)
+    assert store is not None and store.ends[-1] <= handler.duration + 1
+    entry = LibraryIndex().get("lezione")
+    assert entry is not None and entry.duration == pytest.approx(handler.duration, abs=0.01)
+
+
+def test_second_run_is_served_from_the_result_cache(server, handler):
+    transcriber = Transcriber(base_url=server.base_url, target_bytes=TARGET_BYTES)
+    first = transcriber.process_audio(handler, 0, handler.duration, "gsk_test", "prima", resume=False)
+    sent = server.stats["requests"]
+
+    logs = []
+    second = transcriber.process_audio(handler, 0, handler.duration, "gsk_test", "seconda", resume=False,
+                                       text_callback=logs.append)
+
+    assert second == first
+    assert server.stats["requests"] == sent
+    assert any("CACHE" in line for line in logs)
+
+
+def test_cancelled_job_resumes_from_the_first_missing_chunk(server, handler):
+    transcriber = Transcriber(base_url=server.base_url, target_bytes=TARGET_BYTES)
+    cancel_event = threading.Event()
+
+    def cancel_after_first_chunk(line):
+        if "[Parte" in line:
+            cancel_event.set()
+
+    with pytest.raises(InterruptedError):
+        transcriber.process_audio(handler, 0, handler.duration, "gsk_test", "lezione", max_workers=1,
+                                  use_cache=False, text_callback=cancel_after_first_chunk,
+                                  cancel_event=cancel_event)
+    sent = server.stats["requests"]
+
+    logs = []
+    text = transcriber.process_audio(handler, 0, handler.duration, "gsk_test", "lezione", max_workers=1,
+                                     use_cache=False, text_callback=logs.append)
+
+    done, total = map(int, re.search(r"Ripresa lavoro interrotto: (\d+)/(\d+)", "\n".join(logs)).groups())
+    assert 0 < done < total
+    # Solo i chunk mancanti vengono inviati di nuovo, e il testo finale è completo e ordinato
+    assert server.stats["requests"] - sent == total - done
+    assert chunk_indices(text) == list(range(total))
+
+
+def test_metrics_are_written_for_each_job(server, handler):
+    transcriber = Transcriber(base_url=server.base_url, target_bytes=TARGET_BYTES)
+    transcriber.process_audio(handler, 0, handler.duration, "gsk_test", "lezione", use_cache=False, resume=False)
+
+    folder = utils.get_cache_folder("metrics")
+    with open(os.path.join(folder, "pipeline.jsonl"), encoding="utf-8") as f:
+        records = [json.loads(line) for line in f]
+    job = records[-1]
+    chunks = [record for record in records if record["type"] == "chunk"]
+    assert job["type"] == "job" and job["status"] == "completato"
+    assert job["counters"]["chunks"] == len(chunks) == server.stats["requests"]
+    assert job["counters"]["bytes_uploaded"] > 0
+    with open(os.path.join(folder, "pipeline.prom"), encoding="utf-8") as f:
+        assert "stage_seconds" in f.read()
@@ -0,0 +1,71 @@
+import zipfile
+
+import pytest
+
+from utils import utils
+
+fpdf = pytest.importorskip("fpdf")
+
+
+def write_transcript(folder, text):
+    path = folder / "lezione.txt"
+    path.write_text(text, encoding="utf-8")
+    return str(path)
+
+
+def test_wrap_words_splits_token_wider_than_page():
+    pdf = fpdf.FPDF()
+    pdf.add_page()
+    pdf.set_font("Helvetica", size=11)
+    width = pdf.epw - 2 * pdf.c_margin
+    token = "x" * 400
+    assert pdf.get_string_width(token) > width
+
+    lines = list(utils.wrap_words(pdf, f"prima {token} dopo", width, {}))
+
+    assert all(pdf.get_string_width(line) <= width for line in lines)
+    # Nessun carattere perso o aggiunto
+    assert " ".join(lines).replace(" ", "") == f"prima{token}dopo"
+    assert lines[0] == "prima"
+    assert lines[-1].endswith(" dopo")
+
+
+def test_export_pdf_with_long_token(tmp_path):
+    txt_path = write_transcript(tmp_path, "Testo normale https://esempio.it/" + "a" * 500 + " fine.")
+    progress = []
+
+    output_path = utils.export_pdf(txt_path, progress.append)
+
+    assert output_path == str(tmp_path / "lezione.pdf")
+    assert (tmp_path / "lezione.pdf").read_bytes().startswith(b"%PDF")
+    assert progress[-1] == 1.0
+
+
+def test_save_as_pdf_keeps_text_and_path_signature(tmp_path):
+    txt_path = write_transcript(tmp_path, "")
+    assert utils.save_as_pdf("Primo paragrafo.\nSecondo paragrafo.", txt_path) == str(tmp_path / "lezione.pdf")
+
+
+def test_export_docx_is_a_complete_word_package(tmp_path):
+    docx = pytest.importorskip("docx")
+    paragraphs = [f"Paragrafo {n} con <caratteri> & simboli." for n in range(50)]
+    txt_path = write_transcript(tmp_path, "\n".join(paragraphs))
+
+    output_path = utils.export_docx(txt_path)
+
+    with zipfile.ZipFile(output_path) as archive:
+        assert archive.testzip() is None
+        assert "word/styles.xml" in archive.namelist()
+    document = docx.Document(output_path)
+    assert document.paragraphs[0].text == "Trascrizione: lezione.txt"
+    assert document.paragraphs[0].style.name == "Title"
+    assert [p.text for p in document.paragraphs[1:]] == paragraphs
+
+
+def test_save_as_docx_keeps_text_and_path_signature(tmp_path):
+    docx = pytest.importorskip("docx")
+    txt_path = write_transcript(tmp_path, "")
+
+    output_path = utils.save_as_docx("Uno\n\nDue", txt_path)
+
+    assert [p.text for p in docx.Document(output_path).paragraphs[1:]] == ["Uno", "Due"]
@@ -0,0 +1,227 @@
+import json
+import math
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Optional
+
+# Limite di upload dell'API reale (come OpenAI): 25MB per file.
+DEFAULT_MAX_BYTES = 25 * 1024 * 1024
+
+# Durata dei segmenti finti restituiti con response_format=verbose_json (secondi)
+FAKE_SEGMENT_SECONDS = 5.0
+
+
+class FakeGroqServer:
+    """
+    Server HTTP locale che imita l'endpoint di trascrizione di Groq (/openai/v1/audio/transcriptions).
+
+    Serve a misurare il Transcriber senza consumare quota: latenza, errori, 429 e limiti
+    di dimensione sono configurabili. Il testo restituito è finto ma deterministico
+    (dipende solo dal nome e dalla dimensione del file ricevuto); con verbose_json la durata
+    dei segmenti è stimata dai byte ricevuti e da `bytes_per_second`.
+
+    Esempio:
+        server = FakeGroqServer(latency_median=1.5, rate_limit_rate=0.05).start()
+        transcriber = Transcriber(base_url=server.base_url)
+        ...
+        server.stop()
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, latency_median: float = 1.0,
+                 latency_sigma: float = 0.3, seconds_per_mb: float = 0.0, error_rate: float = 0.0,
+                 rate_limit_rate: float = 0.0, requests_per_minute: Optional[int] = None,
+                 max_bytes: int = DEFAULT_MAX_BYTES, retry_after: float = 1.0, seed: Optional[int] = None,
+                 bytes_per_second: float = 16000):
+        """
+        Configura il server (non lo avvia).
+
+        Args:
+            host (str): Indirizzo di ascolto.
+            port (int): Porta di ascolto (0: porta libera scelta dal sistema).
+            latency_median (float): Mediana (secondi) della latenza di elaborazione.
+            latency_sigma (float): Dispersione della latenza (distribuzione log-normale; 0 = latenza fissa).
+            seconds_per_mb (float): Latenza aggiuntiva per ogni MB ricevuto (simula upload ed elaborazione).
+            error_rate (float): Probabilità che una richiesta fallisca con 500.
+            rate_limit_rate (float): Probabilità che una richiesta riceva un 429 casuale.
+            requests_per_minute (int, optional): Quota di richieste al minuto; oltre la quota si riceve 429
+                                                 con gli header x-ratelimit-* come l'API reale.
+            max_bytes (int): Dimensione massima accettata; oltre si riceve 413.
+            retry_after (float): Valore dell'header retry-after (secondi) nei 429 casuali.
+            seed (int, optional): Seme del generatore casuale, per esecuzioni ripetibili.
+            bytes_per_second (float): Byte di audio codificato per secondo, per stimare la durata
+                                      dei segmenti (default: mp3 a 128 kbps).
+        """
+        self.host = host
+        self.port = port
+        self.latency_median = latency_median
+        self.latency_sigma = latency_sigma
+        self.seconds_per_mb = seconds_per_mb
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.requests_per_minute = requests_per_minute
+        self.max_bytes = max_bytes
+        self.retry_after = retry_after
+        self.bytes_per_second = bytes_per_second
+
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._window_start = time.monotonic()
+        self._window_count = 0
+        self._httpd: Optional[ThreadingHTTPServer] = None
+        self._thread: Optional[threading.Thread] = None
+
+        self.stats: Dict[str, Any] = {}
+        self.reset_stats()
+
+    @property
+    def base_url(self) -> str:
+        """L'indirizzo da passare al client Groq (valido dopo start())."""
+        return f"http://{self.host}:{self.port}"
+
+    def start(self) -> "FakeGroqServer":
+        """Avvia il server in un thread daemon e restituisce se stesso."""
+        server = self
+
+        class Handler(_TranscriptionHandler):
+            fake = server
+
+        self._httpd = ThreadingHTTPServer((self.host, self.port), Handler)
+        self._httpd.daemon_threads = True
+        self.port = self._httpd.server_address[1]
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name="fake-groq", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Ferma il server."""
+        if self._httpd:
+            self._httpd.shutdown()
+            self._httpd.server_close()
+            self._httpd = None
+
+    def reset_stats(self):
+        """Azzera le statistiche raccolte."""
+        with self._lock:
+            self.stats = {"requests": 0, "bytes": 0, "status": {}, "in_flight": 0, "max_in_flight": 0}
+
+    # --- LOGICA DELLE RISPOSTE ---
+
+    def _sample_latency(self, size: int) -> float:
+        """Estrae una latenza dalla distribuzione log-normale, più la componente proporzionale ai byte."""
+        with self._lock:
+            base = self.latency_median * math.exp(self._random.gauss(0, self.latency_sigma)) \
+                if self.latency_sigma > 0 else self.latency_median
+        return base + self.seconds_per_mb * size / (1024 * 1024)
+
+    def _decide(self, size: int) -> int:
+        """Sceglie il codice di risposta di una richiesta."""
+        if size > self.max_bytes:
+            return 413
+        with self._lock:
+            if self.requests_per_minute:
+                if time.monotonic() - self._window_start >= 60:
+                    self._window_start = time.monotonic()
+                    self._window_count = 0
+                if self._window_count >= self.requests_per_minute:
+                    return 429
+                self._window_count += 1
+
+            roll = self._random.random()
+        if roll < self.rate_limit_rate:
+            return 429
+        if roll < self.rate_limit_rate + self.error_rate:
+            return 500
+        return 200
+
+    def _rate_limit_headers(self) -> Dict[str, str]:
+        """Header x-ratelimit-* come quelli dell'API reale (solo se è configurata una quota)."""
+        if not self.requests_per_minute:
+            return {}
+        with self._lock:
+            remaining = max(0, self.requests_per_minute - self._window_count)
+            reset = max(0.0, 60 - (time.monotonic() - self._window_start))
+        return {
+            "x-ratelimit-limit-requests": str(self.requests_per_minute),
+            "x-ratelimit-remaining-requests": str(remaining),
+            "x-ratelimit-reset-requests": f"{reset:.2f}s",
+        }
+
+
+    def _segments(self, name: str, size: int) -> Dict[str, Any]:
+        """Campi aggiuntivi di una risposta verbose_json: durata stimata e segmenti a intervalli fissi."""
+        duration = size / self.bytes_per_second
+        count = max(1, math.ceil(duration / FAKE_SEGMENT_SECONDS))
+        segments = [{"id": i, "start": i * FAKE_SEGMENT_SECONDS,
+                     "end": min(duration, (i + 1) * FAKE_SEGMENT_SECONDS), "text": f" [{name}: segmento {i + 1}]"}
+                    for i in range(count)]
+        return {"task": "transcribe", "language": "italian", "duration": duration, "segments": segments}
+
+
+class _TranscriptionHandler(BaseHTTPRequestHandler):
+    """Gestore delle richieste: legge il multipart, attende la latenza simulata e risponde."""
+
+    fake: FakeGroqServer
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        body = self.rfile.read(length)
+
+        if not self.path.rstrip("/").endswith("/audio/transcriptions"):
+            self._send(404, {"error": {"message": f"Unknown path {self.path}"}})
+            return
+
+        fake = self.fake
+        with fake._lock:
+            fake.stats["requests"] += 1
+            fake.stats["bytes"] += length
+            fake.stats["in_flight"] += 1
+            fake.stats["max_in_flight"] = max(fake.stats["max_in_flight"], fake.stats["in_flight"])
+
+        status = 500
+        try:
+            status = fake._decide(length)
+            # Anche gli errori arrivano dopo un po' (ma prima di una risposta completa)
+            time.sleep(fake._sample_latency(length) * (1.0 if status == 200 else 0.2))
+
+            headers = fake._rate_limit_headers()
+            if status == 200:
+                match = re.search(rb'filename="([^"]*)"', body[:4096])
+                name = match.group(1).decode("utf-8", "replace") if match else "audio"
+                payload = {"text": f"[{name}: {length} byte]",
+                           "x_groq": {"id": f"req_fake_{fake.stats['requests']}"}}
+                if re.search(rb'name="response_format"\r\n\r\nverbose_json', body[:4096]):
+                    payload.update(fake._segments(name, length))
+                self._send(200, payload, headers)
+            elif status == 429:
+                # Quota esaurita: come l'API reale, si indica di attendere il reset della finestra
+                quota_exhausted = headers.get("x-ratelimit-remaining-requests") == "0"
+                headers["retry-after"] = headers["x-ratelimit-reset-requests"].rstrip("s") if quota_exhausted \
+                    else f"{fake.retry_after:g}"
+                self._send(429, {"error": {"message": "Rate limit reached (fake)", "type": "requests",
+                                           "code": "rate_limit_exceeded"}}, headers)
+            elif status == 413:
+                self._send(413, {"error": {"message": "Request Entity Too Large (fake)"}}, headers)
+            else:
+                self._send(500, {"error": {"message": "Internal Server Error (fake)"}}, headers)
+        finally:
+            with fake._lock:
+                fake.stats["in_flight"] -= 1
+                fake.stats["status"][status] = fake.stats["status"].get(status, 0) + 1
+
+    def _send(self, status: int, payload: Dict[str, Any], headers: Optional[Dict[str, str]] = None):
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format: str, *args: Any):
+        # Silenzioso: durante un test di carico il log di ogni richiesta coprirebbe il report
+        pass
@@ -0,0 +1,194 @@
+import argparse
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+import wave
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from backend.AudioHandler import AudioHandler, STREAM_SAMPLE_RATE
+from backend.EncodingProfile import DEFAULT_PROFILE, PROFILES
+from backend.RequestController import RequestController
+from backend.Transcriber import DEFAULT_MAX_WORKERS, Transcriber
+from tools.FakeGroqServer import DEFAULT_MAX_BYTES, FakeGroqServer
+from utils import utils
+
+
+def generate_speech_like_wav(path: str, duration: float, seed: int = 0, sample_rate: int = STREAM_SAMPLE_RATE):
+    """
+    Scrive un WAV sintetico che alterna "parlato" (rumore modulato) e pause, di qualunque durata.
+
+    Le pause fanno lavorare l'analisi dei silenzi come con una registrazione reale.
+    Il file viene scritto a blocchi: la memoria non dipende dalla durata.
+
+    Args:
+        path (str): Percorso del file da creare.
+        duration (float): Durata in secondi.
+        seed (int): Seme del generatore casuale.
+        sample_rate (int): Frequenza di campionamento (mono, 16 bit).
+    """
+    rng = np.random.default_rng(seed)
+    total = int(duration * sample_rate)
+    written = 0
+    speaking = True
+
+    with wave.open(path, "wb") as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(sample_rate)
+        while written < total:
+            seconds = rng.uniform(2.0, 8.0) if speaking else rng.uniform(0.3, 2.5)
+            n = min(total - written, int(seconds * sample_rate))
+            if speaking:
+                # Rumore con inviluppo sillabico (~4 Hz), simile all'energia del parlato
+                t = np.arange(n) / sample_rate
+                envelope = 0.55 + 0.45 * np.sin(2 * np.pi * 4.0 * t + rng.uniform(0, 2 * np.pi))
+                block = rng.normal(0, 6000, n) * envelope
+            else:
+                block = rng.normal(0, 30, n)
+            f.writeframes(np.clip(block, -32768, 32767).astype("<i2").tobytes())
+            written += n
+            speaking = not speaking
+
+
+def percentile(values: List[float], q: float) -> Optional[float]:
+    """Percentile `q` (0-100) di una lista, oppure None se è vuota."""
+    return round(float(np.percentile(values, q)), 3) if values else None
+
+
+def run_load_test(args: argparse.Namespace) -> Dict[str, Any]:
+    """
+    Esegue una trascrizione completa contro il server finto e raccoglie le metriche.
+
+    Returns:
+        Dict[str, Any]: Il report (throughput, latenze dei chunk, esito e statistiche del server).
+    """
+    server = FakeGroqServer(latency_median=args.latency, latency_sigma=args.latency_sigma,
+                            seconds_per_mb=args.seconds_per_mb, error_rate=args.error_rate,
+                            rate_limit_rate=args.rate_limit_rate, requests_per_minute=args.rpm,
+                            max_bytes=args.max_bytes, retry_after=args.retry_after, seed=args.seed).start()
+
+    with tempfile.TemporaryDirectory(prefix="sbobinator-loadtest-") as workdir:
+        audio_path = os.path.join(workdir, "synthetic.wav")
+        started = time.monotonic()
+        generate_speech_like_wav(audio_path, args.duration, seed=args.seed)
+        generation_time = time.monotonic() - started
+
+        transcriber = Transcriber(base_url=server.base_url, target_bytes=int(args.chunk_mb * 1024 * 1024))
+        transcriber.request_controller = RequestController(max_concurrency=args.workers,
+                                                           max_retries=args.max_retries)
+        # L'output va nella cartella temporanea, non nella libreria
+        transcriber.get_output_path = lambda name: os.path.join(workdir, f"{name}.txt")
+
+        # Latenza per chunk: upload e tentativi ripetuti (la codifica è esclusa)
+        latencies: List[float] = []
+        retries: List[int] = []
+        lock = threading.Lock()
+        transcribe_encoded = transcriber.transcribe_encoded
+
+        def timed_transcribe(*a: Any, **kw: Any):
+            t0 = time.monotonic()
+            result = transcribe_encoded(*a, **kw)
+            with lock:
+                latencies.append(time.monotonic() - t0)
+                retries.append(result[2])
+            return result
+
+        transcriber.transcribe_encoded = timed_transcribe
+
+        handler = AudioHandler(use_cache=False)
+        handler.load_file(audio_path, streaming=True)
+
+        error = None
+        started = time.monotonic()
+        try:
+            transcriber.process_audio(handler, 0.0, handler.duration, "gsk_fake", "loadtest",
+                                      max_workers=args.workers, skip_silence=args.skip_silence,
+                                      encoding_profile=args.profile, use_cache=False, resume=False)
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+        elapsed = time.monotonic() - started
+
+    server.stop()
+    stats = server.stats
+
+    return {
+        "audio_seconds": args.duration,
+        "generation_seconds": round(generation_time, 3),
+        "elapsed_seconds": round(elapsed, 3),
+        "realtime_factor": round(args.duration / elapsed, 1) if elapsed else None,
+        "chunks_ok": len(latencies),
+        "chunks_per_second": round(len(latencies) / elapsed, 3) if elapsed else None,
+        "latency_p50": percentile(latencies, 50),
+        "latency_p90": percentile(latencies, 90),
+        "latency_p99": percentile(latencies, 99),
+        "latency_max": round(max(latencies), 3) if latencies else None,
+        "retries": sum(retries),
+        "final_concurrency_limit": round(transcriber.request_controller.limit, 2),
+        "server_requests": stats["requests"],
+        "server_max_in_flight": stats["max_in_flight"],
+        "server_status": {str(k): v for k, v in sorted(stats["status"].items())},
+        "uploaded_mb": round(stats["bytes"] / (1024 * 1024), 2),
+        "failed": error is not None,
+        "error": error,
+    }
+
+
+def print_report(report: Dict[str, Any]):
+    """Stampa il report in forma leggibile."""
+    print(f"Audio sintetico:     {utils.seconds_to_hms(report['audio_seconds'])} "
+          f"(generato in {report['generation_seconds']}s)")
+    print(f"Tempo totale:        {report['elapsed_seconds']}s  ({report['realtime_factor']}x tempo reale)")
+    print(f"Chunk completati:    {report['chunks_ok']}  ({report['chunks_per_second']}/s)")
+    print(f"Latenza chunk:       p50 {report['latency_p50']}s | p90 {report['latency_p90']}s | "
+          f"p99 {report['latency_p99']}s | max {report['latency_max']}s")
+    print(f"Tentativi ripetuti:  {report['retries']}  (limite finale di concorrenza: "
+          f"{report['final_concurrency_limit']})")
+    print(f"Server:              {report['server_requests']} richieste, max {report['server_max_in_flight']} "
+          f"in volo, {report['uploaded_mb']} MB, stati {report['server_status']}")
+    print(f"Esito:               {'❌ ' + report['error'] if report['failed'] else '✅ completato'}")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """
+    Entry point del test di carico (da eseguire dalla cartella src).
+
+    Esempio:
+        python -m tools.loadtest --duration 36000 --chunk-mb 2 --workers 8 --rate-limit-rate 0.05
+    """
+    parser = argparse.ArgumentParser(description="Test di carico del Transcriber contro un server Groq finto.")
+    parser.add_argument("--duration", type=float, default=3600, help="Durata dell'audio sintetico (secondi).")
+    parser.add_argument("--profile", default=DEFAULT_PROFILE, choices=list(PROFILES), help="Profilo di codifica.")
+    parser.add_argument("--chunk-mb", type=float, default=2.0,
+                        help="Dimensione obiettivo dei chunk (MB): valori piccoli = più richieste.")
+    parser.add_argument("--skip-silence", action="store_true", help="Esclude i silenzi lunghi dall'invio.")
+    parser.add_argument("--workers", type=int, default=DEFAULT_MAX_WORKERS, help="Richieste parallele massime.")
+    parser.add_argument("--max-retries", type=int, default=6, help="Tentativi ripetuti massimi per richiesta.")
+    parser.add_argument("--latency", type=float, default=1.0, help="Latenza mediana del server (secondi).")
+    parser.add_argument("--latency-sigma", type=float, default=0.3, help="Dispersione log-normale della latenza.")
+    parser.add_argument("--seconds-per-mb", type=float, default=0.2, help="Latenza aggiuntiva per MB ricevuto.")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Probabilità di errore 500.")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="Probabilità di 429 casuale.")
+    parser.add_argument("--rpm", type=int, help="Quota di richieste al minuto del server.")
+    parser.add_argument("--retry-after", type=float, default=1.0, help="Header retry-after dei 429 (secondi).")
+    parser.add_argument("--max-bytes", type=int, default=DEFAULT_MAX_BYTES, help="Dimensione massima accettata.")
+    parser.add_argument("--seed", type=int, default=0, help="Seme per audio e server (esecuzioni ripetibili).")
+    parser.add_argument("--json", action="store_true", help="Stampa il report come JSON.")
+    args = parser.parse_args(argv)
+
+    utils.setup_ffmpeg()
+    report = run_load_test(args)
+
+    if args.json:
+        print(json.dumps(report, ensure_ascii=False))
+    else:
+        print_report(report)
+    return 1 if report["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
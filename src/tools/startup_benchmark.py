@@ -0,0 +1,119 @@
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+from typing import Any, Dict, List, Optional, Tuple
+
+# Budget predefinito per l'import a freddo di main.py (secondi): la finestra deve apparire ben sotto il secondo
+DEFAULT_BUDGET = 0.5
+
+# Moduli che non devono essere caricati all'avvio (vengono importati al primo utilizzo)
+LAZY_MODULES = ["fpdf", "groq", "matplotlib", "docx"]
+
+# Cartella src: main.py e i pacchetti dell'applicazione
+SRC_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_IMPORTTIME_LINE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)$")
+
+
+def measure_import(module: str = "main") -> Tuple[float, List[Tuple[str, float]], List[str]]:
+    """
+    Importa un modulo in un interprete nuovo con `-X importtime` e ne analizza il resoconto.
+
+    Args:
+        module (str): Il modulo da importare (relativo alla cartella src).
+
+    Returns:
+        Tuple: (tempo cumulativo in secondi, moduli di primo livello con il loro tempo cumulativo,
+                nomi di tutti i moduli caricati).
+    """
+    code = f"import {module}"
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", code], cwd=SRC_DIR,
+                            capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"Import di {module} fallito:\n{result.stderr.strip().splitlines()[-1]}")
+
+    total = 0.0
+    loaded: List[str] = []
+    children: List[Tuple[str, float]] = []
+    pending: List[Tuple[str, float]] = []
+    for line in result.stderr.splitlines():
+        match = _IMPORTTIME_LINE.match(line)
+        if not match:
+            continue
+        cumulative, indent, name = int(match.group(2)) / 1e6, len(match.group(3)), match.group(4)
+        loaded.append(name)
+        # Il resoconto elenca i figli prima del genitore, con due spazi di rientro per livello
+        if indent == 3:
+            pending.append((name, cumulative))
+        elif indent == 1:
+            if name == module:
+                total, children = cumulative, pending
+            pending = []
+    return total, sorted(children, key=lambda item: item[1], reverse=True), loaded
+
+
+def run_benchmark(runs: int, module: str) -> Dict[str, Any]:
+    """
+    Ripete la misura e raccoglie il report.
+
+    Returns:
+        Dict[str, Any]: Tempo mediano e minimo, moduli più lenti e moduli pesanti caricati all'avvio.
+    """
+    totals = []
+    children: List[Tuple[str, float]] = []
+    loaded: List[str] = []
+    for _ in range(runs):
+        total, children, loaded = measure_import(module)
+        totals.append(total)
+
+    eager = sorted({name.split(".")[0] for name in loaded} & set(LAZY_MODULES))
+    return {
+        "module": module,
+        "runs": runs,
+        "median_seconds": round(statistics.median(totals), 4),
+        "min_seconds": round(min(totals), 4),
+        "slowest_imports": [(name, round(seconds, 4)) for name, seconds in children[:10]],
+        "eager_heavy_modules": eager,
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """
+    Entry point del benchmark di avvio (da eseguire dalla cartella src).
+    Termina con codice 1 se il tempo mediano supera il budget o se un modulo pesante viene importato all'avvio.
+
+    Esempio:
+        python -m tools.startup_benchmark --budget 0.5 --runs 5
+    """
+    parser = argparse.ArgumentParser(description="Misura il tempo di import a freddo dell'applicazione.")
+    parser.add_argument("--module", default="main", help="Modulo da importare (default: main).")
+    parser.add_argument("--runs", type=int, default=5, help="Numero di misure (si usa la mediana).")
+    parser.add_argument("--budget", type=float, default=DEFAULT_BUDGET, help="Tempo massimo ammesso (secondi).")
+    parser.add_argument("--json", action="store_true", help="Stampa il report come JSON.")
+    args = parser.parse_args(argv)
+
+    report = run_benchmark(max(1, args.runs), args.module)
+    report["budget_seconds"] = args.budget
+    report["ok"] = report["median_seconds"] <= args.budget and not report["eager_heavy_modules"]
+
+    if args.json:
+        print(json.dumps(report, ensure_ascii=False))
+    else:
+        print(f"Import di {report['module']}: mediana {report['median_seconds'] * 1000:.0f} ms, "
+              f"minimo {report['min_seconds'] * 1000:.0f} ms su {report['runs']} esecuzioni "
+              f"(budget {args.budget * 1000:.0f} ms)")
+        print("Import più lenti:")
+        for name, seconds in report["slowest_imports"]:
+            print(f"   {seconds * 1000:8.1f} ms  {name}")
+        if report["eager_heavy_modules"]:
+            print(f"❌ Moduli pesanti caricati all'avvio: {', '.join(report['eager_heavy_modules'])}")
+        print("✅ Entro il budget" if report["ok"] else "❌ Fuori budget")
+    return 0 if report["ok"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
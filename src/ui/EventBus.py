@@ -0,0 +1,112 @@
+import queue
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+
+# Ogni quanto (ms) il main loop svuota la coda degli eventi (~30 aggiornamenti al secondo)
+DEFAULT_TICK_MS = 33
+
+# Eventi elaborati al massimo in un tick: una raffica enorme viene distribuita su più tick
+# invece di bloccare l'interfaccia
+MAX_EVENTS_PER_TICK = 5000
+
+
+class EventBus:
+    """
+    Canale tra i thread di lavoro e il main loop di Tk.
+
+    Tk non è thread-safe: i thread in background non devono toccare i widget (nemmeno con .after).
+    I worker pubblicano eventi in una coda thread-safe; il main loop la svuota a intervalli fissi
+    e consegna gli eventi ai gestori registrati, raggruppandoli:
+    - argomenti "latest": per ogni chiave arriva solo l'ultimo valore del tick
+      (es. 200 aggiornamenti di avanzamento dello stesso lavoro diventano un solo ridisegno);
+    - argomenti "batch": il gestore riceve in una sola chiamata la lista di tutti gli eventi del tick
+      (es. molte righe di log inserite con un unico insert).
+    Il costo per l'interfaccia dipende quindi dalla frequenza del tick, non da quanto spesso pubblicano i worker.
+    """
+
+    def __init__(self, widget: Any, tick_ms: int = DEFAULT_TICK_MS):
+        """
+        Inizializza il bus.
+
+        Args:
+            widget: Un widget Tk qualsiasi, usato per programmare i tick nel main loop.
+            tick_ms (int): Intervallo tra due svuotamenti della coda (millisecondi).
+        """
+        self.widget = widget
+        self.tick_ms = tick_ms
+        self._queue: "queue.SimpleQueue[Tuple[str, Optional[Hashable], Any]]" = queue.SimpleQueue()
+        self._latest: Dict[str, Callable[[Hashable, Any], None]] = {}
+        self._batch: Dict[str, Callable[[List[Any]], None]] = {}
+        self._pending_tick = None
+
+    def subscribe_latest(self, topic: str, handler: Callable[[Hashable, Any], None]):
+        """
+        Registra un gestore che riceve, per ogni chiave, solo l'ultimo valore pubblicato nel tick.
+
+        Args:
+            topic (str): Il nome dell'argomento.
+            handler (Callable): Chiamata nel main loop con (chiave, valore).
+        """
+        self._latest[topic] = handler
+
+    def subscribe_batch(self, topic: str, handler: Callable[[List[Any]], None]):
+        """
+        Registra un gestore che riceve tutti i valori pubblicati nel tick, in ordine, in una sola chiamata.
+
+        Args:
+            topic (str): Il nome dell'argomento.
+            handler (Callable): Chiamata nel main loop con la lista dei valori.
+        """
+        self._batch[topic] = handler
+
+    def publish(self, topic: str, value: Any = None, key: Optional[Hashable] = None):
+        """
+        Pubblica un evento. Sicuro da qualsiasi thread e non bloccante.
+
+        Args:
+            topic (str): Il nome dell'argomento.
+            value (Any): Il contenuto dell'evento.
+            key (Hashable, optional): Per gli argomenti "latest", ciò che identifica il valore
+                                      (es. l'id del lavoro): valori con la stessa chiave si sostituiscono.
+        """
+        self._queue.put((topic, key, value))
+
+    def start(self):
+        """Avvia lo svuotamento periodico della coda (da chiamare nel main loop)."""
+        if self._pending_tick is None:
+            self._pending_tick = self.widget.after(self.tick_ms, self._tick)
+
+    def stop(self):
+        """Ferma lo svuotamento periodico (gli eventi restano in coda)."""
+        if self._pending_tick is not None:
+            self.widget.after_cancel(self._pending_tick)
+            self._pending_tick = None
+
+    def drain(self):
+        """Consegna subito gli eventi in coda (eseguito nel main loop)."""
+        latest: Dict[Tuple[str, Hashable], Any] = {}
+        batches: Dict[str, List[Any]] = {}
+        for _ in range(MAX_EVENTS_PER_TICK):
+            try:
+                topic, key, value = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if topic in self._batch:
+                batches.setdefault(topic, []).append(value)
+            else:
+                # Il dizionario mantiene l'ordine della prima comparsa di ogni chiave, con l'ultimo valore
+                latest[(topic, key)] = value
+
+        # Prima gli stati, poi i batch (i log possono riferirsi a un lavoro appena creato)
+        for (topic, key), value in latest.items():
+            handler = self._latest.get(topic)
+            if handler:
+                handler(key, value)
+        for topic, values in batches.items():
+            self._batch[topic](values)
+
+    def _tick(self):
+        try:
+            self.drain()
+        finally:
+            # Un errore in un gestore non deve fermare gli aggiornamenti successivi
+            self._pending_tick = self.widget.after(self.tick_ms, self._tick)
@@ -1,25 +1,59 @@
 import os
 import platform
 import subprocess
+import threading
+import time
 from tkinter import messagebox
-from typing import Optional
+from typing import Callable, Optional
 
 import customtkinter as ctk
 
+from backend.BulkExporter import BulkExporter
+from backend.LibraryIndex import HIGHLIGHT_END, HIGHLIGHT_START, LibraryIndex, LibraryEntry
+from backend.SegmentStore import SegmentStore
+from ui.EventBus import EventBus
+from ui.VirtualList import VirtualList
 from utils import utils
 
 ctk.set_appearance_mode("Dark")
 ctk.set_default_color_theme("blue")
 
+# Ogni quanto (ms) controllare se la cartella della libreria è cambiata (costo: un solo stat)
+WATCH_INTERVAL_MS = 1500
+
+# Attesa (ms) dopo l'ultima modifica rilevata prima di aggiornare la lista:
+# una raffica di modifiche (es. export multipli) produce un solo aggiornamento
+WATCH_DEBOUNCE_MS = 500
+
+# Attesa (ms) dopo l'ultimo tasto premuto prima di eseguire la ricerca
+SEARCH_DEBOUNCE_MS = 200
+
+# Ordinamenti disponibili per la lista: etichetta -> (chiave di ordinamento, decrescente)
+SORT_OPTIONS = {
+    "Più recenti": (lambda entry: entry.mtime, True),
+    "Nome (A-Z)": (lambda entry: entry.stem.lower(), False),
+    "Durata": (lambda entry: entry.duration or 0.0, True),
+}
+
+# Filtri disponibili per la lista: etichetta -> condizione sulla trascrizione (None: tutte)
+FILTER_OPTIONS = {
+    "Tutte": None,
+    "Da esportare": lambda entry: not {"pdf", "docx"} & set(entry.formats),
+    "Con sottotitoli": lambda entry: bool({"srt", "vtt"} & set(entry.formats)),
+}
+
 
 class LibraryView(ctk.CTkFrame):
     """
     Gestisce l'interfaccia utente per la libreria delle trascrizioni.
 
     Permette di:
-    - Visualizzare l'elenco dei file salvati nella cartella 'Sbobinature'.
+    - Visualizzare l'elenco delle trascrizioni salvate nella cartella 'Sbobinature'
+      (una riga per trascrizione, con i formati disponibili).
+    - Cercare nel contenuto di tutte le trascrizioni (risultati ordinati per rilevanza, con estratto).
     - Aprire i file con l'editor di sistema.
-    - Esportare i file in altri formati (PDF, Word).
+    - Esportare i file in altri formati (PDF, Word), anche molti insieme (saltando quelli già aggiornati).
+    - Generare i sottotitoli (SRT, VTT) dai segmenti temporizzati salvati durante la trascrizione.
     - Eliminare i file.
     """
 
@@ -34,11 +68,36 @@ class LibraryView(ctk.CTkFrame):
 
         # Variabile di stato per tracciare quale file è attualmente evidenziato
         self.selected_file_path: Optional[str] = None
+        self.selected_stem: Optional[str] = None
+
+        # Indice persistente della libreria: la lista viene aggiornata solo per ciò che è cambiato
+        self.library_index = LibraryIndex()
+        self.bulk_exporter = BulkExporter(self.library_index)
+        self.seen_seq = 0
+        self.last_folder_mtime = None
+        self.pending_refresh = None
+        self.pending_search = None
+        self.exporting = False
+        # Sincronizzazione dell'indice in corso (in background) e, se richiesta nel frattempo,
+        # quella da eseguire al termine (valore: confronto completo sì/no)
+        self.syncing = False
+        self.pending_sync: Optional[bool] = None
 
         self.create_ui()
 
-        # Popola la lista appena l'app si avvia
-        self.refresh_library()
+        # I thread di export e di sincronizzazione comunicano con l'interfaccia solo attraverso il bus
+        self.events = EventBus(self)
+        self.events.subscribe_batch("library_synced", lambda results: [self.on_library_synced(*r) for r in results])
+        self.events.subscribe_latest("export_progress", lambda _, value: self.progress_export.set(value))
+        self.events.subscribe_batch("export_done", lambda results: [self.on_export_done(*r) for r in results])
+        self.events.subscribe_batch("bulk_export_done",
+                                    lambda results: [self.on_bulk_export_done(*r) for r in results])
+        self.events.start()
+
+        # Popola la lista appena la finestra è apparsa (la prima sincronizzazione può leggere
+        # molti file) e controlla periodicamente la cartella
+        self.after_idle(self.refresh_library)
+        self.after(WATCH_INTERVAL_MS, self.watch_library)
 
     def create_ui(self):
         """Costruisce il layout grafico a due colonne (Lista vs Azioni)."""
@@ -47,15 +106,43 @@ class LibraryView(ctk.CTkFrame):
         # Colonna 0 (Lista) pesa doppio (weight=2) rispetto alla Colonna 1 (Azioni)
         self.columnconfigure(0, weight=2)
         self.columnconfigure(1, weight=1)
-        self.rowconfigure(0, weight=1)
-
-        # -- Colonna Sinistra: Lista File --
-        self.scroll_files = ctk.CTkScrollableFrame(self, label_text="Trascrizioni Disponibili")
-        self.scroll_files.grid(row=0, column=0, padx=10, pady=10, sticky="nsew")
+        self.rowconfigure(1, weight=1)
+
+        # -- Colonna Sinistra: Ricerca e Lista File --
+        self.frame_search = ctk.CTkFrame(self, fg_color="transparent")
+        self.frame_search.grid(row=0, column=0, padx=10, pady=(10, 0), sticky="ew")
+        self.frame_search.columnconfigure(0, weight=1)
+
+        self.entry_search = ctk.CTkEntry(self.frame_search, placeholder_text="🔍 Cerca nel testo delle trascrizioni...")
+        self.entry_search.grid(row=0, column=0, sticky="ew")
+        self.entry_search.bind("<KeyRelease>", self.on_search_changed)
+
+        # L'ordinamento cambia solo quali elementi mostrano i pulsanti: nessun widget viene ricreato
+        self.option_sort = ctk.CTkOptionMenu(self.frame_search, values=list(SORT_OPTIONS), width=130,
+                                             command=self.on_sort_changed)
+        self.option_sort.grid(row=0, column=1, padx=(10, 0))
+
+        # Anche il filtro agisce solo sugli elementi mostrati ("Seleziona tutto" spunta quelli filtrati)
+        self.option_filter = ctk.CTkOptionMenu(self.frame_search, values=list(FILTER_OPTIONS), width=130,
+                                               command=self.on_filter_changed)
+        self.option_filter.grid(row=0, column=2, padx=(10, 0))
+
+        # Lista virtualizzata: esistono solo i pulsanti delle righe visibili, anche con decine di migliaia di file
+        sort_key, reverse = SORT_OPTIONS[self.option_sort.get()]
+        self.file_list = VirtualList(self, format_item=self.format_entry, on_select=self.select_library_item,
+                                     sort_key=sort_key, reverse=reverse, label_text="Trascrizioni Disponibili",
+                                     empty_text="Archivio vuoto.", checkable=True, on_check=self.on_check_changed)
+        self.file_list.grid(row=1, column=0, padx=10, pady=10, sticky="nsew")
+
+        # Risultati della ricerca: mostrati al posto della lista finché il campo di ricerca non è vuoto
+        self.txt_results = ctk.CTkTextbox(self, wrap="word")
+        self.txt_results.tag_config("title", foreground="#5DADE2")
+        self.txt_results.tag_config("hit", foreground="#F1C40F")
+        self.txt_results.tag_config("info", foreground="gray")
 
         # -- Colonna Destra: Pannello Azioni --
         self.frame_actions = ctk.CTkFrame(self)
-        self.frame_actions.grid(row=0, column=1, padx=10, pady=10, sticky="nsew")
+        self.frame_actions.grid(row=0, column=1, rowspan=2, padx=10, pady=10, sticky="nsew")
 
         ctk.CTkLabel(self.frame_actions, text="Azioni File", font=("Arial", 18, "bold")).pack(pady=20)
 
@@ -77,6 +164,32 @@ class LibraryView(ctk.CTkFrame):
                                       command=lambda: self.export_file("word"))
         self.btn_word.pack(pady=5, padx=20, fill="x")
 
+        # Sottotitoli: disponibili solo per le trascrizioni con i segmenti temporizzati
+        frame_subtitles = ctk.CTkFrame(self.frame_actions, fg_color="transparent")
+        frame_subtitles.pack(pady=5, padx=20, fill="x")
+        frame_subtitles.columnconfigure((0, 1), weight=1)
+        self.btn_srt = ctk.CTkButton(frame_subtitles, text="🎬 SRT", fg_color="#16A085", state="disabled",
+                                     command=lambda: self.export_subtitles("srt"))
+        self.btn_srt.grid(row=0, column=0, padx=(0, 3), sticky="ew")
+        self.btn_vtt = ctk.CTkButton(frame_subtitles, text="🎬 VTT", fg_color="#16A085", state="disabled",
+                                     command=lambda: self.export_subtitles("vtt"))
+        self.btn_vtt.grid(row=0, column=1, padx=(3, 0), sticky="ew")
+
+        # Avanzamento dell'export in corso (visibile solo durante l'export)
+        self.progress_export = ctk.CTkProgressBar(self.frame_actions, orientation="horizontal", mode="determinate")
+
+        # --- Export multiplo delle trascrizioni spuntate ---
+        self.chk_all = ctk.CTkCheckBox(self.frame_actions, text="Seleziona tutti", command=self.toggle_check_all)
+        self.chk_all.pack(pady=(15, 5), padx=20, anchor="w")
+
+        self.btn_bulk_pdf = ctk.CTkButton(self.frame_actions, text="📦 PDF selezionati", fg_color="#C0392B",
+                                          state="disabled", command=lambda: self.export_checked(["pdf"]))
+        self.btn_bulk_pdf.pack(pady=5, padx=20, fill="x")
+
+        self.btn_bulk_word = ctk.CTkButton(self.frame_actions, text="📦 WORD selezionati", fg_color="#2980B9",
+                                           state="disabled", command=lambda: self.export_checked(["docx"]))
+        self.btn_bulk_word.pack(pady=5, padx=20, fill="x")
+
         # Pulsante placeholder per formati futuri (ICS o altro)
         self.btn_ics = ctk.CTkButton(self.frame_actions, text="Chiedi a Nahele un altro formato :)", fg_color="#8E44AD",
                                      state="disabled")
@@ -90,90 +203,239 @@ class LibraryView(ctk.CTkFrame):
                                         hover_color="#561914", state="disabled", command=self.delete_selected_file)
         self.btn_delete.pack(pady=10, padx=20, fill="x")
 
-        # Pulsante Aggiorna Manuale
-        ctk.CTkButton(self.frame_actions, text="🔄 Aggiorna Lista", fg_color="gray", command=self.refresh_library).pack(
-            pady=20, padx=20, fill="x")
+        # Pulsante Aggiorna Manuale (confronta tutti i file, anche quelli modificati da altri programmi)
+        ctk.CTkButton(self.frame_actions, text="🔄 Aggiorna Lista", fg_color="gray",
+                      command=lambda: self.refresh_library(full=True)).pack(pady=20, padx=20, fill="x")
+
+    def refresh_library(self, full: bool = False):
+        """
+        Aggiorna la lista delle trascrizioni, toccando solo le righe cambiate.
+
+        L'indice viene sincronizzato con la cartella in un thread di background (nessuna scansione
+        se la cartella non è cambiata, ma la prima sincronizzazione può rileggere molti file);
+        le trascrizioni modificate dopo l'ultimo aggiornamento arrivano alla lista nel main loop
+        attraverso il bus (vedi on_library_synced). Una sola sincronizzazione alla volta:
+        le richieste arrivate nel frattempo vengono unite in una sola, eseguita al termine.
 
-    def refresh_library(self):
+        Args:
+            full (bool): Se True, confronta tutti i file della cartella con l'indice.
         """
-        Scansiona la cartella 'Sbobinature' e rigenera i pulsanti nella lista.
-        Gestisce anche il filtraggio di file nascosti e l'ordinamento temporale.
+        if self.syncing:
+            self.pending_sync = bool(self.pending_sync) or full
+            return
+        self.syncing = True
+        threading.Thread(target=self.run_sync, args=(full, self.seen_seq), daemon=True).start()
+
+    def run_sync(self, full: bool, seen_seq: int):
         """
-        # 1. Pulisce la UI rimuovendo tutti i vecchi pulsanti
-        for widget in self.scroll_files.winfo_children():
-            widget.destroy()
+        Sincronizza l'indice (nel thread di background) e pubblica sul bus le trascrizioni cambiate.
 
-        folder = utils.get_transcripts_folder()
+        Args:
+            full (bool): Se True, confronta tutti i file della cartella con l'indice.
+            seen_seq (int): L'ultima sequenza già mostrata nella lista.
+        """
         try:
-            # List comprehension per filtrare file di sistema (es. .DS_Store su Mac)
-            files = [f for f in os.listdir(folder) if not f.startswith(".")]
-        except FileNotFoundError:
-            files = []
-
-        # Se non ci sono file, mostra un avviso e resetta i controlli
-        if not files:
-            ctk.CTkLabel(self.scroll_files, text="Archivio vuoto.").pack(pady=10)
+            self.library_index.sync(full=full)
+            changed, removed, seq = self.library_index.changes_since(seen_seq)
+            entries = {entry.stem: entry for entry in self.library_index.entries(changed)} if changed else {}
+        except Exception as e:
+            self.events.publish("library_synced", (None, None, seen_seq, str(e)))
+        else:
+            self.events.publish("library_synced", (entries, removed, seq, None))
+
+    def on_library_synced(self, entries: Optional[dict], removed: Optional[set], seq: int, error: Optional[str]):
+        """Applica alla lista (nel main loop) le modifiche trovate dalla sincronizzazione."""
+        self.syncing = False
+        if error:
+            print(f"Error syncing library: {error}")
+        else:
+            self.seen_seq = seq
+            if entries or removed:
+                self.apply_library_changes(entries, removed)
+
+        # Richieste arrivate durante la sincronizzazione
+        if self.pending_sync is not None:
+            full, self.pending_sync = self.pending_sync, None
+            self.refresh_library(full=full)
+
+    def apply_library_changes(self, entries: dict, removed: set):
+        """
+        Passa alla lista le trascrizioni aggiunte, modificate o eliminate.
+
+        Args:
+            entries (dict): Le trascrizioni nuove o modificate (nome -> LibraryEntry).
+            removed (set): I nomi delle trascrizioni eliminate.
+        """
+        self.file_list.apply_changes(changed=entries, removed=removed)
+
+        # Se la trascrizione selezionata è stata eliminata o modificata, aggiorniamo il pannello azioni
+        if self.selected_stem in removed:
+            self.disable_buttons()
+            self.lbl_selected.configure(text="Nessun file selezionato", text_color="gray")
+        elif self.selected_stem in entries:
+            self.select_library_item(self.selected_stem)
+
+        if not self.file_list.items:
             self.lbl_selected.configure(text="Nessun file")
             self.disable_buttons()
+
+        # Se è attiva una ricerca, i risultati potrebbero essere cambiati
+        if self.entry_search.get().strip():
+            self.run_search()
+
+    def on_sort_changed(self, choice: str):
+        """Applica l'ordinamento scelto alla lista."""
+        sort_key, reverse = SORT_OPTIONS[choice]
+        self.file_list.set_sort(sort_key, reverse)
+
+    def on_filter_changed(self, choice: str):
+        """Applica il filtro scelto alla lista."""
+        self.file_list.set_filter(FILTER_OPTIONS[choice])
+
+    @staticmethod
+    def format_entry(entry: LibraryEntry) -> str:
+        """Testo del pulsante: nome del file principale, durata (se nota) e altri formati disponibili."""
+        text = os.path.basename(entry.main_path)
+        if entry.duration:
+            text += f"   ⏱ {utils.seconds_to_hms(entry.duration)}"
+        others = [ext.upper() for ext in entry.formats if ext != entry.main_format]
+        if others:
+            text += f"   [{', '.join(others)}]"
+        return text
+
+    def watch_library(self):
+        """
+        Controllo periodico della cartella (debounced): quando la cartella cambia, l'aggiornamento
+        parte solo dopo WATCH_DEBOUNCE_MS senza ulteriori modifiche.
+        """
+        try:
+            folder_mtime = self.library_index.folder_mtime()
+        except OSError:
+            folder_mtime = None
+
+        if folder_mtime != self.last_folder_mtime:
+            self.last_folder_mtime = folder_mtime
+            if self.pending_refresh:
+                self.after_cancel(self.pending_refresh)
+            self.pending_refresh = self.after(WATCH_DEBOUNCE_MS, self.debounced_refresh)
+
+        self.after(WATCH_INTERVAL_MS, self.watch_library)
+
+    def debounced_refresh(self):
+        """Aggiornamento programmato da watch_library."""
+        self.pending_refresh = None
+        self.refresh_library()
+
+    # --- RICERCA ---
+
+    def on_search_changed(self, event=None):
+        """Programma la ricerca dopo una breve pausa nella digitazione (debounce)."""
+        if self.pending_search:
+            self.after_cancel(self.pending_search)
+        self.pending_search = self.after(SEARCH_DEBOUNCE_MS, self.run_search)
+
+    def run_search(self):
+        """
+        Esegue la ricerca a testo pieno e mostra i risultati con le parole trovate evidenziate.
+        Con il campo vuoto torna alla lista completa.
+        """
+        self.pending_search = None
+        text = self.entry_search.get().strip()
+
+        if not text:
+            self.txt_results.grid_remove()
+            self.file_list.grid()
             return
 
-        # 2. Ordinamento: Dal più recente al più vecchio (Best UX)
-        files.sort(key=lambda x: os.path.getmtime(os.path.join(folder, x)), reverse=True)
+        started = time.perf_counter()
+        results = self.library_index.search(text)
+        elapsed_ms = (time.perf_counter() - started) * 1000
 
-        # 3. Creazione dinamica dei pulsanti per ogni file
-        for f in files:
-            full_path = os.path.join(folder, f)
-            # Usiamo una lambda con default argument (x=full_path) per "congelare" il valore della variabile
-            btn = ctk.CTkButton(self.scroll_files, text=f, fg_color="transparent", border_width=1,
-                                text_color=("gray10", "gray90"), anchor="w",
-                                command=lambda x=full_path: self.select_library_item(x))
-            btn.pack(fill="x", pady=2, padx=5)
+        self.file_list.grid_remove()
+        self.txt_results.grid(row=1, column=0, padx=10, pady=10, sticky="nsew")
 
-    def select_library_item(self, filepath: str):
+        self.txt_results.configure(state="normal")
+        self.txt_results.delete("1.0", "end")
+        for tag in self.txt_results.tag_names():
+            if tag.startswith("result-"):
+                self.txt_results.tag_delete(tag)
+
+        self.txt_results.insert("end", f"{len(results)} risultati ({elapsed_ms:.0f} ms)\n\n", "info")
+        for n, (stem, snippet, _) in enumerate(results):
+            # Ogni risultato è cliccabile: seleziona la trascrizione come un click nella lista
+            result_tag = f"result-{n}"
+            self.txt_results.insert("end", f"📄 {stem}\n", ("title", result_tag))
+
+            # L'estratto alterna testo normale e parole trovate (racchiuse dai delimitatori dell'indice)
+            for i, part in enumerate(snippet.replace(HIGHLIGHT_END, HIGHLIGHT_START).split(HIGHLIGHT_START)):
+                self.txt_results.insert("end", part, ("hit", result_tag) if i % 2 else (result_tag,))
+            self.txt_results.insert("end", "\n\n")
+
+            self.txt_results.tag_bind(result_tag, "<Button-1>", lambda e, x=stem: self.select_library_item(x))
+
+        self.txt_results.configure(state="disabled")
+
+    def select_library_item(self, stem: str):
         """
-        Gestisce il click su un file nella lista.
+        Gestisce il click su una trascrizione nella lista.
 
         Args:
-            filepath (str): Il percorso completo del file selezionato.
+            stem (str): Il nome della trascrizione (senza estensione).
         """
+        entry = self.library_index.get(stem)
         # Verifica di sicurezza: il file potrebbe essere stato cancellato esternamente
-        if os.path.exists(filepath):
-            self.selected_file_path = filepath
-            self.lbl_selected.configure(text=os.path.basename(filepath), text_color="white")
+        if entry and os.path.exists(entry.main_path):
+            self.selected_stem = stem
+            self.selected_file_path = entry.main_path
+            self.file_list.select(stem)
+            self.lbl_selected.configure(text=os.path.basename(entry.main_path), text_color="white")
             self.enable_buttons()
         else:
             # Se il file non esiste più, aggiorniamo la lista per riflettere la realtà
-            self.refresh_library()
+            self.refresh_library(full=True)
 
     def enable_buttons(self):
         """Abilita i pulsanti di azione quando un file è selezionato."""
         self.btn_open.configure(state="normal")
-        self.btn_pdf.configure(state="normal")
-        self.btn_word.configure(state="normal")
+        # Un solo export alla volta
+        self.btn_pdf.configure(state="disabled" if self.exporting else "normal")
+        self.btn_word.configure(state="disabled" if self.exporting else "normal")
+        has_segments = os.path.exists(SegmentStore.sidecar_path(self.selected_file_path))
+        self.btn_srt.configure(state="normal" if has_segments else "disabled")
+        self.btn_vtt.configure(state="normal" if has_segments else "disabled")
         self.btn_ics.configure(state="normal")
         self.btn_delete.configure(state="normal")
 
     def disable_buttons(self):
         """Disabilita i pulsanti di azione (stato iniziale o post-cancellazione)."""
         self.selected_file_path = None
+        self.selected_stem = None
+        self.file_list.select(None)
         self.btn_open.configure(state="disabled")
         self.btn_pdf.configure(state="disabled")
         self.btn_word.configure(state="disabled")
+        self.btn_srt.configure(state="disabled")
+        self.btn_vtt.configure(state="disabled")
         self.btn_ics.configure(state="disabled")
         self.btn_delete.configure(state="disabled")
 
     def delete_selected_file(self):
         """
-        Elimina il file selezionato dal disco, chiedendo prima conferma all'utente.
+        Elimina la trascrizione selezionata (con tutti i suoi formati) dal disco,
+        chiedendo prima conferma all'utente.
         """
-        if not self.selected_file_path: return
+        entry = self.library_index.get(self.selected_stem) if self.selected_stem else None
+        if not entry: return
 
-        filename = os.path.basename(self.selected_file_path)
+        filenames = [os.path.basename(entry.path(ext)) for ext in entry.formats]
 
         # Popup di conferma
-        if messagebox.askyesno("Conferma", f"Vuoi eliminare definitivamente:\n{filename}?"):
+        if messagebox.askyesno("Conferma", "Vuoi eliminare definitivamente:\n" + "\n".join(filenames) + "?"):
             try:
-                os.remove(self.selected_file_path)
+                for ext in entry.formats:
+                    if os.path.exists(entry.path(ext)):
+                        os.remove(entry.path(ext))
+                SegmentStore.delete(entry.path("txt"))
 
                 # Feedback visivo
                 self.refresh_library()
@@ -196,7 +458,9 @@ class LibraryView(ctk.CTkFrame):
 
     def export_file(self, format_type: str):
         """
-        Avvia il processo di esportazione del file di testo in un altro formato.
+        Avvia l'esportazione del file di testo in un altro formato, in un thread separato.
+        Il testo viene letto e scritto un paragrafo alla volta: l'interfaccia resta reattiva
+        e la barra mostra l'avanzamento anche per trascrizioni di molte ore.
 
         Args:
             format_type (str): Il formato target ('pdf', 'word', etc.).
@@ -205,23 +469,147 @@ class LibraryView(ctk.CTkFrame):
             messagebox.showerror("Errore", "Seleziona un file .txt valido")
             return
 
+        # Deleghiamo la conversione al modulo utils
+        if format_type == "pdf":
+            exporter = utils.export_pdf
+        elif format_type == "word":
+            exporter = utils.export_docx
+        # elif format_type == "ics": ... # Logica futura
+        else:
+            return
+
+        self.set_exporting(True)
+        threading.Thread(target=self.run_export, args=(exporter, self.selected_file_path), daemon=True).start()
+
+    def run_export(self, exporter: Callable[..., str], txt_path: str):
+        """
+        Esegue l'export (nel thread di background) e riporta il risultato nel main loop attraverso il bus.
+
+        Args:
+            exporter (Callable): La funzione di export di utils.
+            txt_path (str): Il file di testo da esportare.
+        """
+        try:
+            new_path = exporter(txt_path, lambda value: self.events.publish("export_progress", value))
+            # Registriamo da quale versione del testo è nato l'export: l'export multiplo potrà saltarlo
+            self.bulk_exporter.record(txt_path, new_path)
+        except Exception as e:
+            self.events.publish("export_done", (None, str(e)))
+        else:
+            self.events.publish("export_done", (new_path, None))
+
+    def on_export_done(self, new_path: Optional[str], error: Optional[str]):
+        """Conclude l'export nel main loop: messaggio all'utente e aggiornamento della libreria."""
+        self.set_exporting(False)
+        if error:
+            messagebox.showerror("Errore Export", error)
+            return
+
+        messagebox.showinfo("Export Riuscito", f"File creato:\n{os.path.basename(new_path)}")
+
+        # L'export è già stato segnalato all'indice (anche se sovrascritto): basta leggere le modifiche
+        self.refresh_library()
+
+    def export_subtitles(self, format_type: str):
+        """
+        Scrive i sottotitoli della trascrizione selezionata dai segmenti salvati.
+        Nessuna nuova trascrizione: è una lettura sequenziale dell'archivio dei segmenti.
+
+        Args:
+            format_type (str): 'srt' oppure 'vtt'.
+        """
+        store = SegmentStore.load(self.selected_file_path) if self.selected_file_path else None
+        if store is None:
+            messagebox.showerror("Errore", "Questa trascrizione non ha i tempi dei segmenti.")
+            return
+
+        new_path = os.path.splitext(self.selected_file_path)[0] + f".{format_type}"
         try:
-            # Leggiamo il contenuto del file
-            with open(self.selected_file_path, 'r', encoding='utf-8') as f:
-                content = f.read()
+            if format_type == "srt":
+                store.write_srt(new_path)
+            else:
+                store.write_vtt(new_path)
+        except Exception as e:
+            messagebox.showerror("Errore Export", str(e))
+            return
 
-            new_path = ""
-            # Deleghiamo la conversione al modulo utils
-            if format_type == "pdf":
-                new_path = utils.save_as_pdf(content, self.selected_file_path)
-            elif format_type == "word":
-                new_path = utils.save_as_docx(content, self.selected_file_path)
-            # elif format_type == "ics": ... # Logica futura
+        messagebox.showinfo("Export Riuscito", f"File creato:\n{os.path.basename(new_path)}")
+        self.library_index.update_file(new_path)
+        self.refresh_library()
+
+    # --- EXPORT MULTIPLO ---
+
+    def on_check_changed(self, checked: set):
+        """Aggiorna i pulsanti dell'export multiplo quando cambiano le trascrizioni spuntate."""
+        state = "normal" if checked and not self.exporting else "disabled"
+        self.btn_bulk_pdf.configure(state=state, text=f"📦 PDF selezionati ({len(checked)})" if checked
+                                    else "📦 PDF selezionati")
+        self.btn_bulk_word.configure(state=state, text=f"📦 WORD selezionati ({len(checked)})" if checked
+                                     else "📦 WORD selezionati")
+        if not checked:
+            self.chk_all.deselect()
+
+    def toggle_check_all(self):
+        """Spunta (o toglie la spunta a) tutte le trascrizioni della lista."""
+        self.file_list.set_checked(self.file_list.visible_keys() if self.chk_all.get() else [])
+
+    def export_checked(self, formats: list):
+        """
+        Esporta tutte le trascrizioni spuntate nei formati richiesti, in un pool di processi.
+        Gli export già generati dalla versione attuale del testo vengono saltati.
 
-            messagebox.showinfo("Export Riuscito", f"File creato:\n{os.path.basename(new_path)}")
+        Args:
+            formats (list): I formati da generare (chiavi di EXPORT_FORMATS in backend.BulkExporter).
+        """
+        txt_paths = []
+        for entry in self.library_index.entries(self.file_list.checked):
+            if "txt" in entry.formats:
+                txt_paths.append(entry.path("txt"))
+        if not txt_paths:
+            messagebox.showerror("Errore", "Nessuna delle trascrizioni selezionate ha un file .txt")
+            return
 
-            # Aggiorniamo la lista affinché il nuovo file (es. PDF) appaia se decidiamo di mostrarli
-            self.refresh_library()
+        self.set_exporting(True)
+        threading.Thread(target=self.run_bulk_export, args=(txt_paths, formats), daemon=True).start()
 
+    def run_bulk_export(self, txt_paths: list, formats: list):
+        """Esegue l'export multiplo (nel thread di background) e riporta il riepilogo nel main loop."""
+        try:
+            summary = self.bulk_exporter.run(
+                txt_paths, formats,
+                progress_callback=lambda done, total: self.events.publish("export_progress", done / total))
         except Exception as e:
-            messagebox.showerror("Errore Export", str(e))
\ No newline at end of file
+            self.events.publish("bulk_export_done", (None, str(e)))
+        else:
+            self.events.publish("bulk_export_done", (summary, None))
+
+    def on_bulk_export_done(self, summary: Optional[dict], error: Optional[str]):
+        """Mostra il riepilogo dell'export multiplo e aggiorna la libreria."""
+        self.set_exporting(False)
+        if error:
+            messagebox.showerror("Errore Export", error)
+            return
+
+        lines = [f"✅ Generati: {len(summary['exported'])}",
+                 f"⏩ Già aggiornati: {summary['skipped']}",
+                 f"⏱ Tempo: {utils.seconds_to_hms(summary['elapsed'])}"]
+        if summary["failed"]:
+            lines.insert(2, f"❌ Errori: {len(summary['failed'])}")
+            lines += [""] + [f"{name}: {message}" for name, message in list(summary["failed"].items())[:10]]
+            messagebox.showwarning("Export Multiplo", "\n".join(lines))
+        else:
+            messagebox.showinfo("Export Multiplo", "\n".join(lines))
+        self.refresh_library()
+
+    def set_exporting(self, running: bool):
+        """Mostra la barra di avanzamento e blocca i pulsanti di export mentre un export è in corso."""
+        self.exporting = running
+        state = "disabled" if running or not self.selected_file_path else "normal"
+        self.btn_pdf.configure(state=state)
+        self.btn_word.configure(state=state)
+        self.on_check_changed(self.file_list.checked)
+        if running:
+            self.progress_export.set(0)
+            self.progress_export.pack(pady=5, padx=20, fill="x", after=self.btn_word)
+        else:
+            self.progress_export.pack_forget()
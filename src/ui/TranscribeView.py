@@ -1,14 +1,16 @@
 import os
-import threading
 from tkinter import filedialog, messagebox
 
 import customtkinter as ctk
 from dotenv import load_dotenv
-from matplotlib import pyplot as plt
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
 
 from backend import AudioHandler
 from backend import Transcriber
+from backend.EncodingProfile import PROFILES, DEFAULT_PROFILE
+from backend.JobScheduler import JobScheduler, TranscriptionJob, STATUS_DONE, STATUS_QUEUED, STATUS_RUNNING
+from backend.SegmentStore import SegmentStore
+from ui.EventBus import EventBus
+from ui.WaveformCanvas import WaveformCanvas
 from utils import utils
 
 # --- CONFIGURAZIONE ---
@@ -18,6 +20,9 @@ GROQ_API_KEY = os.getenv("GROQ_API_KEY")
 ctk.set_appearance_mode("Dark")
 ctk.set_default_color_theme("blue")
 
+# Righe massime conservate nella console di log (le più vecchie vengono eliminate)
+LOG_MAX_LINES = 5000
+
 
 class TranscribeView(ctk.CTkFrame):
     """
@@ -25,9 +30,10 @@ class TranscribeView(ctk.CTkFrame):
 
         Responsabilità principali:
         - Caricamento e validazione del file audio.
-        - Visualizzazione grafica della forma d'onda (Waveform).
+        - Visualizzazione grafica della forma d'onda (Waveform), con click per leggere il testo già trascritto.
         - Controlli per il ritaglio (Start/End).
-        - Avvio del processo di trascrizione in un thread separato.
+        - Coda di lavori (più file, ognuno con il proprio ritaglio) eseguiti in background.
+        - Riepilogo dei tempi per fase dell'ultimo lavoro terminato (o di quello selezionato in coda).
         - Gestione dell'input utente per il nome del file di output.
         """
     def __init__(self, master, on_complete_callback=None):
@@ -47,8 +53,25 @@ class TranscribeView(ctk.CTkFrame):
         self.audio_handler = AudioHandler.AudioHandler()
         self.transcriber = Transcriber.Transcriber()
 
-        # Setup una tantum per FFmpeg (percorsi di sistema)
-        utils.setup_ffmpeg()
+        # Gli eventi dei thread di lavoro arrivano ai widget solo attraverso il bus, nel main loop
+        self.events = EventBus(self)
+        self.events.subscribe_latest("job", lambda job_id, job: self.refresh_job_row(job))
+        self.events.subscribe_batch("log", self.append_lines)
+        self.events.start()
+
+        # Lo scheduler viene creato al primo lavoro (serve la chiave API)
+        self.scheduler = None
+        self.job_rows = {}
+        self.notified_jobs = set()
+        self.metrics_job = None
+
+        # Segmenti temporizzati delle trascrizioni del file caricato (caricati al primo click sul grafico)
+        self.segment_stores = None
+        self.waveform = None
+
+        # Setup una tantum per FFmpeg (percorsi di sistema), dopo che la finestra è apparsa:
+        # prima di allora l'utente non può ancora scegliere un file
+        self.after_idle(utils.setup_ffmpeg)
 
         self.create_ui()
 
@@ -66,7 +89,11 @@ class TranscribeView(ctk.CTkFrame):
 
         self.btn_file = ctk.CTkButton(self.frame_input, text="📂 1. Seleziona File Audio",
                                       command=self.select_file, fg_color="#E67E22", hover_color="#D35400")
-        self.btn_file.pack(pady=10, padx=20, fill="x")
+        self.btn_file.pack(pady=(10, 5), padx=20, fill="x")
+
+        self.btn_add_many = ctk.CTkButton(self.frame_input, text="➕ Aggiungi più file alla coda (intero audio)",
+                                          command=self.add_many_files, fg_color="gray")
+        self.btn_add_many.pack(pady=(0, 10), padx=20, fill="x")
 
         # --- Sezione Grafico (Waveform) ---
         self.frame_graph = ctk.CTkFrame(self, height=100, fg_color="#1a1a1a")
@@ -77,19 +104,41 @@ class TranscribeView(ctk.CTkFrame):
         # Controlli di ritaglio (Slider)
         self.create_cut_controls()
 
-        # Barra di Progresso (Nascosta inizialmente)
-        self.progress_bar = ctk.CTkProgressBar(self, orientation="horizontal", mode="determinate")
-        self.progress_bar.set(0)
-        self.progress_bar.pack(pady=(15, 5), padx=20, fill="x")
-        self.progress_bar.pack_forget()
+        # Opzioni di invio
+        frame_options = ctk.CTkFrame(self, fg_color="transparent")
+        frame_options.pack(pady=5, padx=20, fill="x")
+
+        # Esclusione dei silenzi lunghi dall'invio (meno byte caricati e meno tempo API)
+        self.check_skip_silence = ctk.CTkCheckBox(frame_options, text="Salta i silenzi lunghi (pause, intervalli)")
+        self.check_skip_silence.pack(side="left")
 
-        # Pulsante Avvio Trascrizione
-        self.btn_process = ctk.CTkButton(self, text="🚀 2. AVVIA TRASCRIZIONE",
+        # Profilo di codifica dei chunk (determina anche quanti minuti entrano in ogni richiesta)
+        self.option_profile = ctk.CTkOptionMenu(frame_options, values=list(PROFILES), width=90)
+        self.option_profile.set(DEFAULT_PROFILE)
+        self.option_profile.pack(side="right")
+        ctk.CTkLabel(frame_options, text="Formato upload:").pack(side="right", padx=5)
+
+        # Pulsante Avvio Trascrizione (aggiunge il file corrente alla coda)
+        self.btn_process = ctk.CTkButton(self, text="🚀 2. AVVIA TRASCRIZIONE (aggiungi alla coda)",
                                          font=("Arial", 16, "bold"), height=45,
                                          fg_color="#27AE60", hover_color="#2ECC71",
                                          state="disabled", command=self.start_thread_processing)
         self.btn_process.pack(pady=10, padx=20, fill="x")
 
+        # Coda dei lavori: una riga per file, con avanzamento e controlli di ordinamento
+        self.frame_queue = ctk.CTkScrollableFrame(self, label_text="Coda Lavori", height=130)
+        self.frame_queue.pack(pady=5, padx=10, fill="x")
+
+        # Le righe dei lavori conclusi restano visibili finché l'utente non le rimuove
+        self.btn_clear_jobs = ctk.CTkButton(self, text="🧹 Rimuovi lavori conclusi", height=24, fg_color="gray",
+                                            command=self.clear_finished_jobs)
+        self.btn_clear_jobs.pack(pady=(0, 5), padx=10, anchor="e")
+
+        # Riepilogo dei tempi per fase: mostra dove è stato speso il tempo (decodifica, codifica, API...)
+        self.lbl_metrics = ctk.CTkLabel(self, text="Tempi per fase: nessun lavoro terminato",
+                                        font=("Courier", 12), justify="left", anchor="w", text_color="gray")
+        self.lbl_metrics.pack(pady=(5, 0), padx=15, fill="x")
+
         # Console di Log
         self.textbox = ctk.CTkTextbox(self, width=800, height=150)
         self.textbox.pack(pady=10, padx=10, fill="both", expand=True)
@@ -129,13 +178,15 @@ class TranscribeView(ctk.CTkFrame):
 
             # Carica audio e ottiene durata
             duration = self.audio_handler.load_file(filename)
+            self.segment_stores = None
 
             # Aggiorna UI
             self.setup_sliders(duration)
             self.draw_waveform()
             self.btn_process.configure(state="normal")
 
-            self.textbox.insert("end", f"--> Caricato: {os.path.basename(filename)}\n")
+            mode = " (streaming)" if self.audio_handler.streaming else ""
+            self.append_text(f"--> Caricato{mode}: {os.path.basename(filename)}")
 
     def setup_sliders(self, duration):
         """
@@ -149,34 +200,58 @@ class TranscribeView(ctk.CTkFrame):
 
     def update_inputs(self):
         """
-            Sincronizza le caselle di testo (HH:MM:SS) con il valore attuale degli slider.
+            Sincronizza le caselle di testo (HH:MM:SS) e la selezione sul grafico con il valore attuale degli slider.
         """
         self.entry_start.delete(0, "end")
         self.entry_start.insert(0, utils.seconds_to_hms(self.slider_start.get()))
         self.entry_end.delete(0, "end")
         self.entry_end.insert(0, utils.seconds_to_hms(self.slider_end.get()))
+        # Solo la sovrimpressione: la forma d'onda non viene ridisegnata
+        if self.waveform is not None:
+            self.waveform.set_selection(self.slider_start.get(), self.slider_end.get())
 
     def draw_waveform(self):
         """
-            Disegna la forma d'onda dell'audio usando Matplotlib integrato in Tkinter.
+            Disegna la forma d'onda dell'audio su un canvas Tk (il widget viene creato una sola volta).
         """
-        data = self.audio_handler.get_waveform_data()
+        # Una colonna di picchi per pixel: l'inviluppo resta corretto a qualsiasi larghezza
+        width_px = max(self.frame_graph.winfo_width(), 800)
+        data = self.audio_handler.get_waveform_data(max_points=width_px)
 
-        # Pulizia grafico precedente per evitare sovrapposizioni e memory leak
-        for widget in self.frame_graph.winfo_children(): widget.destroy()
+        if self.waveform is None:
+            # Click sul grafico: mostra il testo già trascritto in quel punto
+            self.waveform = WaveformCanvas(self.frame_graph, on_click=self.show_text_at)
+            self.waveform.pack(fill="both", expand=True)
 
-        # Configurazione Matplotlib
-        fig = plt.Figure(figsize=(8, 1), dpi=100, facecolor='#1a1a1a')
-        ax = fig.add_subplot(111)
-        ax.set_facecolor('#1a1a1a')
-        ax.plot(data, color='#E67E22', linewidth=0.6)
-        ax.axis('off') # Nasconde gli assi per un look più pulito
-        fig.tight_layout(pad=0)
+        self.waveform.set_data(data, self.audio_handler.duration)
+        self.waveform.set_selection(self.slider_start.get(), self.slider_end.get())
 
-        # Rendering nel widget CustomTkinter
-        canvas = FigureCanvasTkAgg(fig, master=self.frame_graph)
-        canvas.draw()
-        canvas.get_tk_widget().pack(fill="both", expand=True)
+    def show_text_at(self, seconds):
+        """
+        Scrive nella console il segmento trascritto all'istante indicato, se il file è già stato trascritto.
+        La ricerca è binaria sui segmenti salvati: nessuna chiamata all'API.
+
+        Args:
+            seconds (float): Tempo in secondi della registrazione caricata.
+        """
+        if self.segment_stores is None:
+            source = self.audio_handler.fingerprint or utils.file_fingerprint(self.audio_handler.filepath)
+            entries = self.transcriber.library_index.find_by_source(source)
+            stores = ((entry.stem, SegmentStore.load(entry.path("txt"))) for entry in entries)
+            self.segment_stores = [(stem, store) for stem, store in stores if store is not None and len(store)]
+
+        if not self.segment_stores:
+            self.append_text(f"[{utils.seconds_to_hms(seconds)}] Nessuna trascrizione con i tempi per questo file.")
+            return
+
+        # Una trascrizione può coprire solo un ritaglio: usiamo la più recente che contiene l'istante
+        for stem, store in self.segment_stores:
+            index = store.index_at(seconds)
+            if index is not None and seconds <= store.ends[-1]:
+                start, _, text = store.segment(index)
+                self.append_text(f"[{utils.seconds_to_hms(start)} · {stem}] {text}")
+                return
+        self.append_text(f"[{utils.seconds_to_hms(seconds)}] Punto non ancora trascritto.")
 
     def on_slider_start(self, val):
         """
@@ -192,15 +267,43 @@ class TranscribeView(ctk.CTkFrame):
         if val <= self.slider_start.get(): self.slider_start.set(val)
         self.update_inputs()
 
+    def get_scheduler(self):
+        """
+        Restituisce lo scheduler dei lavori, creandolo al primo utilizzo.
+
+        Returns:
+            JobScheduler: Lo scheduler, oppure None se manca la chiave API.
+        """
+        if "gsk_" not in str(GROQ_API_KEY):
+            messagebox.showerror("Errore", "Manca la API KEY nel file .env!")
+            return None
+
+        if self.scheduler is None:
+            # I callback arrivano dai thread di background: li pubblichiamo sul bus (nessun accesso a Tk)
+            self.scheduler = JobScheduler(
+                GROQ_API_KEY,
+                transcriber=self.transcriber,
+                on_update=lambda job: self.events.publish("job", job, key=job.id),
+                on_log=lambda job, text: self.events.publish("log", f"[{job.name}] {text}")
+            )
+        return self.scheduler
+
+    def current_options(self):
+        """Opzioni di invio selezionate nell'interfaccia, da applicare ai nuovi lavori."""
+        return {
+            "skip_silence": bool(self.check_skip_silence.get()),
+            "encoding_profile": self.option_profile.get()
+        }
+
     def start_thread_processing(self):
         """
-        Avvia la procedura di trascrizione.
+        Aggiunge il file corrente (con il ritaglio selezionato) alla coda dei lavori.
         1. Verifica la chiave API.
         2. Chiede il nome del file di output (Popup).
-        3. Avvia il thread di elaborazione (per non bloccare la GUI).
+        3. Accoda il lavoro: lo scheduler lo esegue in background appena c'è un worker libero.
         """
-        if "gsk_" not in str(GROQ_API_KEY):
-            messagebox.showerror("Errore", "Manca la API KEY nel file .env!")
+        scheduler = self.get_scheduler()
+        if scheduler is None:
             return
 
         # --- 1. POPUP PER IL NOME FILE ---
@@ -218,53 +321,141 @@ class TranscribeView(ctk.CTkFrame):
         if custom_name.strip() == "":
             custom_name = default_name
 
-        # --- 2. PREPARAZIONE UI ---
-        self.btn_process.configure(state="disabled", text="ELABORAZIONE...")
-        self.progress_bar.pack(pady=(15, 5), padx=20, fill="x")
-        self.progress_bar.set(0)
-        self.textbox.delete("0.0", "end")
-
-        # --- 3. AVVIO THREAD ---
-        threading.Thread(target=self.run_logic, args=(GROQ_API_KEY, custom_name)).start()
-
-    def run_logic(self, api_key, custom_filename):
-        """
-        Logica eseguita nel thread separato.
-        Chiama il backend e gestisce il ciclo di vita della trascrizione.
-        """
-        try:
-            self.transcriber.process_audio(
-                self.audio_handler,
-                self.slider_start.get(),
-                self.slider_end.get(),
-                api_key,
-                output_filename=custom_filename,
-                progress_callback=self.update_progress,
-                text_callback=self.append_text
-            )
+        # --- 2. ACCODAMENTO ---
+        scheduler.add_job(TranscriptionJob(self.audio_handler.filepath, self.slider_start.get(),
+                                           self.slider_end.get(), custom_name, self.current_options()))
 
-            self.append_text("\n✨ TUTTO COMPLETATO!")
+    def add_many_files(self):
+        """
+        Aggiunge alla coda più file in una volta, ognuno trascritto per intero con il nome di default.
+        """
+        filenames = filedialog.askopenfilenames(filetypes=(("Audio", "*.mp3 *.wav *.m4a"), ("Tutti", "*.*")))
+        if not filenames:
+            return
 
-            # Notifica la view principale (se il callback esiste) usando .after per thread-safety
-            if self.on_complete_callback:
-                self.after(0, self.on_complete_callback)
+        scheduler = self.get_scheduler()
+        if scheduler is None:
+            return
+
+        for filename in filenames:
+            default_name = os.path.splitext(os.path.basename(filename))[0]
+            scheduler.add_job(TranscriptionJob(filename, 0.0, None, default_name, self.current_options()))
 
-        except Exception as e:
-            self.append_text(f"\n❌ ERRORE: {str(e)}")
-        finally:
-            # Ripristina lo stato del pulsante nel thread principale
-            self.btn_process.configure(state="normal", text="🚀 2. AVVIA TRASCRIZIONE")
+    # --- RIGHE DELLA CODA ---
+
+    def refresh_job_row(self, job):
+        """
+        Crea o aggiorna la riga di un lavoro nella coda (eseguito nel main loop).
+        """
+        row = self.job_rows.get(job.id)
+        if row is None and job not in self.scheduler.jobs:
+            # Notifica arrivata dopo che il lavoro è stato rimosso dalla coda
+            return
+        if row is None:
+            row = self.create_job_row(job)
+            self.job_rows[job.id] = row
+            self.repack_job_rows()
+
+        row["label"].configure(text=f"{'⭐ ' if job.priority > 0 else ''}{job.name} — {job.status}")
+        row["progress"].set(job.progress)
+
+        # I controlli di ordinamento hanno senso solo per i lavori ancora in coda
+        queued_state = "normal" if job.status == STATUS_QUEUED else "disabled"
+        for key in ("up", "down", "star"):
+            row[key].configure(state=queued_state)
+        row["cancel"].configure(state="normal" if job.status in (STATUS_QUEUED, STATUS_RUNNING) else "disabled")
+
+        # Il riepilogo segue l'ultimo lavoro terminato (le metriche vengono chiuse dal Transcriber)
+        if job.status not in (STATUS_QUEUED, STATUS_RUNNING) and job.metrics and job.metrics.status:
+            if job is not self.metrics_job:
+                self.show_metrics(job)
+
+        # Notifica la libreria una sola volta per ogni lavoro completato
+        if job.status == STATUS_DONE and job.id not in self.notified_jobs:
+            self.notified_jobs.add(job.id)
+            self.segment_stores = None
+            self.append_text(f"\n✨ [{job.name}] COMPLETATO!")
+            if self.on_complete_callback:
+                self.on_complete_callback()
 
-    def update_progress(self, value):
+    def create_job_row(self, job):
         """
-        Aggiorna la barra di progresso (Thread-safe).
+        Costruisce i widget di una riga della coda.
+
+        Returns:
+            dict: I widget della riga, per gli aggiornamenti successivi.
         """
-        self.progress_bar.set(value)
+        frame = ctk.CTkFrame(self.frame_queue)
+        frame.columnconfigure(0, weight=1)
+
+        label = ctk.CTkLabel(frame, text=job.name, anchor="w")
+        label.grid(row=0, column=0, padx=5, sticky="ew")
+        # Click sul nome: mostra i tempi per fase di quel lavoro
+        label.bind("<Button-1>", lambda event: self.show_metrics(job))
+
+        progress = ctk.CTkProgressBar(frame, orientation="horizontal", mode="determinate", height=8)
+        progress.set(0)
+        progress.grid(row=1, column=0, padx=5, pady=(0, 5), sticky="ew")
+
+        buttons = {}
+        for column, (key, text, command) in enumerate((
+                ("up", "▲", lambda: self.move_job(job, -1)),
+                ("down", "▼", lambda: self.move_job(job, 1)),
+                ("star", "⭐", lambda: self.toggle_priority(job)),
+                ("cancel", "✖", lambda: self.scheduler.cancel(job)))):
+            buttons[key] = ctk.CTkButton(frame, text=text, width=28, fg_color="gray", command=command)
+            buttons[key].grid(row=0, column=column + 1, rowspan=2, padx=2)
+
+        return {"frame": frame, "label": label, "progress": progress, **buttons}
+
+    def show_metrics(self, job):
+        """Mostra nel pannello il riepilogo dei tempi per fase di un lavoro."""
+        if job.metrics is None:
+            return
+        self.metrics_job = job
+        self.lbl_metrics.configure(text=job.metrics.describe(), text_color=("black", "white"))
+
+    def repack_job_rows(self):
+        """Riordina le righe secondo l'ordine della coda nello scheduler."""
+        for job in self.scheduler.jobs:
+            row = self.job_rows.get(job.id)
+            if row:
+                row["frame"].pack_forget()
+                row["frame"].pack(fill="x", pady=2, padx=2)
+
+    def clear_finished_jobs(self):
+        """Rimuove dalla coda (e dall'interfaccia) i lavori completati, falliti o annullati."""
+        if self.scheduler is None:
+            return
+        for job in self.scheduler.remove_finished():
+            row = self.job_rows.pop(job.id, None)
+            if row:
+                row["frame"].destroy()
+            self.notified_jobs.discard(job.id)
+
+    def move_job(self, job, offset):
+        """Sposta un lavoro in coda e aggiorna l'ordine delle righe."""
+        self.scheduler.move(job, offset)
+        self.repack_job_rows()
+
+    def toggle_priority(self, job):
+        """Alterna la priorità alta/normale di un lavoro in coda."""
+        self.scheduler.set_priority(job, 0 if job.priority > 0 else 1)
 
     def append_text(self, text):
         """
         Scrive nella console di log e scrolla in basso.
         """
-        self.textbox.insert("end", text + "\n")
+        self.append_lines([text])
+
+    def append_lines(self, lines):
+        """
+        Scrive più righe nella console con un solo inserimento e un solo scroll.
+        La console conserva al massimo LOG_MAX_LINES righe.
+        """
+        self.textbox.insert("end", "\n".join(lines) + "\n")
+        excess = int(self.textbox.index("end-1c").split(".")[0]) - LOG_MAX_LINES
+        if excess > 0:
+            self.textbox.delete("1.0", f"{excess + 1}.0")
         self.textbox.see("end")
 
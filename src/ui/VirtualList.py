@@ -0,0 +1,322 @@
+import bisect
+import math
+from typing import Any, Callable, Dict, Hashable, Iterable, List, Optional, Set, Tuple
+
+import customtkinter as ctk
+
+# Altezza (pixel) di ogni riga della lista
+DEFAULT_ROW_HEIGHT = 32
+
+# Oltre questo numero di modifiche in un colpo solo conviene riordinare tutto invece di inserire uno per uno
+BULK_UPDATE_THRESHOLD = 256
+
+
+class VirtualList(ctk.CTkFrame):
+    """
+    Lista "virtualizzata": crea solo i pulsanti delle righe visibili e li riutilizza durante lo scorrimento.
+
+    Gli elementi sono tenuti in una lista ordinata di chiavi (inserimenti e rimozioni con ricerca binaria);
+    scorrere, ordinare o filtrare cambia solo quali elementi vengono mostrati nei pulsanti esistenti.
+    Il costo di un aggiornamento dipende dal numero di righe visibili, non dal numero di elementi.
+
+    Con `checkable=True` ogni riga ha anche una casella di spunta per la selezione multipla
+    (lo stato è tenuto per chiave, quindi sopravvive a scorrimento, ordinamento e filtri).
+    """
+
+    def __init__(self, master, format_item: Callable[[Any], str] = str,
+                 on_select: Optional[Callable[[Hashable], None]] = None,
+                 sort_key: Optional[Callable[[Any], Any]] = None, reverse: bool = False,
+                 label_text: Optional[str] = None, empty_text: str = "Nessun elemento.",
+                 row_height: int = DEFAULT_ROW_HEIGHT, checkable: bool = False,
+                 on_check: Optional[Callable[[Set[Hashable]], None]] = None, **kwargs):
+        """
+        Inizializza la lista.
+
+        Args:
+            master: Il widget genitore.
+            format_item (Callable): Funzione che restituisce il testo di un elemento.
+            on_select (Callable, optional): Chiamata con la chiave dell'elemento cliccato.
+            sort_key (Callable, optional): Chiave di ordinamento degli elementi (default: la chiave stessa).
+            reverse (bool): Se True, ordine decrescente.
+            label_text (str, optional): Titolo mostrato sopra la lista.
+            empty_text (str): Testo mostrato quando non ci sono elementi da mostrare.
+            row_height (int): Altezza di ogni riga in pixel.
+            checkable (bool): Se True, ogni riga ha una casella per la selezione multipla.
+            on_check (Callable, optional): Chiamata con l'insieme delle chiavi spuntate quando cambia.
+        """
+        super().__init__(master, **kwargs)
+        self.format_item = format_item
+        self.on_select = on_select
+        self.row_height = row_height
+        self.checkable = checkable
+        self.on_check = on_check
+
+        self.items: Dict[Hashable, Any] = {}
+        self.selected: Optional[Hashable] = None
+        self.checked: Set[Hashable] = set()
+
+        self._sort_key = sort_key
+        self._reverse = reverse
+        self._filter: Optional[Callable[[Any], bool]] = None
+        # Elementi visibili (dopo il filtro), in ordine crescente di (chiave di ordinamento, chiave)
+        self._view: List[Tuple[Any, Hashable]] = []
+        self._view_keys: Dict[Hashable, Tuple[Any, Hashable]] = {}
+
+        self._first = 0  # indice del primo elemento mostrato
+        self._rows: List[ctk.CTkButton] = []
+        self._row_keys: List[Optional[Hashable]] = []  # chiave mostrata da ogni pulsante
+        self._checks: List[ctk.CTkCheckBox] = []
+
+        self.columnconfigure(0, weight=1)
+        self.rowconfigure(1, weight=1)
+        if label_text:
+            ctk.CTkLabel(self, text=label_text, font=("Arial", 13, "bold")).grid(row=0, column=0, columnspan=2,
+                                                                                pady=(5, 0))
+
+        self._body = ctk.CTkFrame(self, fg_color="transparent")
+        self._body.grid(row=1, column=0, sticky="nsew", padx=(5, 0), pady=5)
+        self._body.columnconfigure(1 if checkable else 0, weight=1)
+        # La dimensione del corpo dipende solo dallo spazio disponibile, non dai pulsanti che contiene
+        self._body.grid_propagate(False)
+        self._scrollbar = ctk.CTkScrollbar(self, command=self._on_scrollbar)
+        self._scrollbar.grid(row=1, column=1, sticky="ns", pady=5)
+        self._lbl_empty = ctk.CTkLabel(self._body, text=empty_text)
+
+        self._body.bind("<Configure>", self._on_resize)
+        self._bind_wheel(self._body)
+
+    # --- DATI ---
+
+    def apply_changes(self, changed: Optional[Dict[Hashable, Any]] = None, removed: Iterable[Hashable] = ()):
+        """
+        Aggiunge, aggiorna e rimuove elementi, poi ridisegna una sola volta.
+        (Non si chiama `update`: sostituirebbe Misc.update di Tk, usato per elaborare gli eventi in sospeso.)
+
+        Args:
+            changed (Dict, optional): Elementi nuovi o modificati (chiave -> elemento).
+            removed (Iterable, optional): Chiavi degli elementi da rimuovere.
+        """
+        changed = changed or {}
+        for key in removed:
+            if self.items.pop(key, None) is not None:
+                self._view_remove(key)
+                if key == self.selected:
+                    self.selected = None
+                if key in self.checked:
+                    self.checked.discard(key)
+                    self._notify_check()
+
+        if len(changed) > BULK_UPDATE_THRESHOLD:
+            # Es. primo caricamento: un ordinamento completo costa meno di tanti inserimenti
+            self.items.update(changed)
+            self._rebuild_view(reset_scroll=False)
+            return
+
+        for key, item in changed.items():
+            self._view_remove(key)
+            self.items[key] = item
+            self._view_insert(key, item)
+        self._render()
+
+    def upsert(self, key: Hashable, item: Any):
+        """Aggiunge o aggiorna un elemento (nella posizione dettata dall'ordinamento)."""
+        self.apply_changes(changed={key: item})
+
+    def remove(self, key: Hashable):
+        """Rimuove un elemento, se presente."""
+        self.apply_changes(removed=[key])
+
+    def set_items(self, items: Dict[Hashable, Any]):
+        """Sostituisce tutti gli elementi."""
+        self.items = dict(items)
+        self._rebuild_view()
+
+    def set_sort(self, sort_key: Optional[Callable[[Any], Any]], reverse: bool = False):
+        """Cambia l'ordinamento (i pulsanti non vengono ricreati)."""
+        self._sort_key = sort_key
+        self._reverse = reverse
+        self._rebuild_view()
+
+    def set_filter(self, predicate: Optional[Callable[[Any], bool]]):
+        """Mostra solo gli elementi per cui `predicate` è vero (None: tutti)."""
+        self._filter = predicate
+        self._rebuild_view()
+
+    def select(self, key: Optional[Hashable]):
+        """Evidenzia un elemento (senza chiamare on_select)."""
+        self.selected = key
+        self._render()
+
+    def set_checked(self, keys: Iterable[Hashable]):
+        """Imposta le chiavi spuntate (es. tutte quelle visibili con `visible_keys()`, oppure nessuna)."""
+        self.checked = {key for key in keys if key in self.items}
+        self._render()
+        self._notify_check()
+
+    def visible_keys(self) -> List[Hashable]:
+        """Le chiavi degli elementi che passano il filtro, nell'ordine mostrato."""
+        keys = [key for _, key in self._view]
+        return keys[::-1] if self._reverse else keys
+
+    def see(self, key: Hashable):
+        """Scorre la lista in modo che l'elemento sia visibile."""
+        entry = self._view_keys.get(key)
+        if entry is None:
+            return
+        position = self._position(bisect.bisect_left(self._view, entry))
+        if position < self._first or position >= self._first + self._visible_count():
+            self._first = position
+            self._render()
+
+    def __len__(self) -> int:
+        return len(self._view)
+
+    def _sort_value(self, key: Hashable, item: Any) -> Tuple[Any, Hashable]:
+        return (self._sort_key(item) if self._sort_key else key), key
+
+    def _view_insert(self, key: Hashable, item: Any):
+        if self._filter and not self._filter(item):
+            return
+        entry = self._sort_value(key, item)
+        bisect.insort(self._view, entry)
+        self._view_keys[key] = entry
+
+    def _view_remove(self, key: Hashable):
+        entry = self._view_keys.pop(key, None)
+        if entry is None:
+            return
+        index = bisect.bisect_left(self._view, entry)
+        if index < len(self._view) and self._view[index] == entry:
+            del self._view[index]
+
+    def _rebuild_view(self, reset_scroll: bool = True):
+        self._view_keys = {}
+        for key, item in self.items.items():
+            if self._filter and not self._filter(item):
+                continue
+            self._view_keys[key] = self._sort_value(key, item)
+        self._view = sorted(self._view_keys.values())
+        if reset_scroll:
+            self._first = 0
+        self._render()
+
+    def _position(self, index: int) -> int:
+        """Converte un indice della lista ordinata nella posizione mostrata (e viceversa)."""
+        return len(self._view) - 1 - index if self._reverse else index
+
+    # --- RENDERING ---
+
+    def _visible_count(self) -> int:
+        return max(1, self._body.winfo_height() // self.row_height)
+
+    def _on_resize(self, event=None):
+        """Adegua il numero di pulsanti all'altezza disponibile (solo le righe visibili esistono)."""
+        needed = max(1, math.ceil(max(event.height if event else 0, self.row_height) / self.row_height))
+        while len(self._rows) < needed:
+            index = len(self._rows)
+            row = ctk.CTkButton(self._body, height=self.row_height - 4, fg_color="transparent", border_width=1,
+                                text_color=("gray10", "gray90"), anchor="w",
+                                command=lambda i=index: self._on_click(i))
+            self._bind_wheel(row)
+            self._rows.append(row)
+            self._row_keys.append(None)
+            if self.checkable:
+                check = ctk.CTkCheckBox(self._body, text="", width=24, command=lambda i=index: self._on_check(i))
+                self._bind_wheel(check)
+                self._checks.append(check)
+        while len(self._rows) > needed:
+            self._rows.pop().destroy()
+            self._row_keys.pop()
+            if self.checkable:
+                self._checks.pop().destroy()
+        self._render()
+
+    def _render(self):
+        """Assegna ai pulsanti esistenti gli elementi della finestra visibile e aggiorna la scrollbar."""
+        total = len(self._view)
+        visible = self._visible_count()
+        self._first = max(0, min(self._first, total - visible))
+
+        if total == 0:
+            self._lbl_empty.grid(row=0, column=0, pady=10)
+        else:
+            self._lbl_empty.grid_remove()
+
+        for i, row in enumerate(self._rows):
+            position = self._first + i
+            if position >= total:
+                self._row_keys[i] = None
+                row.grid_remove()
+                if self.checkable:
+                    self._checks[i].grid_remove()
+                continue
+            key = self._view[self._position(position)][1]
+            self._row_keys[i] = key
+            row.configure(text=self.format_item(self.items[key]),
+                          fg_color=("gray75", "gray30") if key == self.selected else "transparent")
+            row.grid(row=i, column=1 if self.checkable else 0, sticky="ew", pady=2)
+            if self.checkable:
+                check = self._checks[i]
+                if key in self.checked:
+                    check.select()
+                else:
+                    check.deselect()
+                check.grid(row=i, column=0, padx=(0, 4))
+
+        if total:
+            self._scrollbar.set(self._first / total, min(1.0, (self._first + visible) / total))
+        else:
+            self._scrollbar.set(0.0, 1.0)
+
+    def _on_click(self, index: int):
+        key = self._row_keys[index]
+        if key is None:
+            return
+        self.selected = key
+        self._render()
+        if self.on_select:
+            self.on_select(key)
+
+    def _on_check(self, index: int):
+        key = self._row_keys[index]
+        if key is None:
+            return
+        if self._checks[index].get():
+            self.checked.add(key)
+        else:
+            self.checked.discard(key)
+        self._notify_check()
+
+    def _notify_check(self):
+        if self.on_check:
+            self.on_check(set(self.checked))
+
+    # --- SCORRIMENTO ---
+
+    def scroll_to(self, first: int):
+        """Mostra gli elementi a partire dalla posizione `first`."""
+        self._first = first
+        self._render()
+
+    def _on_scrollbar(self, *args: Any):
+        """Comandi della scrollbar: ("moveto", frazione) oppure ("scroll", n, "units"|"pages")."""
+        if args[0] == "moveto":
+            self.scroll_to(int(float(args[1]) * len(self._view)))
+        elif args[0] == "scroll":
+            step = self._visible_count() if args[2] == "pages" else 1
+            self.scroll_to(self._first + int(args[1]) * step)
+
+    def _on_wheel(self, event):
+        if getattr(event, "num", None) == 4:
+            delta = -1
+        elif getattr(event, "num", None) == 5:
+            delta = 1
+        else:
+            # Windows: multipli di 120; macOS: valori piccoli
+            delta = -int(event.delta / 120) if abs(event.delta) >= 120 else -event.delta
+        self.scroll_to(self._first + 3 * delta)
+
+    def _bind_wheel(self, widget):
+        widget.bind("<MouseWheel>", self._on_wheel, add="+")
+        widget.bind("<Button-4>", self._on_wheel, add="+")
+        widget.bind("<Button-5>", self._on_wheel, add="+")
@@ -0,0 +1,116 @@
+from typing import Callable, Optional
+
+import customtkinter as ctk
+import numpy as np
+
+# Colori del grafico (Tk non gestisce la trasparenza: le sfumature sono miscelate in anticipo)
+BACKGROUND = "#1a1a1a"
+WAVE_COLOR = "#E67E22"
+SELECTION_COLOR = "#2C3E50"
+MARKER_COLOR = "#ECF0F1"
+
+# Opacità dell'inviluppo min/max rispetto all'RMS (pieno)
+ENVELOPE_ALPHA = 0.45
+
+
+class WaveformCanvas(ctk.CTkCanvas):
+    """
+    Forma d'onda disegnata direttamente su un canvas Tk, con la selezione di ritaglio in sovrimpressione.
+
+    L'inviluppo dei picchi (min/max e RMS) diventa due poligoni, creati una sola volta per file
+    e ridimensionati solo quando cambia la dimensione del widget. La selezione (fascia evidenziata
+    e marcatori di inizio/fine) è fatta di tre elementi separati: spostarla cambia solo le loro
+    coordinate, quindi segue il trascinamento degli slider senza ridisegnare la forma d'onda.
+    """
+
+    def __init__(self, master, on_click: Optional[Callable[[float], None]] = None, height: int = 100, **kwargs):
+        """
+        Inizializza il canvas (vuoto finché non si chiama set_data).
+
+        Args:
+            master: Il widget genitore.
+            on_click (Callable, optional): Chiamata con l'istante (secondi) su cui l'utente ha cliccato.
+            height (int): Altezza in pixel.
+        """
+        super().__init__(master, height=height, background=BACKGROUND, highlightthickness=0, **kwargs)
+        self.on_click = on_click
+
+        self.data: np.ndarray = np.zeros((0, 3))
+        self.duration = 0.0
+        self.selection = (0.0, 0.0)
+
+        # Elementi del canvas: la fascia di selezione sta sotto la forma d'onda, i marcatori sopra
+        self._band = self.create_rectangle(0, 0, 0, 0, fill=SELECTION_COLOR, width=0)
+        self._envelope = self.create_polygon(0, 0, 0, 0, fill=_blend(WAVE_COLOR, BACKGROUND, ENVELOPE_ALPHA),
+                                             width=0)
+        self._rms = self.create_polygon(0, 0, 0, 0, fill=WAVE_COLOR, width=0)
+        self._start_marker = self.create_line(0, 0, 0, 0, fill=MARKER_COLOR, width=1)
+        self._end_marker = self.create_line(0, 0, 0, 0, fill=MARKER_COLOR, width=1)
+
+        self.bind("<Configure>", lambda event: self._draw_waveform())
+        self.bind("<Button-1>", self._on_click)
+
+    def set_data(self, data: np.ndarray, duration: float):
+        """
+        Imposta i picchi da visualizzare e ridisegna la forma d'onda.
+
+        Args:
+            data (np.ndarray): Matrice (N, 3) con colonne [min, max, rms] in [-1, 1] (vedi get_waveform_data).
+            duration (float): Durata in secondi rappresentata dai picchi.
+        """
+        self.data = np.asarray(data, dtype=np.float64).reshape(-1, 3)
+        self.duration = float(duration)
+        self._draw_waveform()
+
+    def set_selection(self, start: float, end: float):
+        """
+        Sposta la selezione di ritaglio: aggiorna solo la fascia e i marcatori.
+
+        Args:
+            start (float): Inizio della selezione (secondi).
+            end (float): Fine della selezione (secondi).
+        """
+        self.selection = (start, end)
+        height = self.winfo_height()
+        x_start, x_end = self._to_x(start), self._to_x(end)
+        self.coords(self._band, x_start, 0, x_end, height)
+        self.coords(self._start_marker, x_start, 0, x_start, height)
+        self.coords(self._end_marker, x_end, 0, x_end, height)
+
+    def _draw_waveform(self):
+        """Ricalcola i poligoni dell'inviluppo per la dimensione attuale del canvas."""
+        width, height = self.winfo_width(), self.winfo_height()
+        if len(self.data) < 2 or width < 2:
+            self.coords(self._envelope, 0, 0, 0, 0)
+            self.coords(self._rms, 0, 0, 0, 0)
+        else:
+            x = np.linspace(0, width - 1, len(self.data))
+            middle = height / 2
+            self.coords(self._envelope, *_band_polygon(x, middle - self.data[:, 1] * middle,
+                                                       middle - self.data[:, 0] * middle))
+            self.coords(self._rms, *_band_polygon(x, middle - self.data[:, 2] * middle,
+                                                  middle + self.data[:, 2] * middle))
+        self.set_selection(*self.selection)
+
+    def _to_x(self, seconds: float) -> float:
+        if self.duration <= 0:
+            return 0.0
+        return min(max(seconds / self.duration, 0.0), 1.0) * (self.winfo_width() - 1)
+
+    def _on_click(self, event):
+        if self.on_click and self.duration > 0 and self.winfo_width() > 1:
+            self.on_click(min(max(event.x / (self.winfo_width() - 1), 0.0), 1.0) * self.duration)
+
+
+def _band_polygon(x: np.ndarray, top: np.ndarray, bottom: np.ndarray) -> list:
+    """Coordinate piatte (x0, y0, x1, y1, ...) del poligono compreso tra due curve."""
+    xs = np.concatenate((x, x[::-1]))
+    ys = np.concatenate((top, bottom[::-1]))
+    return np.column_stack((xs, ys)).round(1).ravel().tolist()
+
+
+def _blend(color: str, background: str, alpha: float) -> str:
+    """Colore risultante da `color` con opacità `alpha` sopra `background` (formato #RRGGBB)."""
+    channels = [round(alpha * int(color[i:i + 2], 16) + (1 - alpha) * int(background[i:i + 2], 16))
+                for i in (1, 3, 5)]
+    return "#" + "".join(f"{c:02X}" for c in channels)
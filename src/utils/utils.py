@@ -1,10 +1,18 @@
+import codecs
+import hashlib
+import io
 import os
 import platform
+import re
+import shutil
+import zipfile
 
-from typing import Tuple
+from typing import TYPE_CHECKING, Callable, Iterator, List, Optional, Tuple
 from pydub import AudioSegment
-from fpdf import FPDF
-from docx import Document
+
+if TYPE_CHECKING:
+    # fpdf è pesante da importare (~0.4s): viene caricato solo al primo export PDF
+    from fpdf import FPDF
 
 
 def setup_ffmpeg() -> Tuple[str, str]:
@@ -44,6 +52,25 @@ def setup_ffmpeg() -> Tuple[str, str]:
     return ffmpeg_path, ffprobe_path
 
 
+def get_ffmpeg_binaries() -> Tuple[str, str]:
+    """
+    Restituisce gli eseguibili (ffmpeg, ffprobe) da usare per le pipe dirette con subprocess.
+
+    Usa i percorsi configurati da setup_ffmpeg se i binari esistono davvero,
+    altrimenti ripiega su quelli installati nel PATH di sistema.
+
+    Returns:
+        Tuple[str, str]: I percorsi (o i nomi) di (ffmpeg, ffprobe).
+    """
+    configured_ffmpeg = getattr(AudioSegment, "converter", "ffmpeg")
+    configured_ffprobe = getattr(AudioSegment, "ffprobe", "ffprobe")
+
+    ffmpeg = configured_ffmpeg if os.path.isfile(configured_ffmpeg) else (shutil.which("ffmpeg") or "ffmpeg")
+    ffprobe = configured_ffprobe if os.path.isfile(configured_ffprobe) else (shutil.which("ffprobe") or "ffprobe")
+
+    return ffmpeg, ffprobe
+
+
 def get_transcripts_folder() -> str:
     """
     Restituisce il percorso della cartella centralizzata per le trascrizioni ('Sbobinature').
@@ -65,6 +92,49 @@ def get_transcripts_folder() -> str:
     return folder_path
 
 
+def get_cache_folder(name: str) -> str:
+    """
+    Restituisce (creandola se necessario) una sottocartella della cache locale dell'applicazione.
+
+    Args:
+        name (str): Il nome della sottocartella (es. "peaks").
+
+    Returns:
+        str: Il percorso assoluto della cartella di cache.
+    """
+    base_dir = os.path.dirname(os.path.abspath(__file__))
+    folder_path = os.path.join(base_dir, "Cache", name)
+
+    os.makedirs(folder_path, exist_ok=True)
+
+    return folder_path
+
+
+def file_fingerprint(filepath: str, sample_size: int = 1024 * 1024) -> str:
+    """
+    Calcola un'impronta del file combinando dimensione, data di modifica e contenuto.
+
+    Per restare veloce anche su registrazioni di diversi GB, il contenuto non viene letto
+    per intero: si usano l'inizio, il centro e la fine del file (sample_size byte ciascuno).
+
+    Args:
+        filepath (str): Il percorso del file.
+        sample_size (int): Byte letti da ciascuna delle tre porzioni campionate.
+
+    Returns:
+        str: L'impronta esadecimale (SHA-1).
+    """
+    stat = os.stat(filepath)
+    digest = hashlib.sha1(f"{stat.st_size}:{stat.st_mtime_ns}".encode())
+
+    with open(filepath, "rb") as f:
+        for offset in (0, max(0, stat.st_size // 2 - sample_size // 2), max(0, stat.st_size - sample_size)):
+            f.seek(offset)
+            digest.update(f.read(sample_size))
+
+    return digest.hexdigest()
+
+
 def seconds_to_hms(seconds: float) -> str:
     """
     Converte un valore in secondi (float) in una stringa formattata HH:MM:SS.ss.
@@ -108,13 +178,121 @@ def hms_to_seconds(hms_str: str) -> float:
 
 # --- EXPORT FUNCTIONS ---
 
-def save_as_pdf(text: str, original_txt_path: str) -> str:
+# Lunghezza massima (caratteri) di un paragrafo esportato. Le trascrizioni sono spesso un'unica riga
+# lunghissima: i paragrafi più lunghi vengono spezzati a fine frase.
+PARAGRAPH_MAX_CHARS = 2000
+
+# Caratteri non ammessi in XML 1.0 (es. caratteri di controllo finiti nel testo)
+_XML_INVALID_CHARS = re.compile("[\x00-\x08\x0b\x0c\x0e-\x1f\ufffe\uffff]")
+
+def iter_paragraphs(filepath: str, max_chars: int = PARAGRAPH_MAX_CHARS,
+                    block_size: int = 64 * 1024) -> Iterator[Tuple[str, float]]:
     """
-    Esporta il testo trascritto in un file PDF.
+    Legge un file di testo a blocchi e restituisce un paragrafo alla volta (memoria costante).
+
+    I paragrafi sono separati dagli a capo; quelli più lunghi di `max_chars` vengono spezzati
+    alla fine di una frase (o di una parola) più vicina al limite.
+
+    Args:
+        filepath (str): Il percorso del file .txt (UTF-8).
+        max_chars (int): Lunghezza massima di un paragrafo.
+        block_size (int): Byte letti dal disco a ogni passo.
+
+    Yields:
+        Tuple[str, float]: Il paragrafo (senza spazi iniziali/finali) e la frazione di file letta (0.0 - 1.0).
+    """
+    total = os.path.getsize(filepath) or 1
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    read = 0
+    pending = ""
+
+    with open(filepath, "rb") as f:
+        while True:
+            data = f.read(block_size)
+            read += len(data)
+            pending += decoder.decode(data, final=not data)
+
+            # Si avanza con un indice invece di ritagliare la stringa a ogni paragrafo
+            pos = 0
+            while True:
+                newline = pending.find("\n", pos, pos + max_chars + 1)
+                if newline != -1:
+                    end, next_pos = newline, newline + 1
+                elif len(pending) - pos > max_chars:
+                    end = next_pos = _paragraph_cut(pending, pos, pos + max_chars)
+                elif not data and pos < len(pending):
+                    end = next_pos = len(pending)
+                else:
+                    break
+
+                paragraph = pending[pos:end].strip()
+                pos = next_pos
+                if paragraph:
+                    yield paragraph, read / total
+
+            pending = pending[pos:]
+            if not data:
+                break
+
+
+def _paragraph_cut(text: str, start: int, limit: int) -> int:
+    """Posizione in cui spezzare text[start:limit]: dopo l'ultima fine frase, altrimenti all'ultimo spazio."""
+    sentence_end = max(text.rfind(mark, start, limit) for mark in (". ", "? ", "! "))
+    if sentence_end > start + (limit - start) // 2:
+        return sentence_end + 1
+    space = text.rfind(" ", start, limit)
+    return space if space > start else limit
+
+
+def _export_paths(original_txt_path: str, extension: str) -> Tuple[str, str]:
+    """
+    Percorso finale di un export e percorso temporaneo in cui scriverlo.
+    Il file temporaneo è nascosto (inizia con "."), così la libreria non lo mostra mentre viene scritto.
+    """
+    output_path = os.path.splitext(original_txt_path)[0] + extension
+    folder, name = os.path.split(output_path)
+    return output_path, os.path.join(folder, f".{name}.tmp")
+
+
+def _progress_reporter(callback: Optional[Callable[[float], None]]) -> Callable[[float], None]:
+    """Limita le notifiche di avanzamento a una per ogni punto percentuale."""
+    last = [-1.0]
+
+    def report(fraction: float):
+        if callback and fraction - last[0] >= 0.01:
+            last[0] = fraction
+            callback(min(1.0, fraction))
+
+    return report
+
+
+def export_pdf(original_txt_path: str, progress_callback: Optional[Callable[[float], None]] = None) -> str:
+    """
+    Esporta una trascrizione in un file PDF, leggendo il testo dal .txt un paragrafo alla volta.
 
     Nota Tecnica:
         FPDF standard non supporta nativamente Unicode completo (es. Emoji o caratteri speciali).
         Viene applicata una codifica 'latin-1' con replace per evitare crash durante la generazione.
+        L'a capo viene calcolato qui, parola per parola con le larghezze in cache, e ogni riga
+        viene scritta con una semplice cell: multi_cell ricalcola la larghezza dell'intera riga
+        a ogni carattere ed è molto più lenta sui testi lunghi.
+        Il testo non viene mai caricato per intero, ma fpdf2 conserva le pagine generate fino a
+        output(): la memoria cresce con la dimensione del PDF (compresso), non con quella del .txt.
+
+    Args:
+        original_txt_path (str): Il percorso del file .txt da esportare (usato anche per derivare il nome).
+        progress_callback (Callable, optional): Chiamata con l'avanzamento (0.0 - 1.0).
+
+    Returns:
+        str: Il percorso del file PDF generato.
+    """
+    return _write_pdf(original_txt_path, iter_paragraphs(original_txt_path), _progress_reporter(progress_callback))
+
+
+def save_as_pdf(text: str, original_txt_path: str) -> str:
+    """
+    Esporta il testo trascritto in un file PDF.
+    Per le trascrizioni già salvate su disco è preferibile export_pdf, che non legge tutto il testo.
 
     Args:
         text (str): Il contenuto della trascrizione.
@@ -123,11 +301,18 @@ def save_as_pdf(text: str, original_txt_path: str) -> str:
     Returns:
         str: Il percorso del file PDF generato.
     """
+    return _write_pdf(original_txt_path, _text_paragraphs(text), _progress_reporter(None))
+
+
+def _write_pdf(original_txt_path: str, paragraphs: Iterator[Tuple[str, float]],
+               report: Callable[[float], None]) -> str:
+    """Scrive il PDF di una trascrizione a partire dai suoi paragrafi (vedi export_pdf)."""
+    from fpdf import FPDF
+
     pdf = FPDF()
     pdf.add_page()
 
     # Impostazione Font per il Titolo
-    pdf.set_font("Helvetica", size=12)  # Font base
     pdf.set_font("Helvetica", style="B", size=16)  # Grassetto
 
     # Titolo centrato
@@ -137,24 +322,121 @@ def save_as_pdf(text: str, original_txt_path: str) -> str:
 
     # Impostazione Font per il corpo del testo
     pdf.set_font("Helvetica", size=11)
+    word_widths = {}
 
-    # Sanitizzazione del testo per FPDF (Fix per caratteri non supportati)
-    safe_text = text.encode('latin-1', 'replace').decode('latin-1')
+    for paragraph, progress in paragraphs:
+        # Sanitizzazione del testo per FPDF (Fix per caratteri non supportati)
+        safe_text = paragraph.encode('latin-1', 'replace').decode('latin-1')
 
-    # Scrittura del blocco di testo (multi_cell gestisce il word wrap automatico)
-    pdf.multi_cell(0, 10, safe_text)
+        # La cell lascia un margine interno su entrambi i lati del testo
+        for line in wrap_words(pdf, safe_text, pdf.epw - 2 * pdf.c_margin, word_widths):
+            pdf.cell(0, 10, line, new_x="LMARGIN", new_y="NEXT")
+        report(progress)
 
-    # Output nella stessa cartella
-    output_path = original_txt_path.replace(".txt", ".pdf")
-    pdf.output(output_path)
+    # Output nella stessa cartella (prima su un file temporaneo: un export interrotto non lascia file corrotti)
+    output_path, tmp_path = _export_paths(original_txt_path, ".pdf")
+    try:
+        pdf.output(tmp_path)
+        os.replace(tmp_path, output_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    report(1.0)
 
     return output_path
 
 
+def _text_paragraphs(text: str) -> Iterator[Tuple[str, float]]:
+    """I paragrafi di un testo già in memoria, nello stesso formato di iter_paragraphs."""
+    paragraphs = [paragraph.strip() for paragraph in text.split("\n") if paragraph.strip()]
+    for i, paragraph in enumerate(paragraphs):
+        yield paragraph, (i + 1) / len(paragraphs)
+
+
+def wrap_words(pdf: "FPDF", text: str, width: float, cache: dict) -> Iterator[str]:
+    """
+    Divide un paragrafo in righe che stanno nella larghezza indicata (a capo tra le parole).
+
+    Le parole più larghe di una riga intera (es. URL o sequenze senza spazi) vengono spezzate
+    carattere per carattere, altrimenti uscirebbero dal margine destro della pagina.
+
+    Args:
+        pdf (FPDF): Il documento, con il font del corpo già impostato.
+        text (str): Il paragrafo.
+        width (float): Larghezza disponibile.
+        cache (dict): Larghezze delle parole già misurate (il vocabolario di una trascrizione è limitato).
+
+    Yields:
+        str: Le righe del paragrafo.
+    """
+    space = pdf.get_string_width(" ")
+    line, line_width = [], 0.0
+    for word in text.split():
+        word_width = cache.get(word)
+        if word_width is None:
+            word_width = cache[word] = pdf.get_string_width(word)
+        if word_width > width:
+            # La parola non entra nemmeno da sola: chiudiamo la riga corrente e la spezziamo
+            if line:
+                yield " ".join(line)
+            pieces = _split_word(pdf, word, width, cache)
+            last = pieces.pop()
+            yield from pieces
+            line, line_width = [last], pdf.get_string_width(last)
+            continue
+        if line and line_width + space + word_width > width:
+            yield " ".join(line)
+            line, line_width = [], 0.0
+        line_width += (space if line else 0.0) + word_width
+        line.append(word)
+    if line:
+        yield " ".join(line)
+
+
+def _split_word(pdf: "FPDF", word: str, width: float, cache: dict) -> List[str]:
+    """
+    Spezza una parola troppo larga in pezzi che stanno ciascuno nella larghezza indicata.
+
+    Returns:
+        List[str]: I pezzi della parola (almeno un carattere ciascuno).
+    """
+    pieces, piece, piece_width = [], "", 0.0
+    for char in word:
+        char_width = cache.get(char)
+        if char_width is None:
+            char_width = cache[char] = pdf.get_string_width(char)
+        if piece and piece_width + char_width > width:
+            pieces.append(piece)
+            piece, piece_width = "", 0.0
+        piece += char
+        piece_width += char_width
+    pieces.append(piece)
+    return pieces
+
+
+def export_docx(original_txt_path: str, progress_callback: Optional[Callable[[float], None]] = None) -> str:
+    """
+    Esporta una trascrizione in un documento Word (.docx), leggendo il testo dal .txt un paragrafo alla volta.
+
+    Il pacchetto (stili, tema, impostazioni e il titolo) viene generato da python-docx come sempre;
+    solo il corpo del documento (word/document.xml) viene scritto in streaming nel file compresso,
+    un paragrafo alla volta, quindi la memoria resta costante a prescindere dalla lunghezza della trascrizione.
+
+    Args:
+        original_txt_path (str): Il percorso del file .txt da esportare.
+        progress_callback (Callable, optional): Chiamata con l'avanzamento (0.0 - 1.0).
+
+    Returns:
+        str: Il percorso del file .docx generato.
+    """
+    return _write_docx(original_txt_path, iter_paragraphs(original_txt_path), _progress_reporter(progress_callback))
+
+
 def save_as_docx(text: str, original_txt_path: str) -> str:
     """
     Esporta il testo trascritto in un documento Word (.docx).
     Mantiene i paragrafi separati in base alle nuove righe nel testo originale.
+    Per le trascrizioni già salvate su disco è preferibile export_docx, che non legge tutto il testo.
 
     Args:
         text (str): Il contenuto della trascrizione.
@@ -163,15 +445,51 @@ def save_as_docx(text: str, original_txt_path: str) -> str:
     Returns:
         str: Il percorso del file .docx generato.
     """
-    doc = Document()
-    doc.add_heading(f'Trascrizione: {os.path.basename(original_txt_path)}', 0)
+    return _write_docx(original_txt_path, _text_paragraphs(text), _progress_reporter(None))
+
 
-    # Aggiunge il testo paragrafo per paragrafo per mantenere la formattazione base
-    for paragraph in text.split('\n'):
-        if paragraph.strip():  # Ignora righe vuote
-            doc.add_paragraph(paragraph)
+def _write_docx(original_txt_path: str, paragraphs: Iterator[Tuple[str, float]],
+                report: Callable[[float], None]) -> str:
+    """Scrive il .docx di una trascrizione a partire dai suoi paragrafi (vedi export_docx)."""
+    from docx import Document
 
-    output_path = original_txt_path.replace(".txt", ".docx")
-    doc.save(output_path)
+    # Documento di partenza (piccolo): contiene solo il titolo, i paragrafi vengono aggiunti in streaming
+    template = Document()
+    template.add_heading(f'Trascrizione: {os.path.basename(original_txt_path)}', 0)
+    buffer = io.BytesIO()
+    template.save(buffer)
 
+    output_path, tmp_path = _export_paths(original_txt_path, ".docx")
+    try:
+        with zipfile.ZipFile(buffer) as source, \
+                zipfile.ZipFile(tmp_path, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+            for item in source.infolist():
+                if item.filename != "word/document.xml":
+                    archive.writestr(item, source.read(item))
+                    continue
+
+                # I paragrafi vanno prima delle proprietà di sezione, che chiudono il corpo del documento
+                skeleton = source.read(item)
+                split = skeleton.rindex(b"<w:sectPr")
+                with archive.open(item.filename, "w", force_zip64=True) as document:
+                    document.write(skeleton[:split])
+                    # Aggiunge il testo paragrafo per paragrafo per mantenere la formattazione base
+                    for paragraph, progress in paragraphs:
+                        document.write(f'<w:p><w:r><w:t xml:space="preserve">{_xml_text(paragraph)}</w:t></w:r></w:p>'
+                                       .encode("utf-8"))
+                        report(progress)
+                    document.write(skeleton[split:])
+
+        os.replace(tmp_path, output_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+    report(1.0)
     return output_path
+
+
+def _xml_text(text: str) -> str:
+    """Prepara un testo per un elemento XML: escape dei caratteri speciali e rimozione di quelli non ammessi."""
+    # Come xml.sax.saxutils.escape, senza importare il pacchetto xml.sax all'avvio
+    return _XML_INVALID_CHARS.sub("", text).replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")